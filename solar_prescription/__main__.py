@@ -0,0 +1,45 @@
+"""
+Command-line entry point, run from the repository root:
+
+  python -m solar_prescription serve [options]    # production server (serve.py)
+  python -m solar_prescription warmup [options]   # pre-fetch caches (warmup.py)
+  python -m solar_prescription loadtest [options] # capacity test (loadtest.py)
+  python -m solar_prescription bulk FILE [options] # households CSV -> prescriptions (bulk.py)
+"""
+
+import os
+import sys
+
+# The Flask app's modules live in solar_prescription/solar_prescription.
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solar_prescription")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+COMMANDS = ("serve", "warmup", "loadtest", "bulk")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(__doc__.strip())
+        return 2
+    command, rest = argv[0], argv[1:]
+    if command == "serve":
+        import serve
+
+        return serve.main(rest)
+    if command == "bulk":
+        import bulk
+
+        return bulk.main(rest)
+    if command == "loadtest":
+        import loadtest
+
+        return loadtest.main(rest)
+    import warmup
+
+    return warmup.main(rest)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
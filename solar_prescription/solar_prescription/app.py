@@ -1,12 +1,34 @@
-from flask import Flask, render_template, request, jsonify, session, redirect
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, g, send_file
+from flask import before_render_template, template_rendered, Response, stream_with_context
 import os
+import time
 from datetime import datetime
-from prescription_engine import SolarPrescription
-from pvwatts import get_pvwatts_data
+from prescription_engine import get_engine
+from catalog import get_catalog, preload_catalog
+from prescription_store import get_store
+from batch import VERDICTS
+from models import to_json
+from sizing import production_per_watt
+from pvwatts import (
+    REFERENCE_CAPACITY_KW,
+    coalescing_stats,
+    default_orientation,
+    get_cached_reference_profile,
+    get_reference_profile,
+    get_reference_profiles,
+    scale_to_kit,
+)
+from geocoding import geocode as geocode_query, get_gazetteer, nominatim_cache_stats
+import assets
+import bulk
+import metrics
+import profiling
+from warmup import PRELOADED_ENV, start_background_warmup, startup_warmup_enabled
+from pvwatts_cache import get_cache, make_cache_key
+from render_cache import get_render_cache
+from verdict_tables import get_verdict_table
 import secrets
 from dotenv import load_dotenv
-import requests
-import csv
 import re
 
 env_path = os.path.join(os.path.dirname(__file__), ".env")
@@ -32,6 +54,128 @@ app.config.update(
 if os.getenv("RENDER"):
     app.config.update(SESSION_COOKIE_SECURE=True)
 
+# Fingerprinted, precompressed static assets under /assets/ (see assets.py).
+assets.install(app)
+
+# Load the engine, product catalog and gazetteer at startup rather than on the first request.
+get_engine()
+preload_catalog()
+get_gazetteer()
+
+# Optionally pre-fetch PVWatts profiles for top locations (see warmup.py). A
+# preloading server (serve.py under gunicorn) must not start threads before it
+# forks, so it runs the warm-up from its own hooks instead.
+if startup_warmup_enabled() and not os.getenv(PRELOADED_ENV):
+    start_background_warmup()
+
+
+# Request, template and cache metrics, served at /metrics.
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _observe_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            request.endpoint or "unmatched",
+            request.method,
+            str(response.status_code),
+        )
+    return response
+
+
+def _start_render_timer(sender, template, context, **extra):
+    g.setdefault("render_started", []).append(time.perf_counter())
+
+
+def _observe_render(sender, template, context, **extra):
+    started = g.get("render_started")
+    if started:
+        metrics.TEMPLATE_RENDER_SECONDS.observe(
+            time.perf_counter() - started.pop(), template.name or "unknown"
+        )
+
+
+before_render_template.connect(_start_render_timer, app)
+template_rendered.connect(_observe_render, app)
+
+
+def _cache_metrics():
+    """Scrape-time view of counters the caches already keep."""
+    caches = {"nominatim": nominatim_cache_stats(), "render": get_render_cache().stats()}
+    pvwatts_cache = get_cache()
+    if pvwatts_cache is not None:
+        caches["pvwatts"] = pvwatts_cache.stats()
+    coalescing = coalescing_stats()
+    return [
+        ("cache_hits_total", "counter", "Cache lookups answered from the cache.",
+         [({"cache": name}, stats["hits"]) for name, stats in caches.items()]),
+        ("cache_misses_total", "counter", "Cache lookups that missed.",
+         [({"cache": name}, stats["misses"]) for name, stats in caches.items()]),
+        ("cache_entries", "gauge", "Entries currently held by each cache.",
+         [({"cache": name}, stats["entries"]) for name, stats in caches.items()]),
+        ("pvwatts_lookups_total", "counter",
+         "PVWatts fetches by whether they ran or joined an identical in-flight call.",
+         [({"result": "executed"}, coalescing["executions"]),
+          ({"result": "coalesced"}, coalescing["coalesced"])]),
+    ]
+
+
+metrics.REGISTRY.register_collector(_cache_metrics)
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    if not metrics.METRICS_ENABLED:
+        return "Metrics are disabled\n", 404
+    return app.response_class(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
+# Opt-in request profiling (PROFILE_REQUESTS / PROFILE_SAMPLE_RATE / X-Profile).
+# Without any of them configured the app is not wrapped at all.
+profile_store = profiling.install(app)
+
+
+def _admin_denied():
+    """Error response unless the request carries ADMIN_TOKEN, else None."""
+    if not profiling.admin_token():
+        return jsonify({"error": "Not found"}), 404
+    supplied = request.headers.get("X-Admin-Token")
+    authorization = request.headers.get("Authorization", "")
+    if authorization.startswith("Bearer "):
+        supplied = authorization[len("Bearer "):]
+    if not profiling.check_admin_token(supplied):
+        return jsonify({"error": "Unauthorized"}), 401
+    return None
+
+
+@app.route("/admin/profiles")
+def admin_profiles():
+    """List captured request profiles, newest first"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+    return jsonify({"profiles": profile_store.list()})
+
+
+@app.route("/admin/profiles/<name>")
+def admin_profile(name):
+    """Download a pstats file, or ?format=text for a cumulative-time report"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+    path = profile_store.file_path(name)
+    if path is None:
+        return jsonify({"error": "Not found"}), 404
+    if request.args.get("format") == "text":
+        return app.response_class(profile_store.summary(name), mimetype="text/plain")
+    return send_file(path, mimetype="application/octet-stream", as_attachment=True, download_name=name)
+
 
 def _extract_recommended_watts(prescription: dict) -> int | None:
     recommendation = (prescription or {}).get("recommendation") or {}
@@ -66,116 +210,257 @@ def prescribe():
         kit_size = int(data.get("kit_size", 0))
         coverage_percentage = int(data.get("coverage_percentage", 70))  # Default 70%
         appliances = data.get("appliances", [])
+        simulate = bool(data.get("simulate", False))
 
-        # Initialize prescription engine
-        engine = SolarPrescription()
+        # Shared, read-only engine (products.json is parsed once per process)
+        engine = get_engine()
 
-        # Calculate optimal tilt (use 15° minimum for near-equator locations)
-        optimal_tilt = max(15, abs(latitude))
+        optimal_tilt, azimuth = default_orientation(latitude)
 
-        # Calculate azimuth: 180° (south) for Northern Hemisphere, 0° (north) for Southern
-        # But use 180° for locations very close to equator (within 5°)
-        if abs(latitude) < 5:
-            azimuth = 180  # Default to south-facing near equator
-        else:
-            azimuth = 180 if latitude >= 0 else 0
+        # PVWatts output is linear in capacity: fetch one 1 kW reference profile
+        # for this location and derive every kit size from it.
+        reference_data, error = get_reference_profile(
+            lat=latitude,
+            lon=longitude,
+            tilt=optimal_tilt,
+            azimuth=azimuth,
+            module_type=0,  # Standard
+            array_type=1,  # Fixed - Roof Mounted
+            losses=14,  # Default losses
+            hourly=simulate,  # 8760-hour series for the battery simulation
+        )
 
-        # If no kit size selected, calculate the recommended minimum
-        if kit_size == 0:
-            # Use a small but valid capacity for PVWatts
-            dummy_kit_size = 100
-            dummy_system_capacity_kw = dummy_kit_size / 1000
-
-            # Get PVWatts data for dummy capacity
-            pvwatts_data_dummy, error = get_pvwatts_data(
-                system_capacity=dummy_system_capacity_kw,
-                module_type=0,  # Standard
-                array_type=1,  # Fixed - Roof Mounted
-                tilt=optimal_tilt,
-                azimuth=azimuth,
-                lat=latitude,
-                lon=longitude,
-                losses=14,  # Default losses
+        if error or not reference_data:
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "error": "Could not fetch solar data for this location. Please try again.",
+                    }
+                ),
+                400,
             )
 
-            if error or not pvwatts_data_dummy:
+        # If no kit size selected, size the smallest kit that meets the target
+        if kit_size == 0:
+            daily_wh, _ = engine.calculate_daily_energy_need(appliances)
+            reference_watts = REFERENCE_CAPACITY_KW * 1000
+            per_watt = production_per_watt(
+                engine.get_daily_production(reference_data, reference_watts),
+                reference_watts,
+            )
+            sized = engine.size_kits(
+                per_watt, daily_wh, targets=(coverage_percentage,)
+            )[coverage_percentage]
+            if not sized:
+                # Sizing only fails when the location's data shows no usable production.
                 return (
                     jsonify(
                         {
                             "success": False,
-                            "error": "Could not fetch solar data for this location. Please try again.",
+                            "error": "Could not size a kit: the solar data for this location "
+                            "shows no usable production. Please choose a kit size.",
                         }
                     ),
                     400,
                 )
+            kit_size = sized["kit_size"]
+
+        # Production for the chosen kit, scaled from the reference profile.
+        pvwatts_data = scale_to_kit(reference_data, kit_size)
 
-            # Get dummy prescription to calculate energy needs
-            prescription_dummy = engine.generate_prescription(
+        # Calculate prescription; plain JSON from here on (response, store, template)
+        prescription = to_json(
+            engine.generate_prescription(
                 location=location,
                 latitude=latitude,
                 longitude=longitude,
-                kit_size=dummy_kit_size,
+                kit_size=kit_size,
                 appliances=appliances,
-                pvwatts_data=pvwatts_data_dummy,
+                pvwatts_data=pvwatts_data,
+                coverage_percentage=coverage_percentage,
             )
+        )
 
-            daily_wh = float(prescription_dummy["energy_need"]["daily_wh"])
+        # Extract recommended wattage from suggestion if present
+        recommended_watts = _extract_recommended_watts(prescription)
 
-            # PVWatts monthly outputs are in kWh for the whole system.
-            monthly_kwh = (pvwatts_data_dummy.get("outputs") or {}).get(
-                "ac_monthly"
-            ) or []
-            if not monthly_kwh:
-                return (
-                    jsonify(
-                        {
-                            "success": False,
-                            "error": "Could not fetch solar data for this location. Please try again.",
-                        }
-                    ),
-                    400,
-                )
+        # Store server-side; the session cookie only carries the ID.
+        prescription_id = get_store().put(
+            {
+                "prescription": prescription,
+                "location": location,
+                "recommended_watts": recommended_watts,
+                "coverage_percentage": coverage_percentage,
+            }
+        )
+        session["prescription_id"] = prescription_id
+
+        response = {
+            "success": True,
+            "prescription": prescription,
+            "prescription_id": prescription_id,
+            "results_url": url_for("shared_results", prescription_id=prescription_id),
+        }
+        if simulate:
+            # Kept out of the session cookie; the hourly results are per request.
+            sim_sizes = sorted(set(engine.KIT_SIZES) | {kit_size})
+            response["simulation"] = {
+                "hourly_source": "pvwatts"
+                if "ac" in reference_data.get("outputs", {})
+                else "monthly",
+                "kits": engine.simulate_battery(reference_data, appliances, sim_sizes),
+            }
+        return jsonify(response)
 
-            worst_month_daily_wh_system = (min(monthly_kwh) * 1000) / 30
-            worst_month_daily_wh_per_w = worst_month_daily_wh_system / dummy_kit_size
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+MAX_BATCH_HOUSEHOLDS = 10000
 
-            # Calculate needed capacity with safety margins
-            # Needed kW = (daily_wh * 1.2 safety factor) / (wh_per_w * 0.8 efficiency factor)
-            needed_watts = (daily_wh * 1.2) / max(
-                0.001, (worst_month_daily_wh_per_w * 0.8)
+
+@app.route("/prescribe/batch", methods=["POST"])
+def prescribe_batch():
+    """Vectorized prescriptions for many households (one PVWatts lookup per location)"""
+    try:
+        data = request.json or {}
+        households = data.get("households") or []
+        if not households:
+            return jsonify({"success": False, "error": "No households provided"}), 400
+        if len(households) > MAX_BATCH_HOUSEHOLDS:
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "error": f"At most {MAX_BATCH_HOUSEHOLDS} households per batch",
+                    }
+                ),
+                400,
             )
 
-            # Round up to standard sizes
-            standard_sizes = [10, 20, 50, 100, 200, 300, 500, 1000]
-            for size in standard_sizes:
-                if size >= needed_watts:
-                    kit_size = size
-                    break
+        try:
+            kit_sizes = bulk.parse_kit_sizes(data.get("kit_sizes"))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        engine = get_engine()
+        kit_sizes = kit_sizes or engine.KIT_SIZES
+
+        # One reference profile per distinct location, fetched concurrently
+        rows = []
+        locations = {}
+        for household in households:
+            latitude = float(household.get("latitude"))
+            longitude = float(household.get("longitude"))
+            location_key = (round(latitude, 4), round(longitude, 4))
+            if location_key not in locations:
+                locations[location_key] = (latitude, longitude) + default_orientation(
+                    latitude
+                )
+            rows.append(location_key)
+
+        profiles = []
+        profile_index = {}
+        profile_errors = {}
+        fetched = get_reference_profiles(list(locations.values()))
+        for location_key, (reference_data, error) in zip(locations, fetched):
+            if error or not reference_data:
+                profile_errors[location_key] = (
+                    "Could not fetch solar data for this location."
+                )
             else:
-                kit_size = 1000
+                profile_index[location_key] = len(profiles)
+                profiles.append(reference_data)
+
+        valid = [i for i, key in enumerate(rows) if key in profile_index]
+        batch_result = engine.generate_prescriptions_batch(
+            [
+                {
+                    "appliances": households[i].get("appliances", []),
+                    "profile": profile_index[rows[i]],
+                    "coverage_percentage": int(
+                        households[i].get("coverage_percentage", 70)
+                    ),
+                    "kit_size": (
+                        int(households[i]["kit_size"])
+                        if households[i].get("kit_size")
+                        else None
+                    ),
+                }
+                for i in valid
+            ],
+            profiles,
+            kit_sizes=kit_sizes,
+        )
 
-        # Get PVWatts data for this location
-        # Convert kit size to kW (kit is in Watts)
-        system_capacity_kw = kit_size / 1000
+        results_list = [None] * len(households)
+        for row, record in zip(valid, batch_result.records()):
+            results_list[row] = record
+        for row, key in enumerate(rows):
+            if key in profile_errors:
+                results_list[row] = {"error": profile_errors[key]}
+            if "id" in households[row]:
+                results_list[row]["id"] = households[row]["id"]
+
+        return jsonify(
+            {"success": True, "kit_sizes": list(kit_sizes), "results": to_json(results_list)}
+        )
 
-        # NREL API has minimum system capacity of ~0.05 kW (50W)
-        # For smaller systems, use 0.1 kW and scale results proportionally
-        actual_capacity = system_capacity_kw
-        if system_capacity_kw < 0.05:
-            system_capacity_kw = 0.1  # Use minimum viable capacity for API
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
 
-        pvwatts_data, error = get_pvwatts_data(
-            system_capacity=system_capacity_kw,
-            module_type=0,  # Standard
-            array_type=1,  # Fixed - Roof Mounted
-            tilt=optimal_tilt,
-            azimuth=azimuth,
-            lat=latitude,
-            lon=longitude,
-            losses=14,  # Default losses
-        )
 
-        if error or not pvwatts_data:
+@app.route("/prescribe/bulk", methods=["POST"])
+def prescribe_bulk():
+    """Streamed prescriptions for an uploaded CSV of households (NDJSON or CSV)
+
+    Accepts a multipart upload ("file") or a raw text/csv body. Results are
+    written as each chunk of rows is prescribed, so neither the upload nor
+    the output is ever held in memory.
+    """
+    output_format = request.args.get("format", "ndjson")
+    if output_format not in bulk.FORMATS:
+        return jsonify({"success": False, "error": "format must be ndjson or csv"}), 400
+    try:
+        kit_sizes = bulk.parse_kit_sizes(request.args.get("kit_sizes"))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    upload = request.files.get("file")
+    try:
+        reader = bulk.read_households(upload.stream if upload else request.stream)
+    except bulk.BulkInputError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    response = Response(
+        stream_with_context(bulk.stream(reader, output_format, kit_sizes)),
+        mimetype="text/csv" if output_format == "csv" else "application/x-ndjson",
+    )
+    response.headers["Content-Disposition"] = (
+        f"attachment; filename=prescriptions.{output_format}"
+    )
+    response.headers["Cache-Control"] = "no-store"
+    # Let reverse proxies pass each chunk through as it is produced.
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@app.route("/prescribe/compare", methods=["POST"])
+def prescribe_compare():
+    """Rank every kit size and catalog product for one location (one PVWatts lookup)"""
+    try:
+        data = request.json or {}
+        latitude = float(data.get("latitude"))
+        longitude = float(data.get("longitude"))
+        coverage_percentage = int(data.get("coverage_percentage", 70))
+        appliances = data.get("appliances", [])
+        include_catalog = bool(data.get("include_catalog", True))
+
+        optimal_tilt, azimuth = default_orientation(latitude)
+        reference_data, error = get_reference_profile(
+            lat=latitude, lon=longitude, tilt=optimal_tilt, azimuth=azimuth
+        )
+        if error or not reference_data:
             return (
                 jsonify(
                     {
@@ -186,43 +471,78 @@ def prescribe():
                 400,
             )
 
-        # Scale results if we used a larger capacity than requested
-        if actual_capacity < 0.05 and "outputs" in pvwatts_data:
-            scale_factor = actual_capacity / system_capacity_kw
-            outputs = pvwatts_data["outputs"]
-            # Scale the energy outputs
-            if "ac_annual" in outputs:
-                outputs["ac_annual"] *= scale_factor
-            if "ac_monthly" in outputs:
-                outputs["ac_monthly"] = [
-                    x * scale_factor for x in outputs["ac_monthly"]
-                ]
-            if "dc_monthly" in outputs:
-                outputs["dc_monthly"] = [
-                    x * scale_factor for x in outputs["dc_monthly"]
-                ]
-
-        # Calculate prescription
-        prescription = engine.generate_prescription(
-            location=location,
-            latitude=latitude,
-            longitude=longitude,
-            kit_size=kit_size,
-            appliances=appliances,
-            pvwatts_data=pvwatts_data,
+        comparison = get_engine().compare_kits(
+            reference_data,
+            appliances,
             coverage_percentage=coverage_percentage,
+            catalog=get_catalog() if include_catalog else None,
         )
+        return jsonify({"success": True, **to_json(comparison)})
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
 
-        # Extract recommended wattage from suggestion if present
-        recommended_watts = _extract_recommended_watts(prescription)
 
-        # Store in session for results page
-        session["prescription"] = prescription
-        session["location"] = location
-        session["recommended_watts"] = recommended_watts
-        session["coverage_percentage"] = coverage_percentage
+@app.route("/prescribe/requote", methods=["POST"])
+def prescribe_requote():
+    """Re-rate kits for new appliances at an already-looked-up location (no upstream call)"""
+    try:
+        data = request.json or {}
+        latitude = float(data.get("latitude"))
+        longitude = float(data.get("longitude"))
+        kit_size = int(data.get("kit_size", 0))
+        coverage_percentage = int(data.get("coverage_percentage", 70))
+        appliances = data.get("appliances", [])
 
-        return jsonify({"success": True, "prescription": prescription})
+        optimal_tilt, azimuth = default_orientation(latitude)
+        reference_data = get_cached_reference_profile(
+            lat=latitude, lon=longitude, tilt=optimal_tilt, azimuth=azimuth
+        )
+        if not reference_data:
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "error": "No solar data on hand for this location. Submit a full prescription first.",
+                    }
+                ),
+                404,
+            )
+
+        engine = get_engine()
+        table = get_verdict_table(
+            engine,
+            make_cache_key(latitude, longitude, optimal_tilt, azimuth, 1, 0, 14),
+            reference_data,
+        )
+        daily_wh, _ = engine.calculate_daily_energy_need(appliances)
+        codes = table.codes(daily_wh, coverage_percentage)
+
+        response = {
+            "success": True,
+            "daily_wh": round(daily_wh, 0),
+            "coverage_percentage": coverage_percentage,
+            "verdicts": {
+                str(kit): VERDICTS[code] for kit, code in zip(table.kit_sizes, codes.tolist())
+            },
+            "recommended_kit": table.smallest_approved(daily_wh, coverage_percentage),
+        }
+        if kit_size:
+            response["kit_size"] = kit_size
+            if kit_size in table.kit_sizes:
+                response["verdict"] = table.verdict(
+                    table.kit_sizes.index(kit_size), daily_wh, coverage_percentage
+                )
+            else:
+                response["verdict"] = engine.determine_verdict(
+                    engine.get_daily_production(
+                        scale_to_kit(reference_data, kit_size), kit_size
+                    ),
+                    daily_wh,
+                    kit_size,
+                    coverage_percentage,
+                )
+        return jsonify(to_json(response))
 
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -230,13 +550,50 @@ def prescribe():
 
 @app.route("/results")
 def results():
-    """Results page showing prescription details"""
-    prescription = session.get("prescription")
-    location = session.get("location")
-    coverage_percentage = session.get("coverage_percentage", 70)
+    """Results page for the visitor's latest prescription"""
+    prescription_id = session.get("prescription_id")
+    record = get_store().get(prescription_id)
+    if not record:
+        return redirect("/")
+    response = _cached_page(("results", prescription_id), lambda: _render_results(record))
+    # Depends on the visitor's session: browsers may keep it, shared caches may not.
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
 
-    if not prescription:
+
+@app.route("/results/<prescription_id>")
+def shared_results(prescription_id):
+    """Results page addressed by prescription ID (shareable, cacheable)"""
+    record = get_store().get(prescription_id)
+    if not record:
         return redirect("/")
+    response = _cached_page(("results", prescription_id), lambda: _render_results(record))
+    # IDs hash the prescription (minus its timestamp), so a given URL never changes.
+    response.headers["Cache-Control"] = "public, max-age=3600"
+    return response
+
+
+def _cached_page(key, render):
+    """
+    HTML response for key from the render cache, rendering on a miss.
+
+    The response carries the page's ETag, so a matching If-None-Match gets a 304.
+    """
+    cache = get_render_cache()
+    entry = cache.get(key)
+    if entry is None:
+        entry = cache.put(key, render())
+    etag, body = entry
+    response = app.response_class(body, mimetype="text/html")
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def _render_results(record):
+    """Render results.html for a stored prescription record"""
+    prescription = record["prescription"]
+    location = record.get("location")
+    coverage_percentage = record.get("coverage_percentage", 70)
 
     suggestion_prefix = None
     suggestion_suffix = None
@@ -305,50 +662,16 @@ def results():
 
 @app.route("/api/geocode")
 def geocode():
-    """Location autocomplete using Nominatim (OpenStreetMap) - free, no API key needed.
+    """Location autocomplete: local gazetteer, then a cached Nominatim fallback.
 
     Returns a dict of display_name -> {lat, lon}.
-    This endpoint intentionally does not hardcode towns/cities.
     """
     query = request.args.get("q", "").strip()
     if not query:
         return jsonify({})
 
     try:
-        # Use Nominatim (OpenStreetMap) - free geocoding service
-        url = "https://nominatim.openstreetmap.org/search"
-        headers = {"User-Agent": "SolarPrescriptionApp/1.0"}
-        params = {"q": query, "format": "json", "limit": 8, "addressdetails": 1}
-
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        if response.status_code != 200:
-            return jsonify({})
-
-        results = response.json() or []
-        matches = {}
-        for item in results[:8]:
-            lat = item.get("lat")
-            lon = item.get("lon")
-
-            if lat is not None and lon is not None:
-                # Build display name from address components
-                address = item.get("address", {})
-                name_parts = []
-
-                # Prefer town/village/city
-                for key in ["town", "village", "city", "county", "state", "country"]:
-                    val = address.get(key)
-                    if val and val not in name_parts:
-                        name_parts.append(val)
-
-                if name_parts:
-                    display_name = ", ".join(name_parts)
-                else:
-                    display_name = item.get("display_name", "Unknown")
-
-                matches[display_name] = {"lat": float(lat), "lon": float(lon)}
-
-        return jsonify(matches)
+        return jsonify(geocode_query(query))
     except Exception as e:
         print(f"Geocoding error: {e}")
         return jsonify({})
@@ -359,29 +682,24 @@ def products():
     """Browse certified VeraSol products by wattage"""
     watts = request.args.get("watts", type=int)
     if not watts:
-        return render_template("products.html", products=None, watts=None)
+        return _cached_page(
+            ("products", None), lambda: render_template("products.html", products=None, watts=None)
+        )
 
     try:
-        # Load the CSV
-        csv_path = os.path.join(
-            os.path.dirname(__file__), "data", "all_solar_kits_combined.csv"
-        )
+        # Indexed, in-memory catalog (reloaded when the CSV changes); the page
+        # only changes with the catalog version and the filters.
+        catalog = get_catalog()
+        chemistry = request.args.get("chemistry")
+        lights = request.args.get("lights", type=int)
+
+        def render():
+            products_list = catalog.by_watts(
+                watts, chemistry=chemistry, min_light_points=lights
+            )
+            return render_template("products.html", products=products_list, watts=watts)
 
-        products_list: list[dict] = []
-        with open(csv_path, "r", newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                raw_power = row.get("PV Module Maximum Power [W]")
-                if raw_power is None:
-                    continue
-                try:
-                    power = int(float(str(raw_power).strip()))
-                except (TypeError, ValueError):
-                    continue
-                if power == watts:
-                    products_list.append(row)
-
-        return render_template("products.html", products=products_list, watts=watts)
+        return _cached_page(("products", catalog.version, watts, chemistry, lights), render)
     except Exception as e:
         print(f"Error loading products: {e}")
         return render_template(
@@ -390,15 +708,13 @@ def products():
 
 
 if __name__ == "__main__":
+    # Development server. Production: python -m solar_prescription serve (serve.py).
     port = int(os.environ.get("PORT", 5050))
-    debug_env = os.environ.get("FLASK_DEBUG")
-    debug = (debug_env or "").strip().lower() in {
+    # Debug mode (reloader + interactive debugger) only when explicitly requested.
+    debug = os.environ.get("FLASK_DEBUG", "").strip().lower() in {
         "1",
         "true",
         "yes",
         "on",
     }
-    # Default to debug=True for local development unless explicitly disabled.
-    if debug_env is None or not str(debug_env).strip():
-        debug = True
     app.run(host="0.0.0.0", port=port, debug=debug, use_reloader=debug)
@@ -0,0 +1,235 @@
+"""
+Static Asset Pipeline
+Content-hashed copies of everything under static/, with precompressed
+.br/.gz variants for text assets and WebP versions of PNG/JPEG images,
+served from /assets/ with immutable Cache-Control headers.
+
+Templates call asset_url('css/styles.css') (and webp_url('images/hero.png')
+for a <picture> source). A changed file gets a new URL, so browsers can keep
+every asset for a year and repeat visits fetch nothing. Files missing from the
+manifest fall back to plain /static URLs.
+
+Brotli and Pillow are optional: without them the pipeline still emits gzip
+variants, and images are served as-is.
+
+Usage:
+  python assets.py        # build (or refresh) build/assets/ and its manifest
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+
+from flask import abort, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # optional: .br variants
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # optional: WebP variants
+    Image = None
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+DEFAULT_BUILD_DIR = os.path.join(os.path.dirname(__file__), "build", "assets")
+MANIFEST_NAME = "manifest.json"
+
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map"}
+WEBP_SOURCES = {".png", ".jpg", ".jpeg"}
+WEBP_QUALITY = 80
+# WebP copies are scaled to 2x their CSS display width (styles.css max-width).
+WEBP_MAX_WIDTH = {"images/hero.png": 1200, "images/logo.png": 300}
+DEFAULT_WEBP_MAX_WIDTH = 1600
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Preferred first; each maps to the file suffix of its variant.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _hashed_name(rel_path, digest, ext=None):
+    stem, original_ext = os.path.splitext(rel_path)
+    return f"{stem}.{digest}{ext or original_ext}"
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _webp(source_path, max_width):
+    from io import BytesIO
+
+    with Image.open(source_path) as image:
+        image.load()
+        if image.width > max_width:
+            height = round(image.height * max_width / image.width)
+            image = image.resize((max_width, height), Image.LANCZOS)
+        out = BytesIO()
+        image.save(out, "WEBP", quality=WEBP_QUALITY, method=6)
+        return out.getvalue()
+
+
+def build(source_dir=STATIC_DIR, output_dir=DEFAULT_BUILD_DIR):
+    """
+    Fingerprint every file under source_dir into output_dir and write the manifest.
+
+    Outputs are named by content hash, so unchanged files are not re-encoded;
+    files no longer referenced by the manifest are removed.
+    """
+    manifest = {}
+    for root, _, files in os.walk(source_dir):
+        for name in sorted(files):
+            source_path = os.path.join(root, name)
+            rel_path = os.path.relpath(source_path, source_dir).replace(os.sep, "/")
+            with open(source_path, "rb") as f:
+                data = f.read()
+            digest = hashlib.blake2b(data, digest_size=5).hexdigest()
+            ext = os.path.splitext(name)[1].lower()
+
+            hashed = _hashed_name(rel_path, digest)
+            target = os.path.join(output_dir, hashed)
+            if not os.path.exists(target):
+                _write_atomic(target, data)
+            entry = {"path": hashed, "bytes": len(data), "encodings": []}
+
+            if ext in COMPRESSIBLE:
+                for encoding, suffix in ENCODINGS:
+                    variant = target + suffix
+                    if not os.path.exists(variant):
+                        if encoding == "br":
+                            if brotli is None:
+                                continue
+                            compressed = brotli.compress(data, quality=11)
+                        else:
+                            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                        if len(compressed) >= len(data):
+                            continue
+                        _write_atomic(variant, compressed)
+                    entry["encodings"].append(encoding)
+
+            if ext in WEBP_SOURCES and Image is not None:
+                webp_name = _hashed_name(rel_path, digest, ".webp")
+                webp_target = os.path.join(output_dir, webp_name)
+                if not os.path.exists(webp_target):
+                    max_width = WEBP_MAX_WIDTH.get(rel_path, DEFAULT_WEBP_MAX_WIDTH)
+                    _write_atomic(webp_target, _webp(source_path, max_width))
+                entry["webp"] = webp_name
+
+            manifest[rel_path] = entry
+
+    _write_atomic(
+        os.path.join(output_dir, MANIFEST_NAME),
+        json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"),
+    )
+    _prune(output_dir, manifest)
+    return manifest
+
+
+def _prune(output_dir, manifest):
+    keep = {MANIFEST_NAME}
+    for entry in manifest.values():
+        keep.add(entry["path"])
+        keep.update(entry["path"] + suffix for _, suffix in ENCODINGS)
+        if "webp" in entry:
+            keep.add(entry["webp"])
+    for root, _, files in os.walk(output_dir):
+        for name in files:
+            rel_path = os.path.relpath(os.path.join(root, name), output_dir).replace(os.sep, "/")
+            if rel_path not in keep and not name.endswith(".tmp"):
+                os.remove(os.path.join(root, name))
+
+
+class AssetManifest:
+    """Source path -> fingerprinted outputs, plus the reverse map used when serving."""
+
+    def __init__(self, output_dir, manifest):
+        self.output_dir = output_dir
+        self.entries = manifest
+        self.served = {}
+        for entry in manifest.values():
+            self.served[entry["path"]] = tuple(entry["encodings"])
+            if "webp" in entry:
+                self.served[entry["webp"]] = ()
+
+    def url(self, filename):
+        entry = self.entries.get(filename)
+        if entry is None:
+            return url_for("static", filename=filename)
+        return url_for("asset", filename=entry["path"])
+
+    def webp_url(self, filename):
+        entry = self.entries.get(filename)
+        if entry is None or "webp" not in entry:
+            return None
+        return url_for("asset", filename=entry["webp"])
+
+    def send(self, filename):
+        encodings = self.served.get(filename)
+        if encodings is None:
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        encoding, suffix = None, ""
+        for candidate, candidate_suffix in ENCODINGS:
+            if candidate in encodings and request.accept_encodings[candidate]:
+                encoding, suffix = candidate, candidate_suffix
+                break
+
+        response = send_from_directory(
+            self.output_dir, filename + suffix, mimetype=mimetype, max_age=31536000
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if encodings:
+            response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+def install(app, source_dir=STATIC_DIR, output_dir=None):
+    """
+    Build (or refresh) the fingerprinted assets and register /assets/<filename>
+    plus the asset_url()/webp_url() template helpers.
+
+    ASSETS_BUILD=0 skips the build and uses the existing manifest (for
+    deployments that run `python assets.py` at build time).
+    """
+    output_dir = output_dir or os.getenv("ASSETS_BUILD_DIR") or DEFAULT_BUILD_DIR
+    manifest = {}
+    if os.getenv("ASSETS_BUILD", "1").strip().lower() in {"0", "false", "no", "off"}:
+        try:
+            with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            print("Asset manifest not found; serving assets from /static")
+    else:
+        try:
+            manifest = build(source_dir, output_dir)
+        except OSError as e:
+            print(f"Asset build failed, serving assets from /static: {e}")
+
+    assets = AssetManifest(output_dir, manifest)
+    app.add_url_rule("/assets/<path:filename>", "asset", assets.send)
+    app.add_template_global(assets.url, "asset_url")
+    app.add_template_global(assets.webp_url, "webp_url")
+    return assets
+
+
+if __name__ == "__main__":
+    output = os.getenv("ASSETS_BUILD_DIR") or DEFAULT_BUILD_DIR
+    built = build(STATIC_DIR, output)
+    for source, entry in sorted(built.items()):
+        sizes = [f"{entry['bytes']:,} B"]
+        for encoding, suffix in ENCODINGS:
+            if encoding in entry["encodings"]:
+                sizes.append(f"{encoding} {os.path.getsize(os.path.join(output, entry['path'] + suffix)):,} B")
+        if "webp" in entry:
+            sizes.append(f"webp {os.path.getsize(os.path.join(output, entry['webp'])):,} B")
+        print(f"{source:24} -> {entry['path']:32} {', '.join(sizes)}")
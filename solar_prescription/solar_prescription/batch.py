@@ -0,0 +1,196 @@
+"""
+Batch Prescription Engine
+NumPy versions of the engine's energy, production and verdict steps, evaluated
+for N households x M kit sizes at once.
+
+Every array expression mirrors the scalar code in prescription_engine.py
+operation-for-operation so the verdicts are identical, not just close.
+"""
+
+import numpy as np
+
+from models import Verdict
+from pvwatts import REFERENCE_CAPACITY_KW
+
+# Verdict codes, ordered worst to best.
+VERDICTS = ("insufficient", "marginal", "good", "excellent")
+INSUFFICIENT, MARGINAL, GOOD, EXCELLENT = range(4)
+
+# Per-target thresholds from determine_verdict:
+# (excellent_avg, excellent_worst, good_avg, good_worst, marginal_avg, marginal_worst).
+# Only the 90% target has a worst-month condition for "excellent".
+VERDICT_THRESHOLDS = {
+    50: (80, -np.inf, 60, 40, 50, 30),
+    70: (120, -np.inf, 100, 80, 80, 60),
+    90: (150, 100, 120, 90, 100, 80),
+}
+COVERAGE_TARGETS = (50, 70, 90)
+_THRESHOLD_TABLE = np.array(
+    [VERDICT_THRESHOLDS[t] for t in COVERAGE_TARGETS], dtype=np.float64
+)
+
+
+def energy_need(engine, appliance_lists):
+    """Daily Wh need per household, shape (N,)."""
+    wh_per_unit = {
+        app_id: spec.watts * spec.hours for app_id, spec in engine.APPLIANCE_SPECS.items()
+    }
+    rows = []
+    weights = []
+    for row, appliances in enumerate(appliance_lists):
+        for app in appliances:
+            unit_wh = wh_per_unit.get(app.get("id"))
+            if unit_wh is not None:
+                rows.append(row)
+                weights.append(unit_wh * app.get("quantity", 1))
+    # bincount accumulates each household's entries in list order, like the scalar sum.
+    return np.bincount(
+        np.asarray(rows, dtype=np.intp),
+        weights=np.asarray(weights, dtype=np.float64),
+        minlength=len(appliance_lists),
+    )
+
+
+def reference_arrays(reference_profiles):
+    """Stack 1 kW reference profiles into (annual (L,), worst_month (L,)) kWh arrays."""
+    annual = np.empty(len(reference_profiles), dtype=np.float64)
+    worst_month = np.empty(len(reference_profiles), dtype=np.float64)
+    for i, data in enumerate(reference_profiles):
+        outputs = (data or {}).get("outputs", {})
+        monthly = outputs.get("ac_monthly", [])
+        annual[i] = outputs.get("ac_annual", 0)
+        worst_month[i] = min(monthly) if monthly else 0.0
+    return annual, worst_month
+
+
+def daily_production(annual_kwh, worst_month_kwh, kit_sizes):
+    """
+    Daily average and worst-month production (Wh) for each profile x kit size.
+
+    Matches pvwatts.scale_to_kit followed by SolarPrescription.get_daily_production.
+    """
+    scale = (np.asarray(kit_sizes, dtype=np.float64) / 1000) / REFERENCE_CAPACITY_KW
+    daily_avg = (annual_kwh[:, None] * scale[None, :]) * 1000 / 365
+    # Scaling by a positive factor preserves order, so min-then-scale == scale-then-min.
+    worst_month_daily = ((worst_month_kwh[:, None] * scale[None, :]) * 1000) / 30
+    return daily_avg, worst_month_daily
+
+
+def tested_daily_energy(engine, kit_sizes):
+    """Tested daily Wh per kit size from PRODUCT_SPECS (0 where untested)."""
+    return np.array(
+        [
+            (engine.PRODUCT_SPECS[k].get("daily_energy_available", 0) if k in engine.PRODUCT_SPECS else 0)
+            for k in kit_sizes
+        ],
+        dtype=np.float64,
+    )
+
+
+def verdicts(
+    engine, daily_avg, worst_month_daily, need, kit_sizes, coverage_percentage,
+    tested_energy=None,
+):
+    """
+    Vectorized SolarPrescription.determine_verdict.
+
+    daily_avg/worst_month_daily are (N, M), need and coverage_percentage (N,).
+    tested_energy (M,) overrides the tested daily Wh looked up from
+    engine.PRODUCT_SPECS by kit size (0 = no tested value).
+    Returns a dict of (N, M) arrays: verdict codes, coverages, usable energy and
+    whether the product's tested value replaced the theoretical one.
+    """
+    usable = daily_avg * 0.8
+    worst_usable = worst_month_daily * 0.8
+
+    if tested_energy is None:
+        tested_energy = tested_daily_energy(engine, kit_sizes)
+    tested = np.asarray(tested_energy, dtype=np.float64)[None, :]
+    used_tested = (tested > 0) & (tested < usable)
+    usable = np.where(used_tested, tested, usable)
+    worst_usable = np.where(used_tested, tested * 0.9, worst_usable)
+
+    need_col = np.asarray(need, dtype=np.float64)[:, None]
+    has_need = need_col > 0
+    safe_need = np.where(has_need, need_col, 1.0)
+    avg_coverage = np.where(has_need, usable / safe_need * 100, 0.0)
+    worst_coverage = np.where(has_need, worst_usable / safe_need * 100, 0.0)
+
+    # Anything other than 50/90 falls back to the balanced 70% thresholds.
+    coverage = np.asarray(coverage_percentage)
+    target_row = np.where(coverage == 50, 0, np.where(coverage == 90, 2, 1))
+    (exc_avg, exc_worst, good_avg, good_worst, marg_avg, marg_worst) = (
+        _THRESHOLD_TABLE[target_row].T[:, :, None]
+    )
+
+    excellent = (avg_coverage >= exc_avg) & (worst_coverage >= exc_worst)
+    good = (avg_coverage >= good_avg) & (worst_coverage >= good_worst)
+    marginal = (avg_coverage >= marg_avg) | (worst_coverage >= marg_worst)
+    codes = np.select(
+        [excellent, good, marginal], [EXCELLENT, GOOD, MARGINAL], INSUFFICIENT
+    ).astype(np.int8)
+
+    return {
+        "codes": codes,
+        "avg_coverage": avg_coverage,
+        "worst_coverage": worst_coverage,
+        "usable_daily": usable,
+        "worst_month_usable": worst_usable,
+        "used_tested_value": np.broadcast_to(used_tested, codes.shape),
+    }
+
+
+class BatchPrescriptions:
+    """Columnar result of SolarPrescription.generate_prescriptions_batch."""
+
+    def __init__(self, kit_sizes, need, coverage_percentage, verdict_arrays, kit_size=None):
+        self.kit_sizes = list(kit_sizes)
+        self.need = need
+        self.coverage_percentage = coverage_percentage
+        self.codes = verdict_arrays["codes"]
+        self.avg_coverage = verdict_arrays["avg_coverage"]
+        self.worst_coverage = verdict_arrays["worst_coverage"]
+        self.usable_daily = verdict_arrays["usable_daily"]
+        self.worst_month_usable = verdict_arrays["worst_month_usable"]
+        self.used_tested_value = verdict_arrays["used_tested_value"]
+        self.kit_size = kit_size
+
+        # Smallest kit rated good or better, -1 when none qualifies.
+        meets = self.codes >= GOOD
+        first = meets.argmax(axis=1)
+        self.recommended_index = np.where(meets.any(axis=1), first, -1)
+
+    def __len__(self):
+        return len(self.need)
+
+    def verdict(self, row, col):
+        """determine_verdict's Verdict for household row and kit column."""
+        return Verdict(
+            verdict=VERDICTS[self.codes[row, col]],
+            avg_coverage=round(float(self.avg_coverage[row, col]), 1),
+            worst_coverage=round(float(self.worst_coverage[row, col]), 1),
+            usable_daily=round(float(self.usable_daily[row, col]), 0),
+            worst_month_usable=round(float(self.worst_month_usable[row, col]), 0),
+            used_tested_value=bool(self.used_tested_value[row, col]),
+            coverage_percentage=int(self.coverage_percentage[row]),
+        )
+
+    def record(self, row):
+        """JSON-ready summary for one household."""
+        rec_index = int(self.recommended_index[row])
+        record = {
+            "daily_wh": round(float(self.need[row]), 0),
+            "coverage_percentage": int(self.coverage_percentage[row]),
+            "verdicts": {
+                str(kit): VERDICTS[code] for kit, code in zip(self.kit_sizes, self.codes[row])
+            },
+            "recommended_kit": self.kit_sizes[rec_index] if rec_index >= 0 else None,
+        }
+        if self.kit_size is not None and self.kit_size[row] in self.kit_sizes:
+            record["kit_size"] = int(self.kit_size[row])
+            record["verdict"] = self.verdict(row, self.kit_sizes.index(self.kit_size[row]))
+        return record
+
+    def records(self):
+        for row in range(len(self)):
+            yield self.record(row)
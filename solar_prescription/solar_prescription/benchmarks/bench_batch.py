@@ -0,0 +1,84 @@
+"""Benchmark: scalar engine loop vs generate_prescriptions_batch.
+
+Both paths evaluate every household against every KIT_SIZE.
+
+Usage:
+  python benchmarks/bench_batch.py [--households 10000] [--locations 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prescription_engine import SolarPrescription  # noqa: E402
+from pvwatts import scale_to_kit  # noqa: E402
+
+
+def make_workload(n_households: int, n_locations: int, seed: int = 7):
+    rng = random.Random(seed)
+    engine = SolarPrescription()
+    profiles = []
+    for _ in range(n_locations):
+        monthly = [rng.uniform(60, 180) for _ in range(12)]
+        profiles.append({"outputs": {"ac_annual": sum(monthly), "ac_monthly": monthly}})
+    households = []
+    for _ in range(n_households):
+        ids = rng.sample(list(engine.APPLIANCE_SPECS), rng.randint(1, 5))
+        households.append(
+            {
+                "appliances": [{"id": i, "quantity": rng.randint(1, 4)} for i in ids],
+                "profile": rng.randrange(n_locations),
+                "coverage_percentage": rng.choice([50, 70, 90]),
+            }
+        )
+    return engine, households, profiles
+
+
+def scalar(engine, households, profiles):
+    """Today's path: one generate_prescription call per household per kit size."""
+    for household in households:
+        reference = profiles[household["profile"]]
+        for kit in engine.KIT_SIZES:
+            engine.generate_prescription(
+                location="",
+                latitude=0.0,
+                longitude=0.0,
+                kit_size=kit,
+                appliances=household["appliances"],
+                pvwatts_data=scale_to_kit(reference, kit),
+                coverage_percentage=household["coverage_percentage"],
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--households", type=int, default=10000)
+    parser.add_argument("--locations", type=int, default=200)
+    args = parser.parse_args()
+
+    engine, households, profiles = make_workload(args.households, args.locations)
+
+    start = time.perf_counter()
+    scalar(engine, households, profiles)
+    scalar_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine.generate_prescriptions_batch(households, profiles)
+    batch_s = time.perf_counter() - start
+
+    n = len(households)
+    print(f"households x kits:  {n} x {len(engine.KIT_SIZES)}")
+    print(f"scalar:  {scalar_s * 1e6 / n:8.2f} us/household")
+    print(f"batch:   {batch_s * 1e6 / n:8.2f} us/household")
+    print(f"speedup: {scalar_s / batch_s:8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+"""Benchmark: POST /prescribe throughput with a per-request engine vs the shared one.
+
+PVWatts is stubbed so the numbers isolate app + engine cost.
+
+Usage:
+  python benchmarks/bench_engine_singleton.py [--requests 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+from prescription_engine import SolarPrescription, get_engine  # noqa: E402
+
+
+REFERENCE_PROFILE = {
+    "outputs": {
+        "ac_annual": 1460.0,
+        "ac_monthly": [119.3, 121.3, 129.7, 120.3, 110.7, 106.0, 102.0, 107.0, 114.3, 122.3, 119.7, 120.7],
+    }
+}
+
+PAYLOAD = {
+    "location": "Nairobi, Kenya",
+    "latitude": -1.2921,
+    "longitude": 36.8219,
+    "kit_size": 50,
+    "coverage_percentage": 70,
+    "appliances": [{"id": "led_bulb", "quantity": 3}, {"id": "phone_charger", "quantity": 2}],
+}
+
+
+def _run(client, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        response = client.post("/prescribe", json=PAYLOAD)
+        assert response.status_code == 200
+    return n / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    app_module.get_reference_profile = lambda **kwargs: (REFERENCE_PROFILE, None)
+    client = app_module.app.test_client()
+    _run(client, 50)  # warm-up
+
+    app_module.get_engine = SolarPrescription
+    before = _run(client, args.requests)
+
+    app_module.get_engine = get_engine
+    after = _run(client, args.requests)
+
+    print(f"per-request SolarPrescription(): {before:8.0f} req/s")
+    print(f"shared get_engine():            {after:8.0f} req/s")
+    print(f"speedup:                        {after / before:8.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+"""Benchmark: slotted dataclasses vs the dicts the engine used to build.
+
+Measures retained memory for the per-kit verdicts of a batch run (households x
+KIT_SIZES), and the cost of serializing a full prescription with
+models.to_json vs dataclasses.asdict.
+
+Usage:
+  python benchmarks/bench_models.py [--households 10000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch import make_workload  # noqa: E402
+from models import to_json  # noqa: E402
+from pvwatts import scale_to_kit  # noqa: E402
+
+
+def retained_bytes(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--households", type=int, default=10000)
+    args = parser.parse_args()
+
+    engine, households, profiles = make_workload(args.households, 200)
+    result = engine.generate_prescriptions_batch(households, profiles)
+    cells = [(row, col) for row in range(len(result)) for col in range(len(result.kit_sizes))]
+
+    def as_objects():
+        return [result.verdict(row, col) for row, col in cells]
+
+    def as_dicts():
+        # The dict shape determine_verdict returned before models.Verdict.
+        return [dataclasses.asdict(result.verdict(row, col)) for row, col in cells]
+
+    object_bytes = retained_bytes(as_objects)
+    dict_bytes = retained_bytes(as_dicts)
+
+    prescription = engine.generate_prescription(
+        location="Nairobi, Kenya",
+        latitude=-1.29,
+        longitude=36.82,
+        kit_size=100,
+        appliances=households[0]["appliances"],
+        pvwatts_data=scale_to_kit(profiles[0], 100),
+    )
+    n = 20000
+    start = time.perf_counter()
+    for _ in range(n):
+        to_json(prescription)
+    to_json_us = (time.perf_counter() - start) * 1e6 / n
+    start = time.perf_counter()
+    for _ in range(n):
+        dataclasses.asdict(prescription)
+    asdict_us = (time.perf_counter() - start) * 1e6 / n
+
+    print(f"verdicts held:       {len(cells)}")
+    print(f"dicts:               {dict_bytes / len(cells):8.1f} B/verdict")
+    print(f"Verdict (slots):     {object_bytes / len(cells):8.1f} B/verdict")
+    print(f"memory saved:        {1 - object_bytes / dict_bytes:8.1%}")
+    print(f"asdict(prescription): {asdict_us:7.1f} us")
+    print(f"to_json(prescription):{to_json_us:7.1f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
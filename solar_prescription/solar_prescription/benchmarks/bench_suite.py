@@ -0,0 +1,238 @@
+"""pytest-benchmark suite for the engine hot paths and the Flask routes.
+
+Each benchmark replays a synthetic workload of 1, 100 or 10k households.
+PVWatts is stubbed in-process (cache disabled, so every request goes through
+the lookup path); /api/geocode falls back to upstream_stub for names the
+gazetteer does not know.
+
+Usage (from the app directory):
+  pip install -r requirements-dev.txt
+  python -m pytest benchmarks/bench_suite.py --benchmark-json=benchmarks/baselines/<name>.json
+  python benchmarks/compare.py benchmarks/baselines/<base>.json benchmarks/baselines/<name>.json
+
+Record <base> from the base commit on the same machine; see README.
+
+Only the 1/100-household sizes:
+  python -m pytest benchmarks/bench_suite.py -k "not 10000"
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+import geocoding  # noqa: E402
+import pvwatts  # noqa: E402
+from catalog import get_catalog  # noqa: E402
+from prescription_engine import get_engine  # noqa: E402
+from prescription_store import PrescriptionStore  # noqa: E402
+from upstream_stub import StubUpstreamServer, synthetic_pvwatts  # noqa: E402
+
+WORKLOAD_SIZES = [1, 100, 10_000]
+# Rounds for workloads too slow for pytest-benchmark's own calibration.
+LARGE_WORKLOAD = 1_000
+LARGE_WORKLOAD_ROUNDS = 3
+SEED = 7
+
+
+def make_households(n, seed=SEED):
+    """Deterministic households: location, kit size, appliances and coverage target."""
+    rng = random.Random(seed)
+    engine = get_engine()
+    # ~200 distinct locations, like a regional rollout
+    locations = [
+        (round(rng.uniform(-30, 30), 4), round(rng.uniform(-20, 45), 4)) for _ in range(200)
+    ]
+    households = []
+    for i in range(n):
+        lat, lon = rng.choice(locations)
+        ids = rng.sample(list(engine.APPLIANCE_SPECS), rng.randint(1, 5))
+        households.append(
+            {
+                "location": f"Village {i}",
+                "latitude": lat,
+                "longitude": lon,
+                "kit_size": rng.choice(engine.KIT_SIZES),
+                "coverage_percentage": rng.choice([50, 70, 90]),
+                "appliances": [{"id": a, "quantity": rng.randint(1, 4)} for a in ids],
+            }
+        )
+    return households
+
+
+def run(benchmark, fn, n):
+    if n >= LARGE_WORKLOAD:
+        return benchmark.pedantic(fn, rounds=LARGE_WORKLOAD_ROUNDS, iterations=1)
+    return benchmark(fn)
+
+
+class _StubPVWattsClient:
+    """In-process PVWatts: synthetic outputs, no sockets."""
+
+    def get_json(self, url, params=None, **kwargs):
+        return synthetic_pvwatts(float(params["lat"]), float(params["system_capacity"]))
+
+    async def arun(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    store = PrescriptionStore(path=":memory:")
+    monkeypatch.setattr(app_module, "get_store", lambda: store)
+    monkeypatch.setattr(pvwatts, "get_cache", lambda: None)
+    monkeypatch.setattr(pvwatts, "get_client", lambda: _StubPVWattsClient())
+    app_module.app.config.update(TESTING=True)
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def nominatim_stub(monkeypatch):
+    with StubUpstreamServer() as server:
+        monkeypatch.setattr(geocoding, "NOMINATIM_SEARCH_URL", server.nominatim_url)
+        monkeypatch.setattr(geocoding, "_nominatim_limiter", geocoding.RateLimiter(0))
+        monkeypatch.setattr(
+            geocoding,
+            "_nominatim_cache",
+            geocoding.TTLCache(geocoding.GEOCODE_CACHE_TTL, geocoding.GEOCODE_CACHE_ENTRIES),
+        )
+        yield server
+
+
+# -- Engine ------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("n", WORKLOAD_SIZES)
+def test_calculate_daily_energy_need(benchmark, n):
+    engine = get_engine()
+    households = make_households(n)
+
+    def workload():
+        for household in households:
+            engine.calculate_daily_energy_need(household["appliances"])
+
+    run(benchmark, workload, n)
+
+
+@pytest.mark.parametrize("n", WORKLOAD_SIZES)
+def test_determine_verdict(benchmark, n):
+    engine = get_engine()
+    cases = []
+    for household in make_households(n):
+        need, _ = engine.calculate_daily_energy_need(household["appliances"])
+        reference = synthetic_pvwatts(household["latitude"], pvwatts.REFERENCE_CAPACITY_KW)
+        production = engine.get_daily_production(
+            pvwatts.scale_to_kit(reference, household["kit_size"]), household["kit_size"]
+        )
+        cases.append((production, need, household["kit_size"], household["coverage_percentage"]))
+
+    def workload():
+        for production, need, kit_size, coverage in cases:
+            engine.determine_verdict(production, need, kit_size, coverage)
+
+    run(benchmark, workload, n)
+
+
+@pytest.mark.parametrize("n", WORKLOAD_SIZES)
+def test_generate_prescription(benchmark, n):
+    engine = get_engine()
+    households = make_households(n)
+    references = {}
+    for household in households:
+        key = (household["latitude"], household["kit_size"])
+        if key not in references:
+            reference = synthetic_pvwatts(household["latitude"], pvwatts.REFERENCE_CAPACITY_KW)
+            references[key] = pvwatts.scale_to_kit(reference, household["kit_size"])
+
+    def workload():
+        for household in households:
+            engine.generate_prescription(
+                household["location"],
+                household["latitude"],
+                household["longitude"],
+                household["kit_size"],
+                household["appliances"],
+                references[(household["latitude"], household["kit_size"])],
+                household["coverage_percentage"],
+            )
+
+    run(benchmark, workload, n)
+
+
+# Hourly battery simulation of every kit size for one household (moved here
+# from the unit suite, where a wall-clock bound would flake on shared CI).
+SIMULATION_BUDGET_SECONDS = 0.05
+
+
+def test_simulate_battery(benchmark):
+    engine = get_engine()
+    household = make_households(1)[0]
+    reference = synthetic_pvwatts(
+        household["latitude"], pvwatts.REFERENCE_CAPACITY_KW, hourly=True
+    )
+
+    results = benchmark(engine.simulate_battery, reference, household["appliances"])
+
+    assert len(results) == len(engine.KIT_SIZES)
+    if benchmark.stats is not None:  # None with --benchmark-disable
+        assert benchmark.stats.stats.min < SIMULATION_BUDGET_SECONDS
+
+
+# -- Routes ------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("n", WORKLOAD_SIZES)
+def test_prescribe_route(benchmark, client, n):
+    households = make_households(n)
+
+    def workload():
+        for household in households:
+            response = client.post("/prescribe", json=household)
+            assert response.status_code == 200
+
+    run(benchmark, workload, n)
+
+
+@pytest.mark.parametrize("n", WORKLOAD_SIZES)
+def test_products_route(benchmark, client, n):
+    rng = random.Random(SEED)
+    catalog = get_catalog()
+    wattages = sorted(set(catalog.watts[i] for i in catalog.index_range(min_watts=1)))
+    requests = [rng.choice(wattages) for _ in range(n)]
+
+    def workload():
+        for watts in requests:
+            response = client.get(f"/products?watts={watts}")
+            assert response.status_code == 200
+
+    run(benchmark, workload, n)
+
+
+@pytest.mark.parametrize("n", WORKLOAD_SIZES)
+def test_geocode_route(benchmark, client, nominatim_stub, n):
+    rng = random.Random(SEED)
+    names = [place["display_name"].split(",")[0] for place in geocoding.get_gazetteer().places]
+    queries = []
+    for _ in range(n):
+        if rng.random() < 0.9:
+            # Typed prefix of a known place, as the autocomplete sends it
+            name = rng.choice(names)
+            queries.append(name[: rng.randint(2, len(name))])
+        else:
+            # Unknown to the gazetteer: goes to the stub Nominatim (then its cache)
+            queries.append(f"zz hamlet {rng.randrange(50)}")
+
+    def workload():
+        for query in queries:
+            response = client.get("/api/geocode", query_string={"q": query})
+            assert response.status_code == 200
+
+    run(benchmark, workload, n)
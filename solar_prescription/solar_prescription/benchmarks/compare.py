@@ -0,0 +1,75 @@
+"""Compare two pytest-benchmark JSON files and fail on regressions.
+
+Usage:
+  python benchmarks/compare.py BASELINE.json CURRENT.json [--threshold 10] [--stat median]
+
+Exits 1 when any benchmark present in both files got slower than the
+baseline by more than --threshold percent. Benchmarks that exist in only one
+file are listed but never fail the comparison.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+STATS = ("min", "median", "mean")
+
+
+def load(path: str, stat: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {b["fullname"]: b["stats"][stat] for b in data.get("benchmarks", [])}
+
+
+def compare(baseline: dict, current: dict, threshold: float):
+    """Return (rows, regressions); rows are (name, base, current, change %)."""
+    rows, regressions = [], []
+    for name in sorted(set(baseline) | set(current)):
+        base, now = baseline.get(name), current.get(name)
+        change = (now - base) / base * 100 if base and now is not None else None
+        rows.append((name, base, now, change))
+        if change is not None and change > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def _fmt_time(seconds):
+    if seconds is None:
+        return "-"
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown in percent")
+    parser.add_argument("--stat", choices=STATS, default="median")
+    args = parser.parse_args(argv)
+
+    rows, regressions = compare(
+        load(args.baseline, args.stat), load(args.current, args.stat), args.threshold
+    )
+    width = max((len(name) for name, *_ in rows), default=10)
+    print(f"{'benchmark':<{width}}  {'baseline':>10}  {'current':>10}  {'change':>8}")
+    for name, base, now, change in rows:
+        flag = "  REGRESSION" if name in regressions else ""
+        change_text = f"{change:+.1f}%" if change is not None else "-"
+        print(f"{name:<{width}}  {_fmt_time(base):>10}  {_fmt_time(now):>10}  {change_text:>8}{flag}")
+
+    if regressions:
+        print(
+            f"\n{len(regressions)} benchmark(s) slower than baseline by more than "
+            f"{args.threshold:g}% ({args.stat})"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,392 @@
+"""
+Bulk Prescriptions
+Runs a CSV of households (one per row, e.g. a whole village) through the
+batch engine and streams one result per row back as NDJSON or CSV.
+
+Rows are read, prescribed and written CHUNK_ROWS at a time, so memory use
+stays flat however long the file is: nothing holds more than one chunk of
+input or output. Each chunk does one PVWatts lookup per distinct location
+(through the usual cache).
+
+Input columns (header row required):
+  latitude, longitude   required (lat, lon also accepted)
+  id                    optional, echoed back in the result
+  coverage_percentage   optional, 50/70/90 (default 70)
+  kit_size              optional, adds the detailed verdict for that kit
+  appliances            optional, "led_bulb:3;phone_charger:1"
+  <appliance id>        optional quantity columns, e.g. led_bulb,fan
+
+Usage:
+  python bulk.py households.csv -o prescriptions.csv
+  python bulk.py households.csv --format ndjson > prescriptions.ndjson
+"""
+
+import argparse
+import codecs
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+from metrics import BULK_ROWS
+from models import to_json
+from prescription_engine import get_engine
+from pvwatts import default_orientation, get_reference_profiles
+
+CHUNK_ROWS = int(os.getenv("BULK_CHUNK_ROWS", "500"))
+FORMATS = ("ndjson", "csv")
+LOCATION_ERROR = "Could not fetch solar data for this location."
+
+_LATITUDE_COLUMNS = ("latitude", "lat")
+_LONGITUDE_COLUMNS = ("longitude", "lon")
+
+
+class BulkInputError(ValueError):
+    """The upload cannot be processed at all (as opposed to one bad row)."""
+
+
+def _decode_lines(binary_stream, decoder):
+    for line in binary_stream:
+        text = decoder.decode(line)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def read_households(binary_stream):
+    """
+    csv.DictReader over a binary stream (upload or file), decoded line by line.
+
+    The header must be UTF-8; bytes that are not (e.g. a cp1252 export from
+    Excel) become U+FFFD in data rows, so a stray accent never cuts off a
+    response that is already streaming. Raises BulkInputError when the header
+    is not UTF-8 or lacks latitude/longitude columns.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    reader = csv.DictReader(_decode_lines(binary_stream, decoder))
+    try:
+        fieldnames = reader.fieldnames
+    except UnicodeDecodeError:
+        raise BulkInputError('CSV must be UTF-8 encoded (in Excel, save as "CSV UTF-8")')
+    decoder.errors = "replace"
+    columns = {name.strip().lower() for name in fieldnames or () if name}
+    if not columns & set(_LATITUDE_COLUMNS) or not columns & set(_LONGITUDE_COLUMNS):
+        raise BulkInputError("CSV needs a header row with latitude and longitude columns")
+    return reader
+
+
+def _column(row, names):
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _normalize(row):
+    # Header names are case-insensitive; DictReader puts surplus fields under None.
+    return {
+        key.strip().lower(): (value or "").strip()
+        for key, value in row.items()
+        if key is not None
+    }
+
+
+def parse_household(row, appliance_ids):
+    """One normalized CSV row -> household dict for generate_prescriptions_batch."""
+    latitude = _column(row, _LATITUDE_COLUMNS)
+    longitude = _column(row, _LONGITUDE_COLUMNS)
+    if latitude is None or longitude is None:
+        raise ValueError("latitude and longitude are required")
+    latitude, longitude = float(latitude), float(longitude)
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("latitude/longitude out of range")
+
+    appliances = []
+    for item in filter(None, row.get("appliances", "").split(";")):
+        app_id, _, quantity = item.partition(":")
+        appliances.append({"id": app_id.strip(), "quantity": int(quantity or 1)})
+    for app_id in appliance_ids:
+        # An empty or 0 cell in a quantity column means the household has none
+        if row.get(app_id) and int(row[app_id]) != 0:
+            appliances.append({"id": app_id, "quantity": int(row[app_id])})
+    for appliance in appliances:
+        if appliance["quantity"] <= 0:
+            raise ValueError(f"quantity for {appliance['id']} must be positive")
+
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "appliances": appliances,
+        "coverage_percentage": int(row.get("coverage_percentage") or 70),
+        "kit_size": int(row["kit_size"]) if row.get("kit_size") else None,
+    }
+
+
+def _kit_size(value):
+    if isinstance(value, str):
+        return int(value.strip())
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    raise ValueError(value)
+
+
+def parse_kit_sizes(value):
+    """
+    Kit sizes in watts, as a comma-separated string or a JSON list, ->
+    ascending list of distinct positive ints, or None for all.
+    """
+    if isinstance(value, str):
+        value = [k for k in value.split(",") if k.strip()]
+    elif value is not None and not isinstance(value, list):
+        raise ValueError("kit_sizes must be a list of integers")
+    try:
+        kit_sizes = sorted({_kit_size(k) for k in value or ()})
+    except ValueError:
+        raise ValueError("kit_sizes must be integers")
+    if any(kit <= 0 for kit in kit_sizes):
+        raise ValueError("kit_sizes must be positive")
+    return kit_sizes or None
+
+
+def _prescribe_chunk(engine, chunk, kit_sizes):
+    """Results for a list of (row number, id, household or error message)."""
+    locations = {}
+    for _, _, household in chunk:
+        if isinstance(household, dict):
+            key = (round(household["latitude"], 4), round(household["longitude"], 4))
+            household["location"] = key
+            if key not in locations:
+                locations[key] = (household["latitude"], household["longitude"]) + (
+                    default_orientation(household["latitude"])
+                )
+
+    profiles = []
+    profile_index = {}
+    for key, (reference_data, error) in zip(
+        locations, get_reference_profiles(list(locations.values()))
+    ):
+        if reference_data and not error:
+            profile_index[key] = len(profiles)
+            profiles.append(reference_data)
+
+    valid = []
+    results = []
+    for row_number, row_id, household in chunk:
+        result = {"row": row_number}
+        if row_id:
+            result["id"] = row_id
+        if not isinstance(household, dict):
+            result["error"] = household
+        elif household["location"] not in profile_index:
+            result["error"] = LOCATION_ERROR
+        else:
+            result["latitude"] = household["latitude"]
+            result["longitude"] = household["longitude"]
+            household["profile"] = profile_index[household["location"]]
+            valid.append((result, household))
+        results.append(result)
+
+    if valid:
+        batch_result = engine.generate_prescriptions_batch(
+            [household for _, household in valid], profiles, kit_sizes=kit_sizes
+        )
+        for (result, _), record in zip(valid, batch_result.records()):
+            result.update(to_json(record))
+    return results
+
+
+class Progress:
+    """Rows processed so far in one bulk run."""
+
+    def __init__(self):
+        self.rows = 0
+        self.errors = 0
+        # Set when the input broke off before its end (e.g. a malformed row).
+        self.error = None
+        self.started = time.perf_counter()
+
+    def add(self, results):
+        errors = sum(1 for result in results if "error" in result)
+        self.rows += len(results)
+        self.errors += errors
+        BULK_ROWS.inc("ok", amount=len(results) - errors)
+        BULK_ROWS.inc("error", amount=errors)
+
+    def to_dict(self):
+        seconds = time.perf_counter() - self.started
+        summary = {
+            "rows": self.rows,
+            "errors": self.errors,
+            "seconds": round(seconds, 2),
+            "rows_per_second": round(self.rows / seconds, 1) if seconds > 0 else None,
+        }
+        if self.error:
+            summary["error"] = self.error
+        return summary
+
+
+def prescribe_chunks(reader, kit_sizes=None, chunk_rows=CHUNK_ROWS, progress=None):
+    """Yield lists of per-row results, chunk_rows households at a time."""
+    engine = get_engine()
+    kit_sizes = list(kit_sizes or engine.KIT_SIZES)
+    appliance_ids = list(engine.APPLIANCE_SPECS)
+    progress = progress or Progress()
+
+    chunk = []
+    rows = enumerate(reader, start=1)
+    while True:
+        try:
+            row_number, row = next(rows)
+        except StopIteration:
+            break
+        except csv.Error as e:
+            # Rows before the unreadable one still get their results.
+            if chunk:
+                results = _prescribe_chunk(engine, chunk, kit_sizes)
+                progress.add(results)
+                yield results
+            progress.error = f"Stopped after row {progress.rows}: {e}"
+            raise BulkInputError(progress.error)
+        row = _normalize(row)
+        row_id = row.get("id") or None
+        try:
+            household = parse_household(row, appliance_ids)
+        except ValueError as e:
+            household = f"Invalid row: {e}"
+        chunk.append((row_number, row_id, household))
+        if len(chunk) >= chunk_rows:
+            results = _prescribe_chunk(engine, chunk, kit_sizes)
+            progress.add(results)
+            yield results
+            chunk = []
+    if chunk:
+        results = _prescribe_chunk(engine, chunk, kit_sizes)
+        progress.add(results)
+        yield results
+
+
+def ndjson_stream(chunks, progress):
+    """
+    One JSON line per result, a {"progress": ...} line per chunk and a final
+    {"summary": ...}, preceded by an {"error": ...} line if the input broke off.
+    """
+    try:
+        for results in chunks:
+            lines = [json.dumps(result, separators=(",", ":")) for result in results]
+            lines.append(json.dumps({"progress": progress.to_dict()}))
+            yield "\n".join(lines) + "\n"
+    except BulkInputError as e:
+        yield json.dumps({"error": str(e)}) + "\n"
+    yield json.dumps({"summary": progress.to_dict()}) + "\n"
+
+
+def csv_columns(kit_sizes):
+    return (
+        ["row", "id", "latitude", "longitude", "coverage_percentage", "daily_wh",
+         "recommended_kit", "kit_size", "verdict", "avg_coverage", "worst_coverage"]
+        + [f"verdict_{kit}w" for kit in kit_sizes]
+        + ["error"]
+    )
+
+
+def csv_stream(chunks, kit_sizes):
+    """
+    Header, then one CSV row per result (verdict_<kit>w column per kit size).
+    If the input broke off, a last row carries only the error.
+    """
+    columns = csv_columns(kit_sizes)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    chunks = iter(chunks)
+    while True:
+        try:
+            results = next(chunks)
+        except StopIteration:
+            break
+        except BulkInputError as e:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow([""] * (len(columns) - 1) + [str(e)])
+            yield buffer.getvalue()
+            break
+        buffer.seek(0)
+        buffer.truncate()
+        for result in results:
+            verdict = result.get("verdict") or {}
+            verdicts = result.get("verdicts") or {}
+            writer.writerow(
+                [result["row"], result.get("id", ""), result.get("latitude", ""),
+                 result.get("longitude", ""), result.get("coverage_percentage", ""),
+                 result.get("daily_wh", ""), result.get("recommended_kit") or "",
+                 result.get("kit_size", ""), verdict.get("verdict", ""),
+                 verdict.get("avg_coverage", ""), verdict.get("worst_coverage", "")]
+                + [verdicts.get(str(kit), "") for kit in kit_sizes]
+                + [result.get("error", "")]
+            )
+        yield buffer.getvalue()
+
+
+def stream(reader, output_format="ndjson", kit_sizes=None, progress=None):
+    """Encoded output chunks (str) for a bulk run in the given format."""
+    kit_sizes = list(kit_sizes or get_engine().KIT_SIZES)
+    progress = progress or Progress()
+    chunks = prescribe_chunks(reader, kit_sizes=kit_sizes, progress=progress)
+    if output_format == "csv":
+        return csv_stream(chunks, kit_sizes)
+    return ndjson_stream(chunks, progress)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prescriptions for a CSV of households")
+    parser.add_argument("input", help="households CSV ('-' for stdin)")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="default: csv for a .csv output file, ndjson otherwise")
+    parser.add_argument("--kit-sizes", help="comma-separated kit sizes (default: all)")
+    args = parser.parse_args(argv)
+
+    output_format = args.format or (
+        "csv" if (args.output or "").lower().endswith(".csv") else "ndjson"
+    )
+    try:
+        kit_sizes = parse_kit_sizes(args.kit_sizes)
+    except ValueError as e:
+        parser.error(str(e))
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    target = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    progress = Progress()
+    reported = 0
+    try:
+        reader = read_households(source)
+        for text in stream(reader, output_format, kit_sizes, progress):
+            target.write(text)
+            target.flush()
+            if progress.rows > reported:
+                reported = progress.rows
+                print("bulk: {rows} rows, {errors} errors, {rows_per_second} rows/s".format(
+                    **progress.to_dict()), file=sys.stderr)
+        if progress.error:
+            print(f"bulk: {progress.error}", file=sys.stderr)
+            return 1
+    except BulkInputError as e:
+        print(f"bulk: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,160 @@
+"""
+VeraSol Product Catalog
+In-memory, wattage-indexed view of data/all_solar_kits_combined.csv
+"""
+
+import csv
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from metrics import CATALOG_LOAD_SECONDS
+
+CATALOG_CSV_PATH = os.path.join(
+    os.path.dirname(__file__), "data", "all_solar_kits_combined.csv"
+)
+
+POWER_COLUMN = "PV Module Maximum Power [W]"
+LIGHT_POINTS_COLUMN = "Number of Light Points"
+CHEMISTRY_COLUMN = "Main Unit Battery Chemistry"
+
+# How often the shared catalog checks the CSV for changes.
+CATALOG_RELOAD_CHECK_SECONDS = 5.0
+
+
+def _parse_int(raw):
+    try:
+        return int(float(str(raw).strip()))
+    except (TypeError, ValueError):
+        return None
+
+
+class KitCatalog:
+    """
+    Column-oriented catalog sorted by PV wattage.
+
+    Each CSV column is stored as a tuple of strings in wattage order, with
+    wattage, light points and chemistry held in parallel arrays so filters
+    never build per-row dicts. Rows are materialized only for results.
+    """
+
+    def __init__(self, path=CATALOG_CSV_PATH, version=None):
+        self.path = path
+        self.version = version
+        self.columns = ()
+        self._values = {}
+
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            self.columns = tuple(reader.fieldnames or ())
+            parsed = []
+            for row in reader:
+                power = _parse_int(row.get(POWER_COLUMN))
+                if power is None:
+                    continue
+                parsed.append((power, row))
+
+        # Stable sort keeps CSV order within a wattage.
+        parsed.sort(key=lambda item: item[0])
+
+        self.watts = array("i", (power for power, _ in parsed))
+        self.light_points = array(
+            "i",
+            (_parse_int(row.get(LIGHT_POINTS_COLUMN)) or 0 for _, row in parsed),
+        )
+        self.chemistry = tuple(
+            (row.get(CHEMISTRY_COLUMN) or "").strip().lower() for _, row in parsed
+        )
+        self._values = {
+            column: tuple(row.get(column) for _, row in parsed)
+            for column in self.columns
+        }
+
+    def __len__(self):
+        return len(self.watts)
+
+    def row(self, index):
+        """Materialize one product as a dict keyed by CSV column name."""
+        return {column: self._values[column][index] for column in self.columns}
+
+    def index_range(self, min_watts=None, max_watts=None):
+        """Return the [start, stop) index range of kits within the wattage bounds."""
+        start = 0 if min_watts is None else bisect_left(self.watts, min_watts)
+        stop = len(self.watts) if max_watts is None else bisect_right(self.watts, max_watts)
+        return range(start, max(start, stop))
+
+    def query(
+        self,
+        min_watts=None,
+        max_watts=None,
+        chemistry=None,
+        min_light_points=None,
+    ):
+        """Return matching products (dicts) in wattage order."""
+        chemistry = chemistry.strip().lower() if chemistry else None
+        results = []
+        for i in self.index_range(min_watts, max_watts):
+            if chemistry and self.chemistry[i] != chemistry:
+                continue
+            if min_light_points is not None and self.light_points[i] < min_light_points:
+                continue
+            results.append(self.row(i))
+        return results
+
+    def by_watts(self, watts, **filters):
+        """Return products with exactly this PV wattage."""
+        return self.query(min_watts=watts, max_watts=watts, **filters)
+
+    def chemistries(self):
+        return sorted({c for c in self.chemistry if c})
+
+
+_catalog = None
+_catalog_mtime = None
+_catalog_checked_at = 0.0
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """
+    Return the process-wide catalog, reloading it when the CSV's mtime changes.
+
+    The file is re-checked at most every CATALOG_RELOAD_CHECK_SECONDS.
+    """
+    global _catalog, _catalog_mtime, _catalog_checked_at
+
+    catalog = _catalog
+    if (
+        catalog is not None
+        and time.monotonic() - _catalog_checked_at < CATALOG_RELOAD_CHECK_SECONDS
+    ):
+        return catalog
+
+    with _catalog_lock:
+        now = time.monotonic()
+        if _catalog is not None and now - _catalog_checked_at < CATALOG_RELOAD_CHECK_SECONDS:
+            return _catalog
+
+        mtime = os.stat(CATALOG_CSV_PATH).st_mtime_ns
+        if _catalog is None or mtime != _catalog_mtime:
+            with CATALOG_LOAD_SECONDS.time():
+                _catalog = KitCatalog(CATALOG_CSV_PATH, version=mtime)
+            _catalog_mtime = mtime
+        _catalog_checked_at = now
+        return _catalog
+
+
+def preload_catalog():
+    """
+    Load the shared catalog ahead of the first request.
+
+    A missing or unreadable CSV is logged instead of raised, so the app still
+    starts; get_catalog() raises again when a route needs the catalog.
+    """
+    try:
+        return get_catalog()
+    except OSError as e:
+        print(f"Warning: product catalog not loaded: {e}")
+        return None
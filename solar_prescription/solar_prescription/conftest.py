@@ -0,0 +1,73 @@
+"""
+Shared fixtures for the Flask route tests: a stubbed NREL client and an app
+test client backed by an in-memory prescription store.
+"""
+
+import pytest
+
+import app as app_module
+import pvwatts
+from prescription_store import PrescriptionStore
+
+
+NAIROBI_1KW_OUTPUTS = {
+    "ac_annual": 1460.0,
+    "ac_monthly": [
+        119.3, 121.3, 129.7, 120.3, 110.7, 106.0,
+        102.0, 107.0, 114.3, 122.3, 119.7, 120.7,
+    ],
+}
+
+
+class _FakeClient:
+    """Stands in for upstream.UpstreamClient; records every PVWatts call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def get_json(self, url, params=None, **kwargs):
+        self.calls.append(params)
+        capacity = float(params["system_capacity"])
+        outputs = {
+            "ac_annual": NAIROBI_1KW_OUTPUTS["ac_annual"] * capacity,
+            "ac_monthly": [x * capacity for x in NAIROBI_1KW_OUTPUTS["ac_monthly"]],
+        }
+        if params.get("timeframe") == "hourly":
+            # Flat 4 kWh/kW/day spread over 10:00-14:00
+            outputs["ac"] = [1000.0 * capacity if 10 <= h % 24 < 14 else 0.0 for h in range(8760)]
+        return {"outputs": outputs}
+
+    async def arun(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+
+@pytest.fixture
+def nrel_calls(monkeypatch):
+    """Stub the NREL endpoint (cache disabled) and record every upstream call."""
+    client = _FakeClient()
+    monkeypatch.setattr(pvwatts, "get_cache", lambda: None)
+    monkeypatch.setattr(pvwatts, "get_client", lambda: client)
+    return client.calls
+
+
+@pytest.fixture
+def client(monkeypatch):
+    store = PrescriptionStore(path=":memory:")
+    monkeypatch.setattr(app_module, "get_store", lambda: store)
+    app_module.app.config.update(TESTING=True)
+    return app_module.app.test_client()
+
+
+def _prescribe(client, kit_size, appliances=None, **extra):
+    return client.post(
+        "/prescribe",
+        json={
+            "location": "Nairobi, Kenya",
+            "latitude": -1.2921,
+            "longitude": 36.8219,
+            "kit_size": kit_size,
+            "coverage_percentage": 70,
+            "appliances": appliances or [{"id": "led_bulb", "quantity": 3}],
+            **extra,
+        },
+    )
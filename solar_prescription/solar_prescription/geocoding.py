@@ -0,0 +1,232 @@
+"""
+Location Autocomplete
+Populated places in our markets are answered in-process from a prefix index
+over data/places.csv. Queries the gazetteer cannot answer fall back to
+Nominatim, with responses cached for a day and outgoing calls rate-limited
+to stay inside the OpenStreetMap usage policy.
+"""
+
+import csv
+import os
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import OrderedDict
+
+from metrics import GEOCODE_LOOKUPS, UPSTREAM_SECONDS
+from upstream import CONNECT_TIMEOUT, NOMINATIM_SEARCH_URL, RateLimiter, get_client
+
+DEFAULT_PLACES_PATH = os.path.join(os.path.dirname(__file__), "data", "places.csv")
+MAX_RESULTS = 8
+
+# Nominatim fallback
+NOMINATIM_HEADERS = {"User-Agent": "SolarPrescriptionApp/1.0"}
+NOMINATIM_READ_TIMEOUT = 10
+# Nominatim's policy allows at most one request per second per application.
+NOMINATIM_MIN_INTERVAL = float(os.getenv("NOMINATIM_MIN_INTERVAL", "1.0"))
+GEOCODE_CACHE_TTL = float(os.getenv("GEOCODE_CACHE_TTL", 24 * 3600))
+GEOCODE_CACHE_ENTRIES = 4096
+# Two-letter prefixes match too much of the world to be worth a remote lookup.
+MIN_FALLBACK_QUERY_LENGTH = 3
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    """Case- and accent-insensitive form used for matching ("Thiès" -> "thies")."""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", stripped.casefold()).strip()
+
+
+class Gazetteer:
+    """
+    Prefix index over a CSV of places (name, region, country, lat, lon, population).
+
+    Normalized names are kept in one sorted list, so a prefix lookup is a
+    bisect plus a scan of the matching run. Text after the first comma in a
+    query ("Kisumu, Ken") narrows matches by region or country.
+    """
+
+    def __init__(self, path=DEFAULT_PLACES_PATH):
+        self.path = path
+        self.places = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                name = row["name"].strip()
+                region = (row.get("region") or "").strip()
+                country = (row.get("country") or "").strip()
+                parts = [name] + [p for p in (region, country) if p and p != name]
+                self.places.append(
+                    {
+                        "display_name": ", ".join(parts),
+                        "lat": float(row["lat"]),
+                        "lon": float(row["lon"]),
+                        "population": int(row.get("population") or 0),
+                        "context": set(normalize(f"{region} {country}").split()),
+                    }
+                )
+
+        entries = sorted((normalize(place["display_name"].split(",")[0]), i)
+                         for i, place in enumerate(self.places))
+        self._keys = [key for key, _ in entries]
+        self._rows = [i for _, i in entries]
+
+    def __len__(self):
+        return len(self.places)
+
+    def search(self, query, limit=MAX_RESULTS):
+        """Places whose name starts with query, most populous first."""
+        name_part, _, context_part = str(query).partition(",")
+        prefix = normalize(name_part)
+        if not prefix:
+            return []
+        context = normalize(context_part).split()
+
+        matches = []
+        i = bisect_left(self._keys, prefix)
+        while i < len(self._keys) and self._keys[i].startswith(prefix):
+            place = self.places[self._rows[i]]
+            if all(any(word.startswith(c) for word in place["context"]) for c in context):
+                matches.append(place)
+            i += 1
+        matches.sort(key=lambda place: -place["population"])
+        return matches[:limit]
+
+
+class TTLCache:
+    """Small thread-safe LRU whose entries expire after ttl_seconds."""
+
+    def __init__(self, ttl_seconds, max_entries):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at >= self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_nominatim_cache = TTLCache(GEOCODE_CACHE_TTL, GEOCODE_CACHE_ENTRIES)
+_nominatim_limiter = RateLimiter(NOMINATIM_MIN_INTERVAL)
+
+
+def nominatim_cache_stats():
+    return _nominatim_cache.stats()
+
+
+def nominatim_search(query):
+    """
+    Cached, rate-limited Nominatim lookup. Returns display_name -> {lat, lon}.
+
+    When the rate limit is exhausted the call returns {} immediately instead of
+    queueing behind other users' keystrokes; empty answers are not cached.
+    """
+    key = normalize(query)
+    cached = _nominatim_cache.get(key)
+    if cached is not None:
+        GEOCODE_LOOKUPS.inc("nominatim_cache")
+        return cached
+    if not _nominatim_limiter.try_acquire():
+        GEOCODE_LOOKUPS.inc("rate_limited")
+        return {}
+
+    GEOCODE_LOOKUPS.inc("nominatim")
+    params = {"q": query, "format": "json", "limit": MAX_RESULTS, "addressdetails": 1}
+    start = time.perf_counter()
+    try:
+        response = get_client().get(
+            NOMINATIM_SEARCH_URL,
+            params=params,
+            headers=NOMINATIM_HEADERS,
+            timeout=(CONNECT_TIMEOUT, NOMINATIM_READ_TIMEOUT),
+        )
+    except Exception:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, "nominatim", "error")
+        raise
+    UPSTREAM_SECONDS.observe(
+        time.perf_counter() - start,
+        "nominatim",
+        "ok" if response.status_code == 200 else "error",
+    )
+    if response.status_code != 200:
+        return {}
+
+    matches = {}
+    for item in (response.json() or [])[:MAX_RESULTS]:
+        lat = item.get("lat")
+        lon = item.get("lon")
+        if lat is None or lon is None:
+            continue
+
+        # Build display name from address components, preferring town/village/city
+        address = item.get("address", {})
+        name_parts = []
+        for component in ["town", "village", "city", "county", "state", "country"]:
+            val = address.get(component)
+            if val and val not in name_parts:
+                name_parts.append(val)
+        display_name = ", ".join(name_parts) if name_parts else item.get("display_name", "Unknown")
+        matches[display_name] = {"lat": float(lat), "lon": float(lon)}
+
+    if matches:
+        _nominatim_cache.put(key, matches)
+    return matches
+
+
+def geocode(query):
+    """Autocomplete query: gazetteer first, Nominatim only when it has nothing."""
+    gazetteer = get_gazetteer()
+    if gazetteer is not None:
+        places = gazetteer.search(query)
+        if places:
+            GEOCODE_LOOKUPS.inc("gazetteer")
+            return {p["display_name"]: {"lat": p["lat"], "lon": p["lon"]} for p in places}
+    if len(normalize(query)) < MIN_FALLBACK_QUERY_LENGTH:
+        GEOCODE_LOOKUPS.inc("too_short")
+        return {}
+    return nominatim_search(query)
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Return the process-wide gazetteer, or None if the places file is missing."""
+    global _gazetteer
+    if _gazetteer is None:
+        path = os.getenv("GAZETTEER_PATH") or DEFAULT_PLACES_PATH
+        if not os.path.exists(path):
+            return None
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer(path)
+    return _gazetteer
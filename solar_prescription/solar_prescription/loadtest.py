@@ -0,0 +1,351 @@
+"""
+Load Test
+Replays a realistic request mix against the app at one or more concurrency
+levels and reports throughput, latency percentiles and error rates, for sizing
+a deployment (the Playwright smoke test drives a single browser session and
+says nothing about capacity).
+
+The mix:
+  /prescribe     a gazetteer place (weighted by population, jittered so most
+                 requests land in distinct PVWatts cache buckets), a kit size
+                 from KIT_SIZES or 0 (auto-size), 1-4 appliances from
+                 APPLIANCE_SPECS with quantities 1-4, coverage 50/70/90
+  /api/geocode   place-name prefixes the gazetteer answers, plus unknown
+                 names that fall through to Nominatim
+  /products      a catalog page for one of the kit sizes
+
+By default the app is started with serve.py in a subprocess, pointed at two
+local upstream_stub.py servers (NREL and Nominatim) that add the configured
+latency, with a fresh PVWatts cache and prescription store. --url runs against
+a server that is already up instead (configure its upstreams yourself).
+
+Each concurrency level replays its own batch of requests (the seed advances
+per level), so earlier levels do not pre-warm the cache for later ones beyond
+what real traffic would share.
+
+Usage:
+  python loadtest.py --concurrency 1,8,32 --requests 400 --nrel-latency-ms 500
+  python loadtest.py --workers 2 --threads 8 --json /tmp/load.json
+  python loadtest.py --url http://127.0.0.1:5050 --concurrency 16
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import requests
+
+from geocoding import DEFAULT_PLACES_PATH, Gazetteer
+from prescription_engine import SolarPrescription
+from upstream_stub import StubUpstreamServer
+
+COVERAGE_TARGETS = (50, 70, 90)
+# Share of each endpoint in the mix (normalised, so they need not sum to 1).
+DEFAULT_MIX = {"prescribe": 0.8, "geocode": 0.15, "products": 0.05}
+# Share of geocode queries the gazetteer cannot answer (Nominatim fallback).
+UNKNOWN_PLACE_RATE = 0.2
+# Degrees of jitter around a place; PVWatts cache buckets are 0.05 degrees.
+DEFAULT_SPREAD = 0.5
+DEFAULT_NREL_LATENCY_MS = 500
+DEFAULT_NOMINATIM_LATENCY_MS = 300
+REQUEST_TIMEOUT = 60
+SERVER_START_TIMEOUT = 60
+
+
+def _weights(mix):
+    names = [name for name, share in mix.items() if share > 0]
+    return names, [mix[name] for name in names]
+
+
+def _unknown_place(rng):
+    syllables = ("ka", "mi", "to", "ru", "ne", "so", "ba", "li", "wa", "zu")
+    return "".join(rng.choice(syllables) for _ in range(rng.randint(3, 4))).title()
+
+
+def build_requests(count, seed=0, mix=DEFAULT_MIX, places=None, spread=DEFAULT_SPREAD):
+    """
+    A reproducible list of (endpoint, method, path, json_body) tuples.
+
+    places defaults to the gazetteer (data/places.csv); any list of dicts with
+    display_name, lat, lon and population works.
+    """
+    rng = random.Random(seed)
+    places = places if places is not None else Gazetteer(DEFAULT_PLACES_PATH).places
+    place_weights = [math.sqrt(max(1, place["population"])) for place in places]
+    names, shares = _weights(mix)
+    kit_sizes = [0] + list(SolarPrescription.KIT_SIZES)
+    appliance_ids = list(SolarPrescription.APPLIANCE_SPECS)
+
+    batch = []
+    for _ in range(count):
+        endpoint = rng.choices(names, shares)[0]
+        place = rng.choices(places, place_weights)[0]
+        if endpoint == "prescribe":
+            body = {
+                "location": place["display_name"],
+                "latitude": round(place["lat"] + rng.uniform(-spread, spread), 4),
+                "longitude": round(place["lon"] + rng.uniform(-spread, spread), 4),
+                "kit_size": rng.choice(kit_sizes),
+                "coverage_percentage": rng.choice(COVERAGE_TARGETS),
+                "appliances": [
+                    {"id": app_id, "quantity": rng.randint(1, 4)}
+                    for app_id in rng.sample(appliance_ids, rng.randint(1, 4))
+                ],
+            }
+            batch.append(("prescribe", "POST", "/prescribe", body))
+        elif endpoint == "geocode":
+            if rng.random() < UNKNOWN_PLACE_RATE:
+                query = _unknown_place(rng)
+            else:
+                name = place["display_name"].split(",")[0]
+                query = name[: rng.randint(3, max(3, len(name)))]
+            batch.append(("geocode", "GET", "/api/geocode?" + urlencode({"q": query}), None))
+        else:
+            watts = rng.choice(SolarPrescription.KIT_SIZES)
+            batch.append(("products", "GET", f"/products?watts={watts}", None))
+    return batch
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list (None when empty)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(results, wall_seconds):
+    """Throughput, latency percentiles (ms) and errors for (endpoint, seconds, error) results."""
+
+    def stats(rows):
+        latencies = sorted(seconds for _, seconds, _ in rows)
+        errors = Counter(error for _, _, error in rows if error)
+        total = len(rows)
+        return {
+            "requests": total,
+            "errors": sum(errors.values()),
+            "error_rate": round(sum(errors.values()) / total, 4) if total else 0.0,
+            "error_kinds": dict(errors),
+            "throughput": round(total / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+            **{
+                name: round(percentile(latencies, fraction) * 1000, 1) if latencies else None
+                for name, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99),
+                                       ("max_ms", 1.0))
+            },
+        }
+
+    by_endpoint = defaultdict(list)
+    for row in results:
+        by_endpoint[row[0]].append(row)
+    summary = stats(results)
+    summary["seconds"] = round(wall_seconds, 2)
+    summary["endpoints"] = {name: stats(rows) for name, rows in sorted(by_endpoint.items())}
+    return summary
+
+
+def run_level(base_url, batch, concurrency, timeout=REQUEST_TIMEOUT):
+    """Replay batch with concurrency closed-loop clients; returns summarize()'s dict."""
+    local = threading.local()
+
+    def send(item):
+        endpoint, method, path, body = item
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, json=body, timeout=timeout)
+            error = None if response.status_code < 400 else str(response.status_code)
+        except requests.RequestException as e:
+            error = type(e).__name__
+        return endpoint, time.perf_counter() - started, error
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="load") as pool:
+        results = list(pool.map(send, batch))
+    return summarize(results, time.perf_counter() - started)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app(nrel_url, nominatim_url, workdir, workers=None, threads=None, cache=True,
+              server="auto"):
+    """Start serve.py on a free port against the given upstreams; returns (process, base_url)."""
+    port = _free_port()
+    env = dict(
+        os.environ,
+        NREL_PVWATTS_URL=nrel_url,
+        NOMINATIM_SEARCH_URL=nominatim_url,
+        NREL_API_KEY=os.getenv("NREL_API_KEY") or "loadtest",
+        SOLAR_DATA_PROVIDER="pvwatts",
+        PVWATTS_CACHE="1" if cache else "0",
+        PVWATTS_CACHE_PATH=os.path.join(workdir, "pvwatts_cache.sqlite3"),
+        PRESCRIPTION_STORE_PATH=os.path.join(workdir, "prescriptions.sqlite3"),
+        PROFILE_DIR=os.path.join(workdir, "profiles"),
+        WARMUP_ON_STARTUP="0",
+    )
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "serve.py"),
+               "--host", "127.0.0.1", "--port", str(port), "--server", server]
+    if workers:
+        command += ["--workers", str(workers)]
+    if threads:
+        command += ["--threads", str(threads)]
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"serve.py exited with status {process.returncode}")
+        try:
+            if requests.get(base_url + "/", timeout=2).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"serve.py did not answer within {SERVER_START_TIMEOUT}s")
+
+
+def format_report(concurrency, summary):
+    lines = [
+        "{:>5} {:>9} {:>8} {:>7.2%} {:>9.1f} {:>8} {:>8} {:>8} {:>8}".format(
+            concurrency, "total", summary["requests"], summary["error_rate"],
+            summary["throughput"], *(summary[k] for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms")),
+        )
+    ]
+    for name, stats in summary["endpoints"].items():
+        lines.append(
+            "{:>5} {:>9} {:>8} {:>7.2%} {:>9.1f} {:>8} {:>8} {:>8} {:>8}".format(
+                "", name, stats["requests"], stats["error_rate"], stats["throughput"],
+                *(stats[k] for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms")),
+            )
+        )
+    if summary["error_kinds"]:
+        kinds = ", ".join(f"{kind} x{n}" for kind, n in sorted(summary["error_kinds"].items()))
+        lines.append(f"{'':>5} {'errors':>9} {kinds}")
+    return "\n".join(lines)
+
+
+REPORT_HEADER = "{:>5} {:>9} {:>8} {:>7} {:>9} {:>8} {:>8} {:>8} {:>8}".format(
+    "conc", "endpoint", "requests", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms", "max ms"
+)
+
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, share = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}")
+        mix[name.strip()] = float(share)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the app with a realistic request mix")
+    parser.add_argument("--url", help="test a running server instead of starting one")
+    parser.add_argument("--concurrency", default="1,8,32",
+                        help="comma-separated client counts, one run each (default: 1,8,32)")
+    parser.add_argument("--requests", type=int, default=400, help="requests per level")
+    parser.add_argument("--warmup-requests", type=int, default=0,
+                        help="unmeasured requests sent before each level")
+    parser.add_argument("--mix", type=_parse_mix, default=DEFAULT_MIX,
+                        help="endpoint shares, e.g. prescribe=0.8,geocode=0.15,products=0.05")
+    parser.add_argument("--spread", type=float, default=DEFAULT_SPREAD,
+                        help="degrees of jitter around each place (0: gazetteer points only)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--nrel-latency-ms", type=float, default=DEFAULT_NREL_LATENCY_MS)
+    parser.add_argument("--nominatim-latency-ms", type=float,
+                        default=DEFAULT_NOMINATIM_LATENCY_MS)
+    parser.add_argument("--no-cache", action="store_true",
+                        help="start the app with PVWATTS_CACHE=0 (every prescription hits NREL)")
+    parser.add_argument("--workers", type=int, help="serve.py --workers")
+    parser.add_argument("--threads", type=int, help="serve.py --threads")
+    parser.add_argument("--server", choices=("auto", "gunicorn", "waitress"), default="auto")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    nrel = nominatim = process = None
+    workdir = tempfile.TemporaryDirectory(prefix="loadtest-")
+    try:
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            nrel = StubUpstreamServer(latency_s=args.nrel_latency_ms / 1000).start()
+            nominatim = StubUpstreamServer(latency_s=args.nominatim_latency_ms / 1000).start()
+            process, base_url = start_app(
+                nrel.pvwatts_url, nominatim.nominatim_url, workdir.name,
+                workers=args.workers, threads=args.threads, cache=not args.no_cache,
+                server=args.server,
+            )
+            print(
+                f"app on {base_url} (workers={args.workers or 'auto'}, "
+                f"threads={args.threads or 'auto'}, PVWatts cache "
+                f"{'off' if args.no_cache else 'on'}); stub latency NREL "
+                f"{args.nrel_latency_ms:.0f} ms, Nominatim {args.nominatim_latency_ms:.0f} ms"
+            )
+
+        places = Gazetteer(DEFAULT_PLACES_PATH).places
+        print(REPORT_HEADER)
+        runs = []
+        for index, concurrency in enumerate(levels):
+            seed = args.seed + index
+            if args.warmup_requests:
+                warm = build_requests(args.warmup_requests, seed=-1 - seed, mix=args.mix,
+                                      places=places, spread=args.spread)
+                run_level(base_url, warm, concurrency)
+            upstream_before = (sum(nrel.calls.values()), sum(nominatim.calls.values())) if nrel else None
+            batch = build_requests(args.requests, seed=seed, mix=args.mix, places=places,
+                                   spread=args.spread)
+            summary = run_level(base_url, batch, concurrency)
+            summary["concurrency"] = concurrency
+            if nrel:
+                summary["upstream_calls"] = {
+                    "nrel": sum(nrel.calls.values()) - upstream_before[0],
+                    "nominatim": sum(nominatim.calls.values()) - upstream_before[1],
+                }
+            runs.append(summary)
+            print(format_report(concurrency, summary))
+            if "upstream_calls" in summary:
+                calls = summary["upstream_calls"]
+                print(f"{'':>5} {'upstream':>9} NREL {calls['nrel']}, "
+                      f"Nominatim {calls['nominatim']}")
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"base_url": base_url, "args": vars(args),
+                           "runs": runs}, f, indent=2)
+        return 1 if any(run["error_rate"] > 0 for run in runs) else 0
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        for stub in (nrel, nominatim):
+            if stub is not None:
+                stub.stop()
+        workdir.cleanup()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,268 @@
+"""
+Metrics
+Latency histograms and counters for the request hot path, served at /metrics
+in the Prometheus text exposition format.
+
+Recording is an increment under a per-metric lock (about a microsecond), so
+instrumenting a request costs well under 1% of its latency. Figures that other
+modules already count (PVWatts cache, single-flight coalescing, ...) are read
+by collectors at scrape time instead of being counted twice. Set
+METRICS_ENABLED=0 to turn recording and the endpoint off.
+"""
+
+import os
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").strip().lower() not in {
+    "0",
+    "false",
+    "no",
+    "off",
+}
+
+# Seconds; spans sub-millisecond engine stages up to slow NREL calls.
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter; label values are passed positionally in labelnames order."""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            yield self.name, tuple(zip(self.labelnames, labelvalues)), value
+
+
+class _Timer:
+    __slots__ = ("histogram", "labelvalues", "start")
+
+    def __init__(self, histogram, labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(perf_counter() - self.start, *self.labelvalues)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. Each label set keeps per-bucket counts, a sum and
+    a count; buckets are made cumulative only when rendered.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        if not METRICS_ENABLED:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # len(buckets) + 1 slots: the last one is the +Inf bucket.
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labelvalues):
+        """Context manager that observes the elapsed wall time of its block."""
+        if not METRICS_ENABLED:
+            return _NULL_TIMER
+        return _Timer(self, labelvalues)
+
+    def count(self, *labelvalues):
+        with self._lock:
+            series = self._series.get(labelvalues)
+            return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._series.items())
+        bounds = self.buckets + (float("inf"),)
+        for labelvalues, (counts, total, count) in items:
+            labels = tuple(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, n in zip(bounds, counts):
+                cumulative += n
+                yield self.name + "_bucket", labels + (("le", _format_value(float(bound))),), cumulative
+            yield self.name + "_sum", labels, total
+            yield self.name + "_count", labels, count
+
+
+class Registry:
+    """
+    Metrics plus scrape-time collectors, rendered in the text exposition format.
+
+    With worker_label=True every sample carries worker="<pid>": each process
+    keeps its own figures, so series from different gunicorn workers must not
+    be mistaken for one counter that jumps or resets between scrapes.
+    """
+
+    def __init__(self, worker_label=False):
+        self.worker_label = worker_label
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """
+        collector() returns (name, type, documentation, samples) tuples, with
+        samples as (labels dict, value) pairs. Registering twice is a no-op.
+        """
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        # Read at scrape time: a preloaded app is imported before the fork.
+        worker = (("worker", str(os.getpid())),) if self.worker_label else ()
+
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(worker + labels)} {_format_value(value)}")
+
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:  # a broken collector must not break the scrape
+                print(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+                continue
+            for name, metric_type, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    labels = worker + tuple(sorted(labels.items()))
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry(worker_label=True)
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# Hot-path metrics, shared by the modules that record them.
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds",
+    "Time spent handling a request, by endpoint.",
+    ("endpoint", "method", "status"),
+)
+UPSTREAM_SECONDS = histogram(
+    "upstream_request_duration_seconds",
+    "Time spent waiting on an upstream API call.",
+    ("service", "outcome"),
+)
+ENGINE_STAGE_SECONDS = histogram(
+    "engine_stage_duration_seconds",
+    "Time spent in each prescription engine stage.",
+    ("stage",),
+)
+TEMPLATE_RENDER_SECONDS = histogram(
+    "template_render_duration_seconds",
+    "Time spent rendering a Jinja template.",
+    ("template",),
+)
+CATALOG_LOAD_SECONDS = histogram(
+    "catalog_load_duration_seconds",
+    "Time spent parsing the VeraSol product CSV into the catalog index.",
+)
+BULK_ROWS = counter(
+    "bulk_rows_total",
+    "Households processed by bulk prescription runs, by outcome.",
+    ("outcome",),
+)
+GEOCODE_LOOKUPS = counter(
+    "geocode_lookups_total",
+    "Autocomplete lookups by where the answer came from.",
+    ("source",),
+)
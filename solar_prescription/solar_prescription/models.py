@@ -0,0 +1,123 @@
+"""
+Domain Model
+Slotted, frozen dataclasses for the values the engine passes around, and
+to_json(), the single serializer applied at the HTTP boundary.
+"""
+
+from dataclasses import dataclass, fields, is_dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class Appliance:
+    """An entry in SolarPrescription.APPLIANCE_SPECS."""
+
+    id: str
+    label: str
+    watts: float
+    hours: float
+
+
+@dataclass(frozen=True, slots=True)
+class ApplianceUse:
+    """One line of a household's appliance list, with its daily energy."""
+
+    name: str
+    quantity: int
+    watts: float
+    hours: float
+    daily_wh: float
+
+
+@dataclass(frozen=True, slots=True)
+class ProductionProfile:
+    """Daily production figures for one kit at one location (Wh)."""
+
+    daily_avg: float
+    worst_month_daily: float
+    best_month_daily: float = 0.0
+    annual_total: float = 0.0
+    monthly: tuple = ()
+
+
+@dataclass(frozen=True, slots=True)
+class Verdict:
+    """Output of SolarPrescription.determine_verdict."""
+
+    verdict: str
+    avg_coverage: float
+    worst_coverage: float
+    usable_daily: float
+    worst_month_usable: float
+    used_tested_value: bool
+    coverage_percentage: int
+
+
+@dataclass(frozen=True, slots=True)
+class Location:
+    name: str
+    latitude: float
+    longitude: float
+
+
+@dataclass(frozen=True, slots=True)
+class EnergyNeed:
+    daily_wh: float
+    appliances: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class ProductionSummary:
+    """Rounded production figures shown on the results page."""
+
+    daily_avg: float
+    theoretical_avg: float
+    best_month: float
+    worst_month: float
+    annual_kwh: float
+    using_tested_value: bool
+
+
+@dataclass(frozen=True, slots=True)
+class Prescription:
+    """Complete output of SolarPrescription.generate_prescription."""
+
+    location: Location
+    kit_size: int
+    product_info: dict
+    energy_need: EnergyNeed
+    production: ProductionSummary
+    verdict: Verdict
+    recommendation: dict
+    sizing: dict
+    irradiance_warnings: list
+    timestamp: str
+
+
+_SCALARS = (str, int, float, bool, type(None))
+_FIELD_NAMES = {}
+
+
+def to_json(value):
+    """
+    Convert model objects (and dicts/lists/tuples containing them) into
+    JSON-ready builtins.
+
+    Unlike dataclasses.asdict this does not deep-copy scalars or containers
+    it has no reason to touch, and field names are looked up once per class.
+    """
+    if isinstance(value, _SCALARS):
+        return value
+    cls = type(value)
+    names = _FIELD_NAMES.get(cls)
+    if names is None and is_dataclass(cls):
+        names = _FIELD_NAMES[cls] = tuple(f.name for f in fields(cls))
+    if names is not None:
+        return {name: to_json(getattr(value, name)) for name in names}
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if hasattr(value, "item"):
+        # NumPy scalars
+        return value.item()
+    return value
@@ -1,6 +1,7 @@
 """Playwright UI smoke test.
 
 Runs the Flask app (if not already running) and drives the UI like a user:
+- checks an empty geocode answer is asked for again, not cached
 - sets a location (without relying on external geocoding)
 - selects a 10W kit
 - selects 1 LED bulb + 1 phone charge
@@ -70,6 +71,28 @@ def _start_server() -> subprocess.Popen:
     return proc
 
 
+def _check_empty_geocode_is_refetched(page) -> None:
+    """An empty (e.g. rate-limited) answer must not be served from the browser cache."""
+    calls = []
+
+    def handle(route):
+        calls.append(route.request.url)
+        body = "{}" if len(calls) == 1 else '{"Nyeri, Kenya": {"lat": -0.4167, "lon": 36.95}}'
+        route.fulfill(status=200, content_type="application/json", body=body)
+
+    page.route("**/api/geocode*", handle)
+    try:
+        page.fill("#locationSearch", "Nye")
+        page.wait_for_selector("#locationSuggestions >> text=No matching locations")
+        # Same query after normalization: would be a cache hit if {} were cached
+        page.fill("#locationSearch", "Nye ")
+        page.wait_for_selector("#locationSuggestions >> text=Nyeri, Kenya")
+        assert len(calls) == 2, calls
+    finally:
+        page.unroute("**/api/geocode*")
+        page.fill("#locationSearch", "")
+
+
 def main() -> int:
     proc = None
     try:
@@ -82,6 +105,8 @@ def main() -> int:
 
             page.goto(f"{BASE_URL}/", wait_until="domcontentloaded")
 
+            _check_empty_geocode_is_refetched(page)
+
             # Fill required visible input
             page.fill("#locationSearch", "Nyeri, Kenya")
 
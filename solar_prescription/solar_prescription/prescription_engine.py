@@ -5,6 +5,43 @@ Core logic for determining if a solar kit is suitable for a location and usage p
 
 import json
 import os
+import threading
+import time
+from bisect import bisect_right
+from types import MappingProxyType
+
+import numpy as np
+
+import batch
+import simulation
+import sizing
+from metrics import ENGINE_STAGE_SECONDS
+from models import (
+    Appliance,
+    ApplianceUse,
+    EnergyNeed,
+    Location,
+    Prescription,
+    ProductionProfile,
+    ProductionSummary,
+    Verdict,
+)
+
+PRODUCT_SPECS_PATH = os.path.join(
+    os.path.dirname(__file__), "products_specs", "products.json"
+)
+
+# How often the shared engine checks products.json for changes.
+SPECS_RELOAD_CHECK_SECONDS = 5.0
+
+
+def _freeze(value):
+    """Recursively convert dicts/lists into read-only mappings/tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
 
 
 class SolarPrescription:
@@ -12,18 +49,17 @@ class SolarPrescription:
     Generates solar kit prescriptions based on location, kit size, and energy needs
     """
 
-    def __init__(self):
+    def __init__(self, product_specs=None):
         self.prescription = {}
         # Load product specifications from JSON file
-        self.PRODUCT_SPECS = self._load_product_specs()
+        if product_specs is None:
+            product_specs = self._load_product_specs()
+        self.PRODUCT_SPECS = product_specs
 
     def _load_product_specs(self):
         """Load product specifications from JSON file"""
         try:
-            json_path = os.path.join(
-                os.path.dirname(__file__), "products_specs", "products.json"
-            )
-            with open(json_path, "r") as f:
+            with open(PRODUCT_SPECS_PATH, "r") as f:
                 specs = json.load(f)
                 # Convert string keys to integers
                 return {int(k): v for k, v in specs.items()}
@@ -57,19 +93,22 @@ class SolarPrescription:
 
     # Typical appliance power consumption (Watts)
     APPLIANCE_SPECS = {
-        "led_bulb": {"watts": 10, "hours": 5, "label": "Household LED Bulb (10W)"},
-        "kit_light": {"watts": 2, "hours": 5, "label": "Pico Kit Light Point (2W)"},
-        "phone_charger": {"watts": 10, "hours": 2, "label": "Phone Charger"},
-        "laptop": {"watts": 65, "hours": 4, "label": "Laptop"},
-        "small_tv": {"watts": 50, "hours": 4, "label": 'Small TV (24")'},
-        "large_tv": {"watts": 150, "hours": 4, "label": 'Large TV (42")'},
-        "fan": {"watts": 75, "hours": 8, "label": "Fan"},
-        "radio": {"watts": 10, "hours": 3, "label": "Radio"},
-        "wifi_router": {"watts": 10, "hours": 24, "label": "WiFi Router"},
-        "small_fridge": {"watts": 100, "hours": 24, "label": "Small Fridge (DC)"},
-        "laptop_charger": {"watts": 45, "hours": 3, "label": "Laptop Charger"},
-        "decoder": {"watts": 15, "hours": 4, "label": "TV Decoder"},
-        "security_lights": {"watts": 20, "hours": 12, "label": "Security Lights"},
+        appliance.id: appliance
+        for appliance in (
+            Appliance("led_bulb", "Household LED Bulb (10W)", 10, 5),
+            Appliance("kit_light", "Pico Kit Light Point (2W)", 2, 5),
+            Appliance("phone_charger", "Phone Charger", 10, 2),
+            Appliance("laptop", "Laptop", 65, 4),
+            Appliance("small_tv", 'Small TV (24")', 50, 4),
+            Appliance("large_tv", 'Large TV (42")', 150, 4),
+            Appliance("fan", "Fan", 75, 8),
+            Appliance("radio", "Radio", 10, 3),
+            Appliance("wifi_router", "WiFi Router", 10, 24),
+            Appliance("small_fridge", "Small Fridge (DC)", 100, 24),
+            Appliance("laptop_charger", "Laptop Charger", 45, 3),
+            Appliance("decoder", "TV Decoder", 15, 4),
+            Appliance("security_lights", "Security Lights", 20, 12),
+        )
     }
 
     # Kit sizes we support (in Watts)
@@ -90,17 +129,11 @@ class SolarPrescription:
 
             if app_id in self.APPLIANCE_SPECS:
                 spec = self.APPLIANCE_SPECS[app_id]
-                daily_wh = spec["watts"] * spec["hours"] * quantity
+                daily_wh = spec.watts * spec.hours * quantity
                 total_wh += daily_wh
 
                 appliance_details.append(
-                    {
-                        "name": spec["label"],
-                        "quantity": quantity,
-                        "watts": spec["watts"],
-                        "hours": spec["hours"],
-                        "daily_wh": daily_wh,
-                    }
+                    ApplianceUse(spec.label, quantity, spec.watts, spec.hours, daily_wh)
                 )
 
         return total_wh, appliance_details
@@ -123,13 +156,13 @@ class SolarPrescription:
         best_month_wh = max(monthly_wh) / 30 if monthly_wh else 0
         worst_month_wh = min(monthly_wh) / 30 if monthly_wh else 0
 
-        return {
-            "daily_avg": daily_avg_wh,
-            "best_month_daily": best_month_wh,
-            "worst_month_daily": worst_month_wh,
-            "annual_total": annual_wh,
-            "monthly": monthly_wh,
-        }
+        return ProductionProfile(
+            daily_avg=daily_avg_wh,
+            worst_month_daily=worst_month_wh,
+            best_month_daily=best_month_wh,
+            annual_total=annual_wh,
+            monthly=tuple(monthly_wh),
+        )
 
     def determine_verdict(
         self, production, need, kit_size=None, coverage_percentage=70
@@ -142,8 +175,8 @@ class SolarPrescription:
         Returns: verdict ('excellent', 'good', 'marginal', 'insufficient')
         """
         # Account for system losses (inverter, battery, wiring = 20% total)
-        usable_production = production["daily_avg"] * 0.8
-        worst_month_usable = production["worst_month_daily"] * 0.8
+        usable_production = production.daily_avg * 0.8
+        worst_month_usable = production.worst_month_daily * 0.8
 
         # Track if we used tested value instead of theoretical
         used_tested_value = False
@@ -203,15 +236,15 @@ class SolarPrescription:
             else:
                 verdict = "insufficient"
 
-        return {
-            "verdict": verdict,
-            "avg_coverage": round(avg_coverage, 1),
-            "worst_coverage": round(worst_coverage, 1),
-            "usable_daily": round(usable_production, 0),
-            "worst_month_usable": round(worst_month_usable, 0),
-            "used_tested_value": used_tested_value,
-            "coverage_percentage": coverage_percentage,
-        }
+        return Verdict(
+            verdict=verdict,
+            avg_coverage=round(avg_coverage, 1),
+            worst_coverage=round(worst_coverage, 1),
+            usable_daily=round(usable_production, 0),
+            worst_month_usable=round(worst_month_usable, 0),
+            used_tested_value=used_tested_value,
+            coverage_percentage=coverage_percentage,
+        )
 
     def get_recommendation(
         self,
@@ -228,7 +261,7 @@ class SolarPrescription:
         Args:
             coverage_percentage: Target coverage percentage (50, 70, or 90)
         """
-        verdict = verdict_info["verdict"]
+        verdict = verdict_info.verdict
 
         if verdict == "excellent":
             warnings = []
@@ -264,7 +297,7 @@ class SolarPrescription:
 
         elif verdict == "marginal":
             warnings = [
-                f'You\'ll get only {verdict_info["worst_coverage"]}% of your needs in the worst month',
+                f'You\'ll get only {verdict_info.worst_coverage}% of your needs in the worst month',
                 "Plan to reduce usage during rainy/cloudy periods",
                 "Consider upgrading to the next kit size for better reliability",
             ]
@@ -273,8 +306,10 @@ class SolarPrescription:
                     "⚠ Based on real-world tested values - theoretical calculations showed higher but unrealistic performance"
                 )
 
-            # Suggest next size up
-            next_size = self._get_next_kit_size(kit_size)
+            # Suggest the smallest larger kit that meets the coverage target
+            next_size = self._suggested_kit_size(
+                need, kit_size, production, coverage_percentage
+            )
 
             return {
                 "status": "warning",
@@ -286,17 +321,13 @@ class SolarPrescription:
             }
 
         else:  # insufficient
-            # Calculate needed size
-            # Size for reliability: base on worst-month usable energy, not annual average.
-            needed_size = self._calculate_needed_size(
-                need,
-                current_kit=kit_size,
-                current_kit_usable_wh_per_day=verdict_info.get("worst_month_usable", 0),
-                production_is_already_usable=True,
+            # Smallest kit rated good or better for this location and target
+            needed_size = self._suggested_kit_size(
+                need, kit_size, production, coverage_percentage
             )
 
             warnings_list = [
-                f'This kit only provides {verdict_info["avg_coverage"]}% of your daily needs',
+                f'This kit only provides {verdict_info.avg_coverage}% of your daily needs',
                 "You will experience frequent power shortages",
                 "Batteries will discharge completely, reducing their lifespan",
             ]
@@ -316,47 +347,33 @@ class SolarPrescription:
 
     def _get_next_kit_size(self, current_size):
         """Get the next available kit size"""
-        for size in self.KIT_SIZES:
-            if size > current_size:
-                return size
+        index = bisect_right(self.KIT_SIZES, current_size)
+        if index < len(self.KIT_SIZES):
+            return self.KIT_SIZES[index]
         return current_size * 1.5  # If no standard size, suggest 50% more
 
-    def _calculate_needed_size(
-        self,
-        need,
-        *,
-        current_kit,
-        current_kit_usable_wh_per_day,
-        production_is_already_usable=False,
-    ):
-        """Calculate what kit size is actually needed.
-
-        Uses the current kit's *usable* daily energy (ideally worst-month usable) to estimate
-        the Wh/W performance, then scales up with a 20% safety margin.
+    def size_kits(self, production_per_watt, need, targets=sizing.COVERAGE_TARGETS):
         """
-        if not current_kit or current_kit <= 0:
-            return self.KIT_SIZES[-1]
-
-        if not current_kit_usable_wh_per_day or current_kit_usable_wh_per_day <= 0:
-            return self._get_next_kit_size(current_kit)
-
-        # How much usable energy do we get per watt of kit size?
-        usable_wh_per_watt = current_kit_usable_wh_per_day / current_kit
-
-        # If the provided production is still *theoretical*, apply 20% system losses.
-        # If it's already usable (loss-adjusted or product-tested), don't double-apply losses.
-        loss_factor = 1.0 if production_is_already_usable else 0.8
+        Smallest kit and product meeting each coverage target (50/70/90)
 
-        # What size do we need for the required energy (with 20% margin)?
-        needed_watts = (need * 1.2) / (usable_wh_per_watt * loss_factor)
-
-        # Round up to next standard size
-        for size in self.KIT_SIZES:
-            if size >= needed_watts:
-                return size
-
-        # If larger than our standard sizes, round to nearest 100W
-        return int((needed_watts + 99) // 100 * 100)
+        Args:
+            production_per_watt: get_daily_production output divided by kit watts
+                (see sizing.production_per_watt)
+        Returns: {target: {"kit_size", "verdict", "product"} or None}
+        """
+        return sizing.size_kits(self, production_per_watt, need, targets)
+
+    def _suggested_kit_size(self, need, kit_size, production, coverage_percentage):
+        sized = sizing.size_for_target(
+            self,
+            sizing.production_per_watt(production, kit_size),
+            need,
+            coverage_percentage,
+            above=kit_size,
+        )
+        if sized is None:
+            return self._get_next_kit_size(kit_size)
+        return sized["kit_size"]
 
     def generate_prescription(
         self,
@@ -373,27 +390,43 @@ class SolarPrescription:
 
         Args:
             coverage_percentage: Target percentage (50, 70, or 90) of year to meet energy needs
+        Returns: models.Prescription (models.to_json gives the JSON form)
         """
         # Calculate energy need
+        # Stage timings for /metrics (plain clock reads: ~1 us per stage)
+        started = time.perf_counter()
         daily_need, appliance_details = self.calculate_daily_energy_need(appliances)
+        ENGINE_STAGE_SECONDS.observe(time.perf_counter() - started, "calculate_daily_energy_need")
 
         # Get production data
         production = self.get_daily_production(pvwatts_data, kit_size)
 
         # Determine verdict (pass kit_size and coverage_percentage to use tested values for small kits)
+        started = time.perf_counter()
         verdict_info = self.determine_verdict(
             production, daily_need, kit_size, coverage_percentage
         )
+        ENGINE_STAGE_SECONDS.observe(time.perf_counter() - started, "determine_verdict")
 
         # Get recommendation
+        started = time.perf_counter()
         recommendation = self.get_recommendation(
             verdict_info,
             daily_need,
             kit_size,
             production,
-            used_tested_value=verdict_info.get("used_tested_value", False),
+            used_tested_value=verdict_info.used_tested_value,
             coverage_percentage=coverage_percentage,
         )
+        ENGINE_STAGE_SECONDS.observe(time.perf_counter() - started, "get_recommendation")
+
+        # Smallest kit for the requested coverage target, from this kit's
+        # per-watt yield (the other targets are not shown, so not sized)
+        kit_options = self.size_kits(
+            sizing.production_per_watt(production, kit_size),
+            daily_need,
+            targets=(coverage_percentage,),
+        )
 
         # Get irradiance warnings based on location
         irradiance_warnings = self._get_irradiance_warnings(latitude, production)
@@ -430,38 +463,186 @@ class SolarPrescription:
             }
 
         # Compile complete prescription
-        prescription = {
-            "location": {
-                "name": location,
-                "latitude": round(latitude, 4),
-                "longitude": round(longitude, 4),
-            },
-            "kit_size": kit_size,
-            "product_info": product_info,
-            "energy_need": {
-                "daily_wh": round(daily_need, 0),
-                "appliances": appliance_details,
-            },
-            "production": {
-                "daily_avg": round(
-                    verdict_info["usable_daily"], 0
-                ),  # Use actual usable value
-                "theoretical_avg": round(
-                    production["daily_avg"], 0
-                ),  # Keep theoretical for reference
-                "best_month": round(production["best_month_daily"], 0),
-                "worst_month": round(production["worst_month_daily"], 0),
-                "annual_kwh": round(production["annual_total"] / 1000, 0),
-                "using_tested_value": verdict_info.get("used_tested_value", False),
+        prescription = Prescription(
+            location=Location(location, round(latitude, 4), round(longitude, 4)),
+            kit_size=kit_size,
+            product_info=product_info,
+            energy_need=EnergyNeed(round(daily_need, 0), tuple(appliance_details)),
+            production=ProductionSummary(
+                daily_avg=round(verdict_info.usable_daily, 0),  # Use actual usable value
+                theoretical_avg=round(production.daily_avg, 0),  # Keep theoretical for reference
+                best_month=round(production.best_month_daily, 0),
+                worst_month=round(production.worst_month_daily, 0),
+                annual_kwh=round(production.annual_total / 1000, 0),
+                using_tested_value=verdict_info.used_tested_value,
+            ),
+            verdict=verdict_info,
+            recommendation=recommendation,
+            sizing={
+                str(target): (
+                    {
+                        "kit_size": option["kit_size"],
+                        "verdict": option["verdict"].verdict,
+                        "product": option["product"],
+                    }
+                    if option
+                    else None
+                )
+                for target, option in kit_options.items()
             },
-            "verdict": verdict_info,
-            "recommendation": recommendation,
-            "irradiance_warnings": irradiance_warnings,
-            "timestamp": datetime.now().isoformat(),
-        }
+            irradiance_warnings=irradiance_warnings,
+            timestamp=datetime.now().isoformat(),
+        )
 
         return prescription
 
+    def generate_prescriptions_batch(self, households, reference_profiles, kit_sizes=None):
+        """
+        Vectorized verdicts for many households against many kit sizes
+
+        Args:
+            households: dicts with "appliances", "profile" (index into
+                reference_profiles) and optional "coverage_percentage" (default 70)
+                and "kit_size"
+            reference_profiles: 1 kW PVWatts responses, one per distinct location
+            kit_sizes: kit sizes to evaluate (defaults to KIT_SIZES)
+        Returns: batch.BatchPrescriptions (columnar; use .records() for dicts)
+        """
+        kit_sizes = list(kit_sizes or self.KIT_SIZES)
+
+        appliance_lists = []
+        coverage = []
+        chosen = []
+        profile_rows = []
+        for household in households:
+            appliance_lists.append(household.get("appliances", []))
+            coverage.append(household.get("coverage_percentage", 70))
+            chosen.append(household.get("kit_size"))
+            profile_rows.append(household["profile"])
+
+        need = batch.energy_need(self, appliance_lists)
+        coverage = np.array(coverage, dtype=np.int64)
+        annual, worst_month = batch.reference_arrays(reference_profiles)
+        profile_index = np.array(profile_rows, dtype=np.intp)
+        daily_avg, worst_month_daily = batch.daily_production(
+            annual[profile_index], worst_month[profile_index], kit_sizes
+        )
+
+        verdict_arrays = batch.verdicts(
+            self, daily_avg, worst_month_daily, need, kit_sizes, coverage
+        )
+        return batch.BatchPrescriptions(
+            kit_sizes,
+            need,
+            coverage,
+            verdict_arrays,
+            kit_size=chosen if any(k is not None for k in chosen) else None,
+        )
+
+    def compare_kits(self, reference_data, appliances, coverage_percentage=70, catalog=None):
+        """
+        Rank every standard kit size (and catalog product) for one location
+
+        Args:
+            reference_data: 1 kW PVWatts response for the location
+            appliances: same format as generate_prescription
+            catalog: optional catalog.KitCatalog; its products are rated on
+                theoretical output at their PV wattage (no tested values)
+        Returns: dict with "daily_wh", "recommended" and "options", the latter
+            ranked by fit: kits rated good or better first, smallest first,
+            then the rest by average coverage
+        """
+        need, _ = self.calculate_daily_energy_need(appliances)
+        kit_sizes = list(self.KIT_SIZES)
+        # Rows without a usable PV rating (0 W lamps, bad data) cannot be sized.
+        catalog_rows = catalog.index_range(min_watts=1) if catalog is not None else range(0)
+        sizes = kit_sizes + [catalog.watts[i] for i in catalog_rows]
+        tested = np.concatenate(
+            [batch.tested_daily_energy(self, kit_sizes), np.zeros(len(catalog_rows))]
+        )
+
+        annual, worst_month = batch.reference_arrays([reference_data])
+        daily_avg, worst_month_daily = batch.daily_production(annual, worst_month, sizes)
+        results = batch.BatchPrescriptions(
+            sizes,
+            np.array([need], dtype=np.float64),
+            np.array([coverage_percentage]),
+            batch.verdicts(
+                self,
+                daily_avg,
+                worst_month_daily,
+                [need],
+                sizes,
+                [coverage_percentage],
+                tested_energy=tested,
+            ),
+        )
+
+        codes = results.codes[0]
+        approved = codes >= batch.GOOD
+        group = np.where(approved, 0, np.where(codes == batch.MARGINAL, 1, 2))
+        within = np.where(approved, np.asarray(sizes, dtype=np.float64), -results.avg_coverage[0])
+        order = np.lexsort((np.arange(len(sizes)), within, group))
+
+        options = []
+        for rank, col in enumerate(order.tolist(), start=1):
+            if col < len(kit_sizes):
+                specs = self.PRODUCT_SPECS.get(sizes[col])
+                product = (
+                    {"model": specs["model"], "brand": specs["brand"], "type": specs["type"]}
+                    if specs
+                    else None
+                )
+                source = "kit"
+            else:
+                row = catalog.row(catalog_rows[col - len(kit_sizes)])
+                product = {
+                    "model": row.get("Model Number"),
+                    "brand": row.get("Brand"),
+                    "name": row.get("Product Name"),
+                    "light_points": row.get("Number of Light Points"),
+                    "battery_chemistry": row.get("Main Unit Battery Chemistry"),
+                }
+                source = "catalog"
+            options.append(
+                {
+                    "rank": rank,
+                    "source": source,
+                    "watts": int(sizes[col]),
+                    "verdict": results.verdict(0, col),
+                    "product": product,
+                }
+            )
+
+        return {
+            "daily_wh": round(need, 0),
+            "coverage_percentage": coverage_percentage,
+            "recommended": options[0] if options and approved[order[0]] else None,
+            "options": options,
+        }
+
+    def simulate_battery(self, reference_data, appliances, kit_sizes=None):
+        """
+        Hour-by-hour energy balance over a year, including each kit's battery
+
+        Args:
+            reference_data: 1 kW PVWatts response, ideally with the hourly "ac"
+                series (monthly totals are shaped into days otherwise)
+            appliances: same format as generate_prescription
+            kit_sizes: kit sizes to simulate (defaults to KIT_SIZES)
+        Returns: one dict per kit (loss-of-load hours, shortfall days,
+            unserved %, days of autonomy)
+        """
+        kit_sizes = list(kit_sizes or self.KIT_SIZES)
+        batteries = [simulation.battery_for_kit(self.PRODUCT_SPECS, k) for k in kit_sizes]
+        return simulation.simulate(
+            simulation.hourly_profile(reference_data),
+            simulation.load_profile(appliances, self.APPLIANCE_SPECS),
+            kit_sizes,
+            np.array([wh for wh, _ in batteries]),
+            np.array([usable for _, usable in batteries]),
+        )
+
     def _get_irradiance_warnings(self, latitude, production):
         """
         Generate location-specific warnings based on irradiance
@@ -487,11 +668,11 @@ class SolarPrescription:
         # Check actual production variance
         variance = (
             (
-                (production["best_month_daily"] - production["worst_month_daily"])
-                / production["best_month_daily"]
+                (production.best_month_daily - production.worst_month_daily)
+                / production.best_month_daily
                 * 100
             )
-            if production["best_month_daily"] > 0
+            if production.best_month_daily > 0
             else 0
         )
 
@@ -513,4 +694,49 @@ class SolarPrescription:
         return warnings
 
 
+_engine = None
+_engine_mtime = None
+_engine_checked_at = 0.0
+_engine_lock = threading.Lock()
+
+
+def _specs_mtime():
+    try:
+        return os.stat(PRODUCT_SPECS_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_engine():
+    """
+    Return the process-wide SolarPrescription.
+
+    The engine and its product catalog are read-only and shared by all request
+    threads. products.json is re-checked at most every SPECS_RELOAD_CHECK_SECONDS
+    and the engine is swapped out only when the file's mtime changes.
+    """
+    global _engine, _engine_mtime, _engine_checked_at
+
+    engine = _engine
+    if (
+        engine is not None
+        and time.monotonic() - _engine_checked_at < SPECS_RELOAD_CHECK_SECONDS
+    ):
+        return engine
+
+    with _engine_lock:
+        now = time.monotonic()
+        if _engine is not None and now - _engine_checked_at < SPECS_RELOAD_CHECK_SECONDS:
+            return _engine
+
+        mtime = _specs_mtime()
+        if _engine is None or mtime != _engine_mtime:
+            fresh = SolarPrescription()
+            fresh.PRODUCT_SPECS = _freeze(fresh.PRODUCT_SPECS)
+            _engine = fresh
+            _engine_mtime = mtime
+        _engine_checked_at = now
+        return _engine
+
+
 from datetime import datetime
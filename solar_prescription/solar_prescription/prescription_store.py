@@ -0,0 +1,184 @@
+"""
+Prescription store
+Server-side home for generated prescriptions. The session cookie carries only
+a compact ID, and /results/<id> makes every prescription shareable by URL.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+DEFAULT_STORE_PATH = os.path.join(
+    os.path.dirname(__file__), "instance", "prescriptions.sqlite3"
+)
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 100000
+MEMORY_ENTRIES = 256
+
+# 9 digest bytes -> 12 URL-safe characters.
+ID_BYTES = 9
+_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{12}$")
+
+
+def make_prescription_id(record):
+    """
+    Content-derived ID: the same prescription always gets the same URL.
+
+    The prescription's generation timestamp is left out of the hash, otherwise
+    every request would mint a fresh ID for identical results.
+    """
+    prescription = record.get("prescription")
+    if isinstance(prescription, dict) and "timestamp" in prescription:
+        prescription = {k: v for k, v in prescription.items() if k != "timestamp"}
+        record = dict(record, prescription=prescription)
+    canonical = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.blake2b(canonical.encode("utf-8"), digest_size=ID_BYTES).digest()
+    return base64.urlsafe_b64encode(digest).decode("ascii")
+
+
+def is_valid_id(prescription_id):
+    return bool(prescription_id) and bool(_ID_PATTERN.match(prescription_id))
+
+
+class PrescriptionStore:
+    """
+    Prescription records keyed by ID, with a TTL and a cap on stored entries.
+
+    Records are zlib-compressed JSON in SQLite, so they survive restarts and are
+    shared between worker processes; recently used ones stay in an in-process LRU.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_STORE_PATH,
+        ttl_seconds=DEFAULT_TTL_SECONDS,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        memory_entries=MEMORY_ENTRIES,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS prescriptions (
+                id TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_prescriptions_created ON prescriptions (created_at)"
+        )
+        self._conn.commit()
+
+    def put(self, record):
+        """Store a JSON-serializable record and return its ID."""
+        prescription_id = make_prescription_id(record)
+        payload = zlib.compress(
+            json.dumps(record, separators=(",", ":"), default=str).encode("utf-8")
+        )
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO prescriptions (id, payload, created_at) VALUES (?, ?, ?)",
+                (prescription_id, payload, now),
+            )
+            self._conn.execute(
+                "DELETE FROM prescriptions WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM prescriptions").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM prescriptions WHERE id IN "
+                    "(SELECT id FROM prescriptions ORDER BY created_at ASC LIMIT ?)",
+                    (overflow,),
+                )
+            self._conn.commit()
+            self._remember(prescription_id, now, record)
+        return prescription_id
+
+    def get(self, prescription_id):
+        """Return the stored record, or None if unknown or expired."""
+        if not is_valid_id(prescription_id):
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(prescription_id)
+            if entry is not None:
+                created_at, record = entry
+                if now - created_at < self.ttl_seconds:
+                    self._memory.move_to_end(prescription_id)
+                    return record
+                del self._memory[prescription_id]
+
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM prescriptions WHERE id = ?",
+                (prescription_id,),
+            ).fetchone()
+            if row is None or now - row[1] >= self.ttl_seconds:
+                return None
+            record = json.loads(zlib.decompress(row[0]).decode("utf-8"))
+            self._remember(prescription_id, row[1], record)
+            return record
+
+    def recent(self, limit=1000):
+        """Up to limit unexpired records, newest first (bypasses the memory LRU)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM prescriptions WHERE created_at >= ? "
+                "ORDER BY created_at DESC LIMIT ?",
+                (time.time() - self.ttl_seconds, limit),
+            ).fetchall()
+        for (payload,) in rows:
+            yield json.loads(zlib.decompress(payload).decode("utf-8"))
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM prescriptions").fetchone()[0]
+            return {"entries": size, "memory_entries": len(self._memory)}
+
+    def _remember(self, prescription_id, created_at, record):
+        self._memory[prescription_id] = (created_at, record)
+        self._memory.move_to_end(prescription_id)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide prescription store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PrescriptionStore(
+                    path=os.getenv("PRESCRIPTION_STORE_PATH") or DEFAULT_STORE_PATH,
+                    ttl_seconds=float(
+                        os.getenv("PRESCRIPTION_STORE_TTL", DEFAULT_TTL_SECONDS)
+                    ),
+                    max_entries=int(
+                        os.getenv("PRESCRIPTION_STORE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+                    ),
+                )
+    return _store
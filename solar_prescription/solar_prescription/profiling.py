@@ -0,0 +1,198 @@
+"""
+Request Profiling
+Opt-in cProfile capture of individual requests, for latency spikes that do
+not reproduce locally. Profiles are written as pstats files to a bounded
+on-disk ring buffer and listed/downloaded through the /admin/profiles routes.
+
+A request is profiled when any of these is configured:
+  PROFILE_REQUESTS=1        every request
+  PROFILE_SAMPLE_RATE=0.01  a random fraction of requests
+  X-Profile: <ADMIN_TOKEN>  this request (header; needs ADMIN_TOKEN set)
+
+With none of them set the middleware is never installed, so profiling costs
+nothing. At most one request is profiled at a time; concurrent requests run
+unprofiled.
+"""
+
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+from werkzeug.wsgi import ClosingIterator
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(__file__), "instance", "profiles")
+DEFAULT_MAX_FILES = 50
+PROFILE_HEADER = "HTTP_X_PROFILE"
+
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+\.prof$")
+_UNSAFE = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def _env_flag(name):
+    return os.getenv(name, "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def admin_token():
+    return os.getenv("ADMIN_TOKEN") or None
+
+
+def check_admin_token(supplied):
+    """Constant-time comparison against ADMIN_TOKEN; False when no token is configured."""
+    token = admin_token()
+    return bool(token and supplied) and hmac.compare_digest(
+        str(supplied).encode("utf-8"), token.encode("utf-8")
+    )
+
+
+class ProfileStore:
+    """Directory of .prof files holding at most max_files, oldest removed first."""
+
+    def __init__(self, path=DEFAULT_PROFILE_DIR, max_files=DEFAULT_MAX_FILES):
+        self.path = path
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def save(self, profiler, method, path, status, duration_ms):
+        os.makedirs(self.path, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        route = _UNSAFE.sub("_", path.strip("/")) or "index"
+        name = f"{stamp}_{method}_{route[:60]}_{status}_{duration_ms:.0f}ms.prof"
+        profiler.dump_stats(os.path.join(self.path, name))
+        self._trim()
+        return name
+
+    def list(self):
+        """Newest first: name, size and creation time of every stored profile."""
+        if not os.path.isdir(self.path):
+            return []
+        entries = []
+        for name in os.listdir(self.path):
+            if not _NAME_PATTERN.match(name):
+                continue
+            stat = os.stat(os.path.join(self.path, name))
+            entries.append(
+                {
+                    "name": name,
+                    "bytes": stat.st_size,
+                    "created": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(),
+                }
+            )
+        entries.sort(key=lambda entry: entry["name"], reverse=True)
+        return entries
+
+    def file_path(self, name):
+        """Absolute path of a stored profile, or None for unknown/unsafe names."""
+        if not _NAME_PATTERN.match(name or ""):
+            return None
+        full = os.path.join(self.path, name)
+        return full if os.path.isfile(full) else None
+
+    def summary(self, name, limit=40):
+        """pstats text report (cumulative time) for a stored profile."""
+        full = self.file_path(name)
+        if full is None:
+            return None
+        out = io.StringIO()
+        stats = pstats.Stats(full, stream=out)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    def _trim(self):
+        with self._lock:
+            names = sorted(n for n in os.listdir(self.path) if _NAME_PATTERN.match(n))
+            for name in names[: max(0, len(names) - self.max_files)]:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    pass
+
+
+class ProfilingMiddleware:
+    """WSGI middleware that runs selected requests under cProfile."""
+
+    def __init__(self, wsgi_app, store, sample_rate=0.0, profile_all=False):
+        self.wsgi_app = wsgi_app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.profile_all = profile_all
+        # cProfile (sys.monitoring on 3.12+) allows one active profiler per process.
+        self._active = threading.Lock()
+
+    def _wanted(self, environ):
+        if self.profile_all:
+            return True
+        header = environ.get(PROFILE_HEADER)
+        if header and check_admin_token(header):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        if not self._wanted(environ) or not self._active.acquire(blocking=False):
+            return self.wsgi_app(environ, start_response)
+
+        status_holder = []
+
+        def capture_status(status, headers, exc_info=None):
+            status_holder.append(status.split(" ", 1)[0])
+            return start_response(status, headers, exc_info)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        finished = []
+
+        def finish():
+            # Runs once the server closes the response, so streamed bodies
+            # (bulk downloads, send_file) are profiled and timed in full.
+            if finished:
+                return
+            finished.append(True)
+            try:
+                profiler.disable()
+                duration_ms = (time.perf_counter() - started) * 1000
+                try:
+                    self.store.save(
+                        profiler,
+                        environ.get("REQUEST_METHOD", "GET"),
+                        environ.get("PATH_INFO", "/"),
+                        status_holder[0] if status_holder else "000",
+                        duration_ms,
+                    )
+                except OSError as e:
+                    print(f"Could not save request profile: {e}")
+            finally:
+                self._active.release()
+
+        try:
+            profiler.enable()
+            app_iter = self.wsgi_app(environ, capture_status)
+        except BaseException:
+            finish()
+            raise
+        return ClosingIterator(app_iter, finish)
+
+
+def install(app):
+    """
+    Wrap app.wsgi_app when profiling is configured via the environment.
+
+    Returns the ProfileStore used for saved profiles (the admin routes read it
+    even when profiling is currently off).
+    """
+    store = ProfileStore(
+        path=os.getenv("PROFILE_DIR") or DEFAULT_PROFILE_DIR,
+        max_files=int(os.getenv("PROFILE_MAX_FILES", DEFAULT_MAX_FILES)),
+    )
+    sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0") or 0)
+    profile_all = _env_flag("PROFILE_REQUESTS")
+    if profile_all or sample_rate > 0 or admin_token():
+        app.wsgi_app = ProfilingMiddleware(
+            app.wsgi_app, store, sample_rate=sample_rate, profile_all=profile_all
+        )
+    return store
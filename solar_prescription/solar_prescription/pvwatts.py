@@ -1,15 +1,73 @@
 import os
+import time
+from dataclasses import dataclass
 import requests
 from dotenv import load_dotenv
 
+from metrics import UPSTREAM_SECONDS
+from pvwatts_cache import get_cache, make_cache_key, normalize_outputs, scale_outputs
+import solar_grid
+from singleflight import SingleFlight
+from upstream import NREL_PVWATTS_URL, gather, get_client
+
 # Load environment variables from .env file (path-safe)
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
 
 # Retrieve the API key from environment variables
 API_KEY = os.getenv('NREL_API_KEY')
-BASE_URL = 'https://developer.nrel.gov/api/pvwatts/v8.json'
+BASE_URL = NREL_PVWATTS_URL
+
+_in_flight = SingleFlight()
+
+
+@dataclass(frozen=True, slots=True)
+class PVWattsError:
+    """A failed NREL call: the error message and the HTTP status, if there was one."""
+
+    message: str
+    status_code: int | None = None
+
+    def __str__(self):
+        return self.message
+
+
+# Where production data comes from: "pvwatts" (NREL, default), "offline" (the
+# precomputed grid in solar_grid.py only) or "auto" (grid when it covers the
+# location, NREL otherwise).
+SOLAR_DATA_PROVIDER = os.getenv('SOLAR_DATA_PROVIDER', 'pvwatts').strip().lower()
+
+def default_orientation(latitude):
+    """Return (tilt, azimuth) for a fixed roof-mounted array at this latitude."""
+    # Calculate optimal tilt (use 15° minimum for near-equator locations)
+    optimal_tilt = max(15, abs(latitude))
+
+    # Calculate azimuth: 180° (south) for Northern Hemisphere, 0° (north) for Southern
+    # But use 180° for locations very close to equator (within 5°)
+    if abs(latitude) < 5:
+        azimuth = 180  # Default to south-facing near equator
+    else:
+        azimuth = 180 if latitude >= 0 else 0
+    return optimal_tilt, azimuth
+
+def get_pvwatts_data(system_capacity, module_type, array_type, tilt, azimuth, lat, lon, losses,
+                     hourly=False):
+    """Return (data, error). With hourly=True, outputs also carry the 8760-value 'ac' series (W)."""
+    if SOLAR_DATA_PROVIDER in ('offline', 'auto'):
+        data, error = solar_grid.get_pvwatts_data(
+            system_capacity, module_type, array_type, tilt, azimuth, lat, lon, losses
+        )
+        if data is not None or SOLAR_DATA_PROVIDER == 'offline':
+            return data, error
+
+    # PVWatts output is linear in system_capacity, so the cache stores per-kW
+    # values and any capacity at the same site/array is served from one entry.
+    cache = get_cache()
+    cache_key = make_cache_key(lat, lon, tilt, azimuth, array_type, module_type, losses)
+    if cache is not None:
+        per_kw = cache.get(cache_key)
+        if per_kw is not None and (not hourly or 'ac' in per_kw):
+            return {'outputs': scale_outputs(per_kw, system_capacity, hourly), 'cached': True}, None
 
-def get_pvwatts_data(system_capacity, module_type, array_type, tilt, azimuth, lat, lon, losses):
     params = {
         'api_key': API_KEY,
         'system_capacity': system_capacity,
@@ -22,10 +80,102 @@ def get_pvwatts_data(system_capacity, module_type, array_type, tilt, azimuth, la
         'losses': losses,
         'format': 'json'
     }
-    try:
-        response = requests.get(BASE_URL, params=params)
-        response.raise_for_status()  # Raise an exception for HTTP errors
-        return response.json(), None  # Return data and no error
-    except requests.exceptions.RequestException as e:
-        print(f"Error: {e}")  # Log the error to the console
-        return None, str(e)  # Return no data and the error message
+    if hourly:
+        params['timeframe'] = 'hourly'
+
+    def fetch():
+        # A caller that just finished may have filled the cache while we queued.
+        if cache is not None:
+            per_kw = cache.get(cache_key)
+            if per_kw is not None and (not hourly or 'ac' in per_kw):
+                return {'outputs': scale_outputs(per_kw, system_capacity, hourly), 'cached': True}, None
+        start = time.perf_counter()
+        try:
+            # Pooled session with connect/read timeouts; raises for HTTP errors
+            data = get_client().get_json(BASE_URL, params=params)
+        except requests.exceptions.RequestException as e:
+            UPSTREAM_SECONDS.observe(time.perf_counter() - start, 'pvwatts', 'error')
+            print(f"Error: {e}")  # Log the error to the console
+            # Return no data and the error message (with the HTTP status, if there was one)
+            status_code = getattr(getattr(e, 'response', None), 'status_code', None)
+            return None, PVWattsError(str(e), status_code)
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, 'pvwatts', 'ok')
+
+        outputs = (data or {}).get('outputs') or {}
+        if cache is not None and outputs.get('ac_monthly') and float(system_capacity) > 0:
+            cache.put(cache_key, normalize_outputs(outputs, system_capacity))
+        return data, None  # Return data and no error
+
+    # Identical concurrent lookups (same bucket, array and capacity) share one NREL call.
+    return _in_flight.do((cache_key, float(system_capacity), hourly), fetch)
+
+def coalescing_stats():
+    """Counters for coalesced PVWatts lookups (executions vs. callers that piggybacked)."""
+    return _in_flight.stats()
+
+# Capacity of the reference system fetched for a location. Every kit size is
+# derived from this one profile, so a prescription needs at most one upstream call.
+REFERENCE_CAPACITY_KW = 1.0
+
+def get_reference_profile(lat, lon, tilt, azimuth, module_type=0, array_type=1, losses=14,
+                          hourly=False):
+    """Fetch the 1 kW PVWatts profile for a location (cached, at most one NREL call)."""
+    return get_pvwatts_data(
+        system_capacity=REFERENCE_CAPACITY_KW,
+        module_type=module_type,
+        array_type=array_type,
+        tilt=tilt,
+        azimuth=azimuth,
+        lat=lat,
+        lon=lon,
+        losses=losses,
+        hourly=hourly,
+    )
+
+def get_cached_reference_profile(lat, lon, tilt, azimuth, module_type=0, array_type=1, losses=14):
+    """Return the 1 kW profile only if it is available without an NREL call, else None.
+
+    Served from the PVWatts cache, or from the offline grid when SOLAR_DATA_PROVIDER
+    allows it. Never touches the network.
+    """
+    if SOLAR_DATA_PROVIDER in ('offline', 'auto'):
+        data, error = solar_grid.get_pvwatts_data(
+            REFERENCE_CAPACITY_KW, module_type, array_type, tilt, azimuth, lat, lon, losses
+        )
+        if not error or SOLAR_DATA_PROVIDER == 'offline':
+            return data
+
+    cache = get_cache()
+    if cache is None:
+        return None
+    per_kw = cache.get(make_cache_key(lat, lon, tilt, azimuth, array_type, module_type, losses))
+    if per_kw is None:
+        return None
+    # Monthly figures only; scaling an hourly series here would be wasted work.
+    monthly = {'ac_annual': per_kw['ac_annual'], 'ac_monthly': per_kw['ac_monthly']}
+    return {'outputs': scale_outputs(monthly, REFERENCE_CAPACITY_KW), 'cached': True}
+
+def scale_to_kit(reference_data, kit_watts):
+    """Derive PVWatts-shaped data for a kit of kit_watts from a 1 kW reference profile."""
+    outputs = (reference_data or {}).get('outputs') or {}
+    scale = (kit_watts / 1000) / REFERENCE_CAPACITY_KW
+    scaled = {}
+    if 'ac_annual' in outputs:
+        scaled['ac_annual'] = outputs['ac_annual'] * scale
+    for key in ('ac_monthly', 'dc_monthly', 'ac'):
+        if key in outputs:
+            scaled[key] = [x * scale for x in outputs[key]]
+    return {'outputs': scaled}
+
+def get_reference_profiles(locations):
+    """Fetch reference profiles for many (lat, lon, tilt, azimuth) locations concurrently.
+
+    Returns a list of (data, error) tuples in the same order as locations.
+    """
+    client = get_client()
+    return gather(
+        [
+            client.arun(get_reference_profile, lat=lat, lon=lon, tilt=tilt, azimuth=azimuth)
+            for lat, lon, tilt, azimuth in locations
+        ]
+    )
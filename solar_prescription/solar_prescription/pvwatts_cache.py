@@ -0,0 +1,242 @@
+"""
+PVWatts response cache
+Disk-backed (SQLite) cache of capacity-normalized PVWatts outputs, keyed on a
+coordinate bucket plus the array parameters that change the result.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(__file__), "instance", "pvwatts_cache.sqlite3"
+)
+
+# ~5 km buckets: finer than this buys nothing, PVWatts resolves to a ~4 km
+# NSRDB grid cell anyway.
+COORD_BUCKET_DEGREES = 0.05
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+MEMORY_ENTRIES = 512
+
+
+def make_cache_key(lat, lon, tilt, azimuth, array_type, module_type, losses):
+    """Build the cache key for a PVWatts lookup (capacity is not part of it)."""
+    lat_bucket = round(round(float(lat) / COORD_BUCKET_DEGREES) * COORD_BUCKET_DEGREES, 4)
+    lon_bucket = round(round(float(lon) / COORD_BUCKET_DEGREES) * COORD_BUCKET_DEGREES, 4)
+    return "|".join(
+        str(part)
+        for part in (
+            lat_bucket,
+            lon_bucket,
+            round(float(tilt), 1),
+            round(float(azimuth), 1),
+            int(array_type),
+            int(module_type),
+            round(float(losses), 1),
+        )
+    )
+
+
+class PVWattsCache:
+    """
+    Per-kW PVWatts outputs with a TTL and LRU eviction.
+
+    Hot keys are served from an in-process LRU; SQLite keeps entries across
+    restarts and between worker processes.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_CACHE_PATH,
+        ttl_seconds=DEFAULT_TTL_SECONDS,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        memory_entries=MEMORY_ENTRIES,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._memory = OrderedDict()
+        # Memory hits skip SQLite; their access times are flushed before eviction.
+        self._touched = {}
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pvwatts_cache (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_pvwatts_accessed ON pvwatts_cache (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        """Return the per-kW outputs dict for key, or None on a miss/expiry."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, outputs = entry
+                if now - created_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._touched[key] = now
+                    self.hits += 1
+                    return outputs
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM pvwatts_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            payload, created_at = row
+            if now - created_at >= self.ttl_seconds:
+                self._conn.execute("DELETE FROM pvwatts_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE pvwatts_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            outputs = json.loads(payload)
+            if "ac" in outputs:
+                outputs["ac"] = array("f", outputs["ac"])
+            self._remember(key, created_at, outputs)
+            self.hits += 1
+            return outputs
+
+    def put(self, key, outputs):
+        """Store per-kW outputs for key, evicting least-recently used entries."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pvwatts_cache (key, payload, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(outputs, default=list), now, now),
+            )
+            self._touched.pop(key, None)
+            if self._touched:
+                self._conn.executemany(
+                    "UPDATE pvwatts_cache SET accessed_at = ? WHERE key = ?",
+                    [(t, k) for k, t in self._touched.items()],
+                )
+                self._touched.clear()
+            count = self._conn.execute("SELECT COUNT(*) FROM pvwatts_cache").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                evicted = [
+                    row[0]
+                    for row in self._conn.execute(
+                        "SELECT key FROM pvwatts_cache ORDER BY accessed_at ASC LIMIT ?",
+                        (overflow,),
+                    )
+                ]
+                self._conn.executemany(
+                    "DELETE FROM pvwatts_cache WHERE key = ?", [(k,) for k in evicted]
+                )
+                for evicted_key in evicted:
+                    self._memory.pop(evicted_key, None)
+                self.evictions += len(evicted)
+            self._conn.commit()
+            self._remember(key, now, outputs)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM pvwatts_cache")
+            self._conn.commit()
+            self._memory.clear()
+            self._touched.clear()
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM pvwatts_cache").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": size,
+                "memory_entries": len(self._memory),
+            }
+
+    def _remember(self, key, created_at, outputs):
+        self._memory[key] = (created_at, outputs)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+
+def normalize_outputs(outputs, system_capacity):
+    """Convert PVWatts outputs for a system into per-kW values (hourly 'ac' kept if present)."""
+    capacity = float(system_capacity)
+    normalized = {
+        "ac_annual": float(outputs.get("ac_annual", 0)) / capacity,
+        "ac_monthly": [float(x) / capacity for x in outputs.get("ac_monthly", [])],
+    }
+    if outputs.get("ac"):
+        # float32 keeps an 8760-hour series at ~35 KB in the memory tier.
+        normalized["ac"] = array("f", (float(x) / capacity for x in outputs["ac"]))
+    return normalized
+
+
+def scale_outputs(per_kw_outputs, system_capacity, hourly=False):
+    """
+    Scale per-kW outputs back up to a system of system_capacity kW.
+
+    The 8760-value 'ac' series is only scaled when hourly=True; monthly-only
+    callers skip it.
+    """
+    capacity = float(system_capacity)
+    scaled = {
+        "ac_annual": per_kw_outputs["ac_annual"] * capacity,
+        "ac_monthly": [x * capacity for x in per_kw_outputs["ac_monthly"]],
+    }
+    if hourly and "ac" in per_kw_outputs:
+        scaled["ac"] = [x * capacity for x in per_kw_outputs["ac"]]
+    return scaled
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide cache, or None when disabled via PVWATTS_CACHE=0."""
+    global _cache
+    if os.getenv("PVWATTS_CACHE", "1").strip().lower() in {"0", "false", "no", "off"}:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PVWattsCache(
+                    path=os.getenv("PVWATTS_CACHE_PATH") or DEFAULT_CACHE_PATH,
+                    ttl_seconds=float(
+                        os.getenv("PVWATTS_CACHE_TTL", DEFAULT_TTL_SECONDS)
+                    ),
+                    max_entries=int(
+                        os.getenv("PVWATTS_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+                    ),
+                )
+    return _cache
@@ -0,0 +1,94 @@
+"""
+Rendered Page Cache
+HTML for pages whose output is a pure function of a small key: /products for
+a catalog version and filter set, /results for a prescription ID (IDs hash
+the stored record minus its generation timestamp, which the page does not
+show, so identical prescriptions share one ID and one rendered page).
+
+Entries are kept in an LRU bounded by total body size and carry a strong
+ETag, so repeat views skip template rendering and browsers revalidating with
+If-None-Match get a bodiless 304.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+def make_etag(body):
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+class RenderCache:
+    """Thread-safe LRU of key -> (etag, encoded body), capped at max_bytes of bodies."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, html):
+        """Store rendered HTML and return its (etag, body) entry."""
+        body = html.encode("utf-8") if isinstance(html, str) else html
+        entry = (make_etag(body), body)
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[1])
+            self._entries[key] = entry
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.size,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_render_cache():
+    """Return the process-wide render cache (RENDER_CACHE_MAX_BYTES, 0 disables)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RenderCache(
+                    max_bytes=int(os.getenv("RENDER_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+                )
+    return _cache
@@ -0,0 +1,218 @@
+"""
+Production Server
+Serves the app with gunicorn (threaded workers, app preloaded before fork)
+where available, and with waitress otherwise (Windows, or gunicorn missing).
+
+Worker and thread counts come from the CPU and memory the container may
+actually use (cgroup limits, not the host's core count):
+  workers = min(ceil(cpus), memory // WORKER_MEMORY_MB), at least 1
+  threads = UPSTREAM_MAX_CONCURRENCY (8): requests mostly wait on NREL or
+            Nominatim, and more threads than upstream slots would only queue
+WEB_CONCURRENCY and WEB_THREADS override them. See DEPLOYMENT.md for the
+load-test numbers behind these defaults.
+
+Usage:
+  python -m solar_prescription serve [--port 5050] [--workers N] [--threads N]
+  python serve.py --print-config
+"""
+
+import argparse
+import math
+import os
+import subprocess
+import sys
+
+from upstream import MAX_CONCURRENCY_PER_HOST
+
+DEFAULT_PORT = 5050
+# Resident size of one preloaded worker (engine, catalog, NumPy) plus headroom
+# for request buffers and the per-process caches.
+WORKER_MEMORY_MB = 160
+# Requests per worker before it is recycled (with jitter), bounding slow leaks.
+MAX_REQUESTS = 2000
+MAX_REQUESTS_JITTER = 200
+# Above the 20 s NREL read timeout, so a slow upstream never gets a worker killed.
+WORKER_TIMEOUT = 60
+GRACEFUL_TIMEOUT = 30
+
+
+def _read(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus():
+    """CPUs this process may use: cgroup CPU quota, else the affinity mask."""
+    quota = _read("/sys/fs/cgroup/cpu.max")  # cgroup v2: "<quota> <period>" or "max <period>"
+    if quota:
+        limit, _, period = quota.partition(" ")
+        if limit != "max" and period:
+            return max(0.1, int(limit) / int(period))
+    cfs_quota = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")  # cgroup v1
+    cfs_period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if cfs_quota and cfs_period and int(cfs_quota) > 0:
+        return max(0.1, int(cfs_quota) / int(cfs_period))
+    try:
+        return float(len(os.sched_getaffinity(0)))
+    except AttributeError:  # not available on macOS/Windows
+        return float(os.cpu_count() or 1)
+
+
+def available_memory_mb():
+    """Container memory limit in MB, or None when unlimited/unknown."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        value = _read(path)
+        if value and value != "max" and int(value) < 1 << 50:
+            return int(value) // (1024 * 1024)
+    return None
+
+
+def default_workers(cpus=None, memory_mb=None):
+    cpus = available_cpus() if cpus is None else cpus
+    memory_mb = available_memory_mb() if memory_mb is None else memory_mb
+    workers = math.ceil(cpus)
+    if memory_mb:
+        workers = min(workers, memory_mb // WORKER_MEMORY_MB)
+    return max(1, workers)
+
+
+def server_config(host="0.0.0.0", port=None, workers=None, threads=None):
+    """Resolved settings: explicit arguments, then environment, then CPU/memory defaults."""
+    return {
+        "host": host,
+        "port": int(port or os.getenv("PORT") or DEFAULT_PORT),
+        "workers": int(workers or os.getenv("WEB_CONCURRENCY") or default_workers()),
+        "threads": int(threads or os.getenv("WEB_THREADS") or MAX_CONCURRENCY_PER_HOST),
+    }
+
+
+def _reset_after_fork(server=None, worker=None):
+    """
+    Drop per-process handles a preloaded master may have opened (SQLite
+    connections, pooled HTTP sessions); each worker opens its own on demand.
+    """
+    import prescription_store
+    import pvwatts_cache
+    import upstream
+
+    pvwatts_cache._cache = None
+    prescription_store._store = None
+    upstream._client = None
+
+
+def _warmup_when_ready(server):
+    """
+    WARMUP_ON_STARTUP under gunicorn: fetch uncached PVWatts profiles in a
+    separate process, so the master never holds warm-up threads (and their
+    locks) across fork and workers share the results through the SQLite cache.
+    """
+    import warmup
+
+    if warmup.startup_warmup_enabled():
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "warmup.py")
+        subprocess.Popen([sys.executable, script, "--from-store"])
+
+
+def _warmup_worker(worker):
+    """Build each worker's in-memory caches from what is already cached (no NREL calls)."""
+    import warmup
+
+    if warmup.startup_warmup_enabled():
+        warmup.start_background_warmup(fetch_missing=False)
+
+
+def run_gunicorn(config, worker_class="gthread"):
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            settings = {
+                "bind": f"{config['host']}:{config['port']}",
+                "workers": config["workers"],
+                "threads": config["threads"],
+                "worker_class": worker_class,
+                # Engine, catalog, gazetteer and asset manifest are built once in
+                # the master and shared copy-on-write by every worker.
+                "preload_app": True,
+                "post_fork": _reset_after_fork,
+                "when_ready": _warmup_when_ready,
+                "post_worker_init": _warmup_worker,
+                "max_requests": MAX_REQUESTS,
+                "max_requests_jitter": MAX_REQUESTS_JITTER,
+                "timeout": WORKER_TIMEOUT,
+                "graceful_timeout": GRACEFUL_TIMEOUT,
+                "keepalive": 5,
+                "accesslog": os.getenv("ACCESS_LOG") or None,
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import app
+
+            return app
+
+    from warmup import PRELOADED_ENV
+
+    os.environ[PRELOADED_ENV] = "1"
+    Application().run()
+
+
+def run_waitress(config):
+    from waitress import serve
+
+    from app import app
+
+    # One process; waitress has no workers, so all concurrency is threads.
+    serve(
+        app,
+        host=config["host"],
+        port=config["port"],
+        threads=config["threads"] * config["workers"],
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the production server")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, help=f"default: $PORT or {DEFAULT_PORT}")
+    parser.add_argument("--workers", type=int, help="default: $WEB_CONCURRENCY or from CPU/memory")
+    parser.add_argument("--threads", type=int, help="default: $WEB_THREADS or 8")
+    parser.add_argument("--server", choices=("auto", "gunicorn", "waitress"),
+                        default=os.getenv("WEB_SERVER", "auto"))
+    parser.add_argument("--worker-class", default=os.getenv("WEB_WORKER_CLASS", "gthread"),
+                        help="gunicorn worker class (gthread, or gevent if installed)")
+    parser.add_argument("--print-config", action="store_true",
+                        help="show the resolved settings and exit")
+    args = parser.parse_args(argv)
+
+    config = server_config(args.host, args.port, args.workers, args.threads)
+    server = args.server
+    if server == "auto":
+        try:
+            import gunicorn  # noqa: F401
+
+            server = "gunicorn" if sys.platform != "win32" else "waitress"
+        except ImportError:
+            server = "waitress"
+
+    memory = available_memory_mb()
+    print(
+        f"{server}: {config['workers']} worker(s) x {config['threads']} threads on "
+        f"{config['host']}:{config['port']} (cpus={available_cpus():g}, "
+        f"memory={f'{memory} MB' if memory else 'unlimited'})"
+    )
+    if args.print_config:
+        return 0
+    if server == "gunicorn":
+        run_gunicorn(config, worker_class=args.worker_class)
+    else:
+        run_waitress(config)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,192 @@
+"""
+Hourly Battery Simulation
+8760-hour energy balance for many kit sizes at once: hourly PV output from a
+1 kW reference profile, a 24-hour load shape built from the selected
+appliances, and the kit's battery tracked as a bounded state of charge.
+
+The state-of-charge recursion s[t] = clip(s[t-1] + net[t], 0, usable) is not a
+plain cumulative sum, but each step is a clamp function x -> min(H, max(L, x + D))
+and clamp functions are closed under composition. A log-depth prefix scan over
+(D, L, H) therefore evaluates the whole year for every kit in ~14 NumPy passes.
+"""
+
+import numpy as np
+
+from sizing import LOSS_FACTOR
+
+HOURS_PER_YEAR = 8760
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+# Hour of day each appliance is typically switched on; its APPLIANCE_SPECS
+# hours run from here, wrapping past midnight.
+USAGE_START_HOUR = {
+    "led_bulb": 18,
+    "kit_light": 18,
+    "phone_charger": 19,
+    "laptop": 9,
+    "small_tv": 19,
+    "large_tv": 19,
+    "fan": 11,
+    "radio": 6,
+    "wifi_router": 0,
+    "small_fridge": 0,
+    "laptop_charger": 20,
+    "decoder": 19,
+    "security_lights": 18,
+}
+DEFAULT_USAGE_START_HOUR = 18
+
+# Share of nameplate battery capacity that may be cycled daily.
+USABLE_FRACTION = {"lifepo4": 0.9, "li-ion": 0.8, "lead-acid": 0.5}
+DEFAULT_USABLE_FRACTION = 0.8
+# Kits without product specs: storage in line with the catalog (~6 Wh per PV W).
+DEFAULT_BATTERY_WH_PER_WATT = 6.0
+
+# Sunrise/sunset used to shape monthly totals when no hourly series is available.
+SYNTHETIC_DAYLIGHT = (6, 18)
+
+
+def load_profile(appliances, appliance_specs):
+    """Watts drawn in each hour of the day (length-24 array) for the selected appliances."""
+    profile = np.zeros(24)
+    for app in appliances:
+        spec = appliance_specs.get(app.get("id"))
+        if spec is None:
+            continue
+        start = USAGE_START_HOUR.get(app.get("id"), DEFAULT_USAGE_START_HOUR)
+        watts = spec.watts * app.get("quantity", 1)
+        profile += watts * _hour_fractions(start, spec.hours)
+    return profile
+
+
+def _hour_fractions(start, hours):
+    """Fraction of each clock hour covered by [start, start + hours), wrapping at 24."""
+    fractions = np.zeros(24)
+    t = float(start)
+    remaining = min(float(hours), 24.0)
+    while remaining > 1e-9:
+        hour = int(t) % 24
+        take = min(1.0 - (t - int(t)), remaining)
+        fractions[hour] += take
+        t += take
+        remaining -= take
+    return fractions
+
+
+def hourly_profile(reference_data, reference_capacity_kw=1.0):
+    """
+    Hourly AC output in Wh per kW for a reference profile (length-8760 array).
+
+    Uses PVWatts' hourly 'ac' series when present. Otherwise (offline grid,
+    monthly-only cache entries) each day's monthly average is spread over a
+    half-sine between SYNTHETIC_DAYLIGHT hours.
+    """
+    outputs = (reference_data or {}).get("outputs") or {}
+    ac = outputs.get("ac")
+    if ac is not None and len(ac) >= HOURS_PER_YEAR:
+        return np.asarray(ac, dtype=np.float64)[:HOURS_PER_YEAR] / reference_capacity_kw
+
+    monthly_kwh = np.asarray(outputs.get("ac_monthly") or [0.0] * 12, dtype=np.float64)
+    daily_wh = np.repeat(monthly_kwh * 1000 / DAYS_IN_MONTH, DAYS_IN_MONTH)
+    sunrise, sunset = SYNTHETIC_DAYLIGHT
+    hours = np.arange(24) + 0.5
+    shape = np.where(
+        (hours > sunrise) & (hours < sunset),
+        np.sin(np.pi * (hours - sunrise) / (sunset - sunrise)),
+        0.0,
+    )
+    shape /= shape.sum()
+    return (daily_wh[:, None] * shape[None, :]).ravel() / reference_capacity_kw
+
+
+def battery_for_kit(product_specs, kit_size):
+    """(nameplate Wh, usable fraction) for a kit, from products.json when listed."""
+    specs = product_specs.get(kit_size)
+    battery = specs.get("battery") if specs else None
+    if battery and battery.get("capacity_wh"):
+        chemistry = str(battery.get("chemistry", "")).lower()
+        return float(battery["capacity_wh"]), USABLE_FRACTION.get(chemistry, DEFAULT_USABLE_FRACTION)
+    return kit_size * DEFAULT_BATTERY_WH_PER_WATT, DEFAULT_USABLE_FRACTION
+
+
+def state_of_charge(net, capacity, initial):
+    """
+    Battery energy after each hour for s[t] = clip(s[t-1] + net[t], 0, capacity).
+
+    net is (kits, hours) Wh; capacity and initial are per-kit. Returns the
+    (kits, hours) state of charge.
+    """
+    capacity = np.asarray(capacity, dtype=np.float64)[:, None]
+    d = np.array(net, dtype=np.float64)
+    lo = np.zeros_like(d)
+    hi = np.broadcast_to(capacity, d.shape).copy()
+
+    # Hillis-Steele inclusive scan: after the pass with offset k, (d, lo, hi)
+    # at hour t describe the composition of steps max(0, t - 2k + 1) .. t.
+    offset = 1
+    n = d.shape[1]
+    while offset < n:
+        cur_d, cur_lo, cur_hi = d[:, offset:], lo[:, offset:], hi[:, offset:]
+        # f_prev then f_cur: D = D1 + D2, L/H = clip(L1/H1 + D2, L2, H2)
+        new_lo = lo[:, :-offset] + cur_d
+        np.maximum(new_lo, cur_lo, out=new_lo)
+        np.minimum(new_lo, cur_hi, out=new_lo)
+        new_hi = hi[:, :-offset] + cur_d
+        np.maximum(new_hi, cur_lo, out=new_hi)
+        np.minimum(new_hi, cur_hi, out=new_hi)
+        cur_d += d[:, :-offset].copy()
+        cur_lo[...] = new_lo
+        cur_hi[...] = new_hi
+        offset *= 2
+
+    initial = np.asarray(initial, dtype=np.float64)[:, None]
+    return np.clip(initial + d, lo, hi)
+
+
+def simulate(pv_wh_per_kw, load_w, kit_sizes, battery_wh, usable_fraction):
+    """
+    Simulate a year of operation for each kit size.
+
+    pv_wh_per_kw is the 8760-hour reference output, load_w the 24-hour load
+    profile; battery_wh and usable_fraction are per kit. Every battery starts
+    full. Returns one dict per kit with loss-of-load hours, days with a
+    shortfall, unserved energy and days of autonomy.
+    """
+    kit_sizes = np.asarray(kit_sizes, dtype=np.float64)
+    pv = pv_wh_per_kw[None, :] * (kit_sizes[:, None] / 1000) * LOSS_FACTOR
+    load = np.tile(load_w, len(pv_wh_per_kw) // 24)
+    net = pv - load[None, :]
+
+    usable = np.asarray(battery_wh, dtype=np.float64) * np.asarray(usable_fraction, dtype=np.float64)
+    soc = state_of_charge(net, usable, usable)
+
+    before = np.empty_like(soc)
+    before[:, 0] = usable
+    before[:, 1:] = soc[:, :-1]
+    unmet = np.maximum(0.0, -(before + net))
+
+    short = unmet > 1e-6
+    loss_of_load_hours = short.sum(axis=1)
+    shortfall_days = short.reshape(len(kit_sizes), -1, 24).any(axis=2).sum(axis=1)
+    total_load = load.sum()
+    unserved_pct = unmet.sum(axis=1) / total_load * 100 if total_load > 0 else np.zeros(len(kit_sizes))
+    daily_need = load_w.sum()
+    min_soc_pct = np.divide(
+        soc.min(axis=1), usable, out=np.zeros(len(kit_sizes)), where=usable > 0
+    ) * 100
+
+    results = []
+    for i, kit_size in enumerate(kit_sizes):
+        results.append(
+            {
+                "kit_size": int(kit_size),
+                "battery_wh": round(float(battery_wh[i]), 0),
+                "usable_wh": round(float(usable[i]), 0),
+                "loss_of_load_hours": int(loss_of_load_hours[i]),
+                "shortfall_days": int(shortfall_days[i]),
+                "unserved_pct": round(float(unserved_pct[i]), 1),
+                "days_of_autonomy": round(float(usable[i] / daily_need), 2) if daily_need > 0 else None,
+                "min_soc_pct": round(float(min_soc_pct[i]), 0),
+            }
+        )
+    return results
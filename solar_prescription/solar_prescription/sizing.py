@@ -0,0 +1,119 @@
+"""
+Kit Sizing
+Smallest kit (and catalog product) that earns a "good" or better verdict for
+each coverage target, solved from a per-watt production profile.
+"""
+
+import math
+from bisect import bisect_left
+
+from batch import COVERAGE_TARGETS, VERDICT_THRESHOLDS
+from models import ProductionProfile
+
+# determine_verdict's 20% system losses
+LOSS_FACTOR = 0.8
+APPROVED_VERDICTS = ("excellent", "good")
+
+
+def production_per_watt(production, kit_size):
+    """Per-watt version of SolarPrescription.get_daily_production output."""
+    if not kit_size:
+        return ProductionProfile(daily_avg=0.0, worst_month_daily=0.0)
+    return ProductionProfile(
+        daily_avg=production.daily_avg / kit_size,
+        worst_month_daily=production.worst_month_daily / kit_size,
+    )
+
+
+def scaled_production(per_watt, kit_size):
+    return ProductionProfile(
+        daily_avg=per_watt.daily_avg * kit_size,
+        worst_month_daily=per_watt.worst_month_daily * kit_size,
+    )
+
+
+def minimum_watts(per_watt, need, coverage_percentage):
+    """
+    Closed-form lower bound on theoretical kit watts for a good-or-better verdict.
+
+    Coverage is linear in kit size, so each verdict condition (avg >= A and
+    worst >= B) is met from max(A / avg_per_w, B / worst_per_w) watts upward.
+    Returns (bound, avg_only_bound). A product's tested value can lower its
+    average but may raise its worst month (tested * 0.9), so only the
+    average-coverage bound holds for catalog kits; the full bound holds for
+    kits sized purely from theory.
+    """
+    avg_per_w = per_watt.daily_avg * LOSS_FACTOR / need * 100
+    worst_per_w = per_watt.worst_month_daily * LOSS_FACTOR / need * 100
+    exc_avg, exc_worst, good_avg, good_worst, _, _ = VERDICT_THRESHOLDS.get(
+        coverage_percentage, VERDICT_THRESHOLDS[70]
+    )
+
+    def watts_for(avg_threshold, worst_threshold):
+        required = [avg_threshold / avg_per_w if avg_per_w > 0 else math.inf]
+        if worst_threshold > 0:
+            required.append(worst_threshold / worst_per_w if worst_per_w > 0 else math.inf)
+        return max(required)
+
+    bound = min(watts_for(exc_avg, exc_worst), watts_for(good_avg, good_worst))
+    avg_only_bound = watts_for(min(exc_avg, good_avg), -math.inf)
+    return bound, avg_only_bound
+
+
+def size_for_target(engine, per_watt, need, coverage_percentage=70, above=0):
+    """
+    Smallest kit larger than `above` that the engine rates good or better.
+
+    Returns {"kit_size", "verdict", "product"} or None when the location
+    produces nothing. Beyond the largest standard kit, sizes are rounded up to
+    the next 100 W.
+    """
+    if need <= 0:
+        kit_size = next((k for k in engine.KIT_SIZES if k > above), engine.KIT_SIZES[-1])
+        return _result(engine, per_watt, need, kit_size, coverage_percentage)
+
+    bound, avg_only_bound = minimum_watts(per_watt, need, coverage_percentage)
+    if math.isinf(avg_only_bound):
+        return None
+
+    start = bisect_left(engine.KIT_SIZES, max(avg_only_bound, above + 1))
+    for kit_size in engine.KIT_SIZES[start:]:
+        result = _result(engine, per_watt, need, kit_size, coverage_percentage)
+        if result["verdict"].verdict in APPROVED_VERDICTS:
+            return result
+
+    if math.isinf(bound):
+        return None
+    kit_size = max(
+        int(math.ceil(bound / 100) * 100),
+        int(engine.KIT_SIZES[-1] // 100 + 1) * 100,
+        int(above // 100 + 1) * 100,
+    )
+    # Guard against float rounding right at the threshold.
+    for _ in range(3):
+        result = _result(engine, per_watt, need, kit_size, coverage_percentage)
+        if result["verdict"].verdict in APPROVED_VERDICTS:
+            break
+        kit_size += 100
+    return result
+
+
+def size_kits(engine, per_watt, need, targets=COVERAGE_TARGETS, above=0):
+    """Answer size_for_target for every coverage target in one pass."""
+    return {
+        target: size_for_target(engine, per_watt, need, target, above=above)
+        for target in targets
+    }
+
+
+def _result(engine, per_watt, need, kit_size, coverage_percentage):
+    verdict_info = engine.determine_verdict(
+        scaled_production(per_watt, kit_size), need, kit_size, coverage_percentage
+    )
+    specs = engine.PRODUCT_SPECS.get(kit_size)
+    product = (
+        {"model": specs["model"], "brand": specs["brand"], "type": specs["type"]}
+        if specs
+        else None
+    )
+    return {"kit_size": kit_size, "verdict": verdict_info, "product": product}
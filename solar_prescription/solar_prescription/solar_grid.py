@@ -0,0 +1,202 @@
+"""Offline gridded solar resource.
+
+Monthly specific yield (Wh of AC output per W of PV per day) on a regular
+lat/lon grid, stored as a memory-mapped .npy file with a JSON sidecar, and
+queried with bilinear interpolation. get_pvwatts_data() has the same signature
+and return shape as pvwatts.get_pvwatts_data, so it can serve prescriptions
+with no network access (see SOLAR_DATA_PROVIDER in pvwatts.py).
+
+The grid is built for the app's default array (standard module, fixed roof
+mount, tilt/azimuth from pvwatts.default_orientation, 14% losses). Other loss
+values are scaled proportionally; other orientations are not modelled.
+
+Build it once, with network access and an NREL key, for the markets we serve:
+  python solar_grid.py build --lat -35 38 --lon -20 52 --step 1.0
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+DEFAULT_GRID_PATH = os.path.join(os.path.dirname(__file__), "data", "solar_grid.npy")
+GRID_LOSSES = 14.0
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.float64)
+
+
+class SolarGrid:
+    """Memory-mapped (n_lat, n_lon, 12) float32 grid of Wh/W/day."""
+
+    def __init__(self, path=DEFAULT_GRID_PATH):
+        with open(_meta_path(path), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.lat_min = float(meta["lat_min"])
+        self.lon_min = float(meta["lon_min"])
+        self.step = float(meta["step"])
+        self.losses = float(meta.get("losses", GRID_LOSSES))
+        self.yields = np.load(path, mmap_mode="r")
+        self.n_lat, self.n_lon = self.yields.shape[:2]
+
+    @property
+    def lat_max(self):
+        return self.lat_min + (self.n_lat - 1) * self.step
+
+    @property
+    def lon_max(self):
+        return self.lon_min + (self.n_lon - 1) * self.step
+
+    def covers(self, lat, lon):
+        return self.lat_min <= lat <= self.lat_max and self.lon_min <= lon <= self.lon_max
+
+    def specific_yield(self, lat, lon):
+        """Bilinearly interpolated monthly Wh/W/day at (lat, lon), or None if unavailable.
+
+        Grid cells without data (NaN, e.g. failed fetches over the ocean) are
+        skipped and the remaining corner weights renormalized.
+        """
+        if not self.covers(lat, lon):
+            return None
+        fi = (lat - self.lat_min) / self.step
+        fj = (lon - self.lon_min) / self.step
+        i = min(int(fi), self.n_lat - 2) if self.n_lat > 1 else 0
+        j = min(int(fj), self.n_lon - 2) if self.n_lon > 1 else 0
+        ti = fi - i
+        tj = fj - j
+
+        corners = np.asarray(self.yields[i : i + 2, j : j + 2], dtype=np.float64)
+        weights = np.array([[(1 - ti) * (1 - tj), (1 - ti) * tj], [ti * (1 - tj), ti * tj]])
+        weights = weights[: corners.shape[0], : corners.shape[1]]
+        valid = ~np.isnan(corners[..., 0])
+        total = weights[valid].sum()
+        if total <= 0:
+            return None
+        return (corners[valid] * weights[valid][:, None]).sum(axis=0) / total
+
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def write_grid(path, lat_min, lon_min, step, yields, losses=GRID_LOSSES):
+    """Save a (n_lat, n_lon, 12) Wh/W/day array plus its metadata sidecar."""
+    yields = np.asarray(yields, dtype=np.float32)
+    if yields.ndim != 3 or yields.shape[2] != 12:
+        raise ValueError("yields must have shape (n_lat, n_lon, 12)")
+    np.save(path, yields)
+    with open(_meta_path(path), "w", encoding="utf-8") as f:
+        json.dump(
+            {"lat_min": lat_min, "lon_min": lon_min, "step": step, "losses": losses,
+             "units": "Wh/W/day (AC)"},
+            f,
+            indent=2,
+        )
+
+
+_grid = None
+_grid_lock = threading.Lock()
+
+
+def get_grid():
+    """Return the process-wide grid, or None if no dataset has been built."""
+    global _grid
+    if _grid is None:
+        path = os.getenv("SOLAR_GRID_PATH") or DEFAULT_GRID_PATH
+        if not os.path.exists(path):
+            return None
+        with _grid_lock:
+            if _grid is None:
+                _grid = SolarGrid(path)
+    return _grid
+
+
+def get_pvwatts_data(system_capacity, module_type, array_type, tilt, azimuth, lat, lon, losses):
+    """Offline drop-in for pvwatts.get_pvwatts_data. Returns (data, error)."""
+    grid = get_grid()
+    if grid is None:
+        return None, "Offline solar grid not available"
+    daily = grid.specific_yield(float(lat), float(lon))
+    if daily is None:
+        return None, "Location is outside the offline solar grid"
+
+    loss_scale = (1 - float(losses) / 100) / (1 - grid.losses / 100)
+    # Wh/W/day * days * kW == kWh per month for the system
+    ac_monthly = daily * DAYS_IN_MONTH * float(system_capacity) * loss_scale
+    return {
+        "outputs": {
+            "ac_monthly": ac_monthly.tolist(),
+            "ac_annual": float(ac_monthly.sum()),
+        },
+        "offline": True,
+    }, None
+
+
+def build_grid(lat_range, lon_range, step, path=DEFAULT_GRID_PATH):
+    """Sample PVWatts (through the cache) on a grid and save it. Needs network access."""
+    import pvwatts
+
+    if pvwatts.SOLAR_DATA_PROVIDER != "pvwatts":
+        raise RuntimeError("Building the grid needs SOLAR_DATA_PROVIDER=pvwatts")
+
+    n_lat = int(math.floor((lat_range[1] - lat_range[0]) / step)) + 1
+    n_lon = int(math.floor((lon_range[1] - lon_range[0]) / step)) + 1
+    lats = [lat_range[0] + i * step for i in range(n_lat)]
+    lons = [lon_range[0] + j * step for j in range(n_lon)]
+    points = [(lat, lon) + pvwatts.default_orientation(lat) for lat in lats for lon in lons]
+
+    yields = np.full((len(lats), len(lons), 12), np.nan, dtype=np.float32)
+    chunk = 64
+    failed = 0
+    for start in range(0, len(points), chunk):
+        batch_points = points[start : start + chunk]
+        for offset, (data, error) in enumerate(pvwatts.get_reference_profiles(batch_points)):
+            monthly = ((data or {}).get("outputs") or {}).get("ac_monthly")
+            index = start + offset
+            if error or not monthly:
+                failed += 1
+                continue
+            per_kw = np.asarray(monthly, dtype=np.float64) / pvwatts.REFERENCE_CAPACITY_KW
+            yields[index // len(lons), index % len(lons)] = per_kw / DAYS_IN_MONTH
+        print(f"{min(start + chunk, len(points))}/{len(points)} points ({failed} failed)")
+
+    write_grid(path, lats[0], lons[0], step, yields)
+    return path
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline solar resource grid")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="sample PVWatts on a lat/lon grid")
+    build.add_argument("--lat", nargs=2, type=float, required=True, metavar=("MIN", "MAX"))
+    build.add_argument("--lon", nargs=2, type=float, required=True, metavar=("MIN", "MAX"))
+    build.add_argument("--step", type=float, default=1.0)
+    build.add_argument("--out", default=DEFAULT_GRID_PATH)
+
+    query = sub.add_parser("query", help="look up monthly Wh/W/day for a location")
+    query.add_argument("lat", type=float)
+    query.add_argument("lon", type=float)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        print(f"Wrote {build_grid(args.lat, args.lon, args.step, args.out)}")
+        return 0
+
+    grid = get_grid()
+    if grid is None:
+        print("No grid found; run the build command first")
+        return 1
+    daily = grid.specific_yield(args.lat, args.lon)
+    if daily is None:
+        print("Location is outside the grid")
+        return 1
+    print(" ".join(f"{d:.2f}" for d in daily), "Wh/W/day")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
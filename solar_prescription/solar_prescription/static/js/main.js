@@ -1,5 +1,74 @@
 // Solar Prescription - Frontend JavaScript
 
+// Autocomplete tuning: wait for a pause in typing, and remember recent answers.
+const GEOCODE_DEBOUNCE_MS = 250;
+const GEOCODE_CACHE_SIZE = 100;
+// Must match geocoding.MAX_RESULTS: a shorter answer is the complete match set.
+const GEOCODE_RESULT_LIMIT = 8;
+
+// Recently seen query -> results, in least- to most-recently used order
+const geocodeCache = new Map();
+
+// Same folding as geocoding.normalize on the server ("Thiès" -> "thies")
+function normalizePlace(text) {
+  return text
+    .normalize("NFKD")
+    .replace(/[\u0300-\u036f]/g, "")
+    .toLowerCase()
+    .replace(/[^0-9a-z]+/g, " ")
+    .trim();
+}
+
+function placeMatches(displayName, query) {
+  const [namePart, ...rest] = query.split(",");
+  const prefix = normalizePlace(namePart);
+  const parts = displayName.split(",");
+  if (!normalizePlace(parts[0]).startsWith(prefix)) return false;
+  const context = normalizePlace(parts.slice(1).join(" ")).split(" ");
+  return normalizePlace(rest.join(" "))
+    .split(" ")
+    .filter(Boolean)
+    .every((word) => context.some((c) => c.startsWith(word)));
+}
+
+function rememberSuggestions(query, data) {
+  // Like the server-side cache, skip empty answers: they include lookups the
+  // Nominatim rate limiter dropped and server errors, so ask again next time.
+  if (Object.keys(data).length === 0) return;
+  const key = normalizePlace(query);
+  geocodeCache.delete(key);
+  geocodeCache.set(key, { query, data });
+  if (geocodeCache.size > GEOCODE_CACHE_SIZE) {
+    geocodeCache.delete(geocodeCache.keys().next().value);
+  }
+}
+
+// Results for query from the cache: an exact hit, or a complete (untruncated)
+// answer for a shorter prefix filtered down locally. Returns null on a miss.
+function cachedSuggestions(query) {
+  const key = normalizePlace(query);
+  const exact = geocodeCache.get(key);
+  if (exact) {
+    geocodeCache.delete(key);
+    geocodeCache.set(key, exact);
+    return exact.data;
+  }
+
+  for (let end = key.length - 1; end >= 2; end--) {
+    const entry = geocodeCache.get(key.slice(0, end));
+    if (!entry) continue;
+    const names = Object.keys(entry.data);
+    if (names.length === 0 || names.length >= GEOCODE_RESULT_LIMIT) return null;
+    const filtered = {};
+    names
+      .filter((name) => placeMatches(name, query))
+      .forEach((name) => (filtered[name] = entry.data[name]));
+    // Remote (Nominatim) answers may not be prefix matches; ask the server.
+    return Object.keys(filtered).length > 0 ? filtered : null;
+  }
+  return null;
+}
+
 // Location autocomplete
 document.addEventListener("DOMContentLoaded", function () {
   const locationInput = document.getElementById("locationSearch");
@@ -39,62 +108,95 @@ document.addEventListener("DOMContentLoaded", function () {
 
   // Location search
   if (locationInput) {
+    let debounceTimer = null;
+    let inFlight = null;
+
+    const renderSuggestions = (data) => {
+      const matches = Object.entries(data).slice(0, 5);
+
+      if (matches.length > 0) {
+        suggestionsDiv.innerHTML = matches
+          .map(
+            ([name, coords]) =>
+              `<div class="location-suggestion" data-lat="${coords.lat}" data-lon="${coords.lon}" data-name="${name}">
+                            ${name}
+                        </div>`
+          )
+          .join("");
+
+        // Add click handlers
+        suggestionsDiv
+          .querySelectorAll(".location-suggestion")
+          .forEach((item) => {
+            item.addEventListener("click", function () {
+              const lat = this.dataset.lat;
+              const lon = this.dataset.lon;
+              const name = this.dataset.name;
+
+              locationInput.value = name;
+              latInput.value = lat;
+              lonInput.value = lon;
+              locationNameInput.value = name;
+
+              coordsDisplay.style.display = "block";
+              document.getElementById(
+                "coordsText"
+              ).textContent = `${lat}, ${lon}`;
+
+              suggestionsDiv.innerHTML = "";
+            });
+          });
+      } else {
+        suggestionsDiv.innerHTML =
+          '<div class="location-suggestion">No matching locations found. Try: Nairobi, Lagos, or Johannesburg</div>';
+      }
+    };
+
     locationInput.addEventListener("input", function () {
       const query = this.value.trim();
+      clearTimeout(debounceTimer);
 
       if (query.length < 2) {
+        if (inFlight) inFlight.abort();
         suggestionsDiv.innerHTML = "";
         return;
       }
 
-      // Call the geocoding API
-      fetch(`/api/geocode?q=${encodeURIComponent(query)}`)
-        .then((response) => response.json())
-        .then((data) => {
-          const matches = Object.entries(data).slice(0, 5);
-
-          if (matches.length > 0) {
-            suggestionsDiv.innerHTML = matches
-              .map(
-                ([name, coords]) =>
-                  `<div class="location-suggestion" data-lat="${coords.lat}" data-lon="${coords.lon}" data-name="${name}">
-                                ${name}
-                            </div>`
-              )
-              .join("");
-
-            // Add click handlers
-            suggestionsDiv
-              .querySelectorAll(".location-suggestion")
-              .forEach((item) => {
-                item.addEventListener("click", function () {
-                  const lat = this.dataset.lat;
-                  const lon = this.dataset.lon;
-                  const name = this.dataset.name;
-
-                  locationInput.value = name;
-                  latInput.value = lat;
-                  lonInput.value = lon;
-                  locationNameInput.value = name;
-
-                  coordsDisplay.style.display = "block";
-                  document.getElementById(
-                    "coordsText"
-                  ).textContent = `${lat}, ${lon}`;
-
-                  suggestionsDiv.innerHTML = "";
-                });
-              });
-          } else {
-            suggestionsDiv.innerHTML =
-              '<div class="location-suggestion">No matching locations found. Try: Nairobi, Lagos, or Johannesburg</div>';
-          }
+      // Exact or narrowed-down queries are answered without a request
+      const local = cachedSuggestions(query);
+      if (local) {
+        if (inFlight) inFlight.abort();
+        renderSuggestions(local);
+        return;
+      }
+
+      debounceTimer = setTimeout(() => {
+        // Only the latest keystroke's request may render
+        if (inFlight) inFlight.abort();
+        const controller = new AbortController();
+        inFlight = controller;
+
+        fetch(`/api/geocode?q=${encodeURIComponent(query)}`, {
+          signal: controller.signal,
         })
-        .catch((error) => {
-          console.error("Geocoding error:", error);
-          suggestionsDiv.innerHTML =
-            '<div class="location-suggestion">Error fetching locations. Try again.</div>';
-        });
+          .then((response) => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.json();
+          })
+          .then((data) => {
+            rememberSuggestions(query, data);
+            renderSuggestions(data);
+          })
+          .catch((error) => {
+            if (error.name === "AbortError") return;
+            console.error("Geocoding error:", error);
+            suggestionsDiv.innerHTML =
+              '<div class="location-suggestion">Error fetching locations. Try again.</div>';
+          })
+          .finally(() => {
+            if (inFlight === controller) inFlight = null;
+          });
+      }, GEOCODE_DEBOUNCE_MS);
     });
 
     // Close suggestions when clicking outside
@@ -180,8 +282,8 @@ document.addEventListener("DOMContentLoaded", function () {
         const result = await response.json();
 
         if (result.success) {
-          // Redirect to results page
-          window.location.href = "/results";
+          // Redirect to the stored prescription's results page
+          window.location.href = result.results_url || "/results";
         } else {
           throw new Error(result.error || "An error occurred");
         }
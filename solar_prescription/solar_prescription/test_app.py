@@ -0,0 +1,157 @@
+"""
+Tests for the Flask routes
+Run with: python -m pytest test_app.py
+"""
+
+import pytest
+
+import app as app_module
+import pvwatts
+from conftest import NAIROBI_1KW_OUTPUTS, _FakeClient, _prescribe
+from pvwatts_cache import PVWattsCache
+
+
+@pytest.mark.parametrize("kit_size", [0, 10, 300])
+def test_prescribe_makes_at_most_one_upstream_call(client, nrel_calls, kit_size):
+    response = _prescribe(client, kit_size)
+    body = response.get_json()
+
+    assert response.status_code == 200, body
+    assert body["success"] is True
+    assert len(nrel_calls) == 1
+    assert float(nrel_calls[0]["system_capacity"]) == pvwatts.REFERENCE_CAPACITY_KW
+
+
+def test_small_kits_scale_from_reference_profile(client, nrel_calls):
+    body = _prescribe(client, 20).get_json()
+    annual_kwh = body["prescription"]["production"]["annual_kwh"]
+    assert annual_kwh == round(NAIROBI_1KW_OUTPUTS["ac_annual"] * 0.02)
+
+
+def test_batch_endpoint_fetches_each_location_once(client, nrel_calls):
+    households = [
+        {"id": f"hh-{i}", "latitude": -1.2921, "longitude": 36.8219,
+         "appliances": [{"id": "led_bulb", "quantity": i + 1}], "kit_size": 50}
+        for i in range(5)
+    ] + [{"id": "hh-lagos", "latitude": 6.5244, "longitude": 3.3792,
+          "appliances": [{"id": "fan", "quantity": 1}], "coverage_percentage": 90}]
+
+    response = client.post("/prescribe/batch", json={"households": households})
+    body = response.get_json()
+
+    assert response.status_code == 200, body
+    assert len(nrel_calls) == 2
+    assert [r["id"] for r in body["results"]] == [h["id"] for h in households]
+    assert body["results"][0]["verdict"]["verdict"] == body["results"][0]["verdicts"]["50"]
+    assert "verdict" not in body["results"][-1]
+
+
+def test_batch_kit_sizes_are_sorted_and_validated(client, nrel_calls):
+    household = {"latitude": -1.2921, "longitude": 36.8219,
+                 "appliances": [{"id": "led_bulb", "quantity": 3}]}
+
+    def batch(kit_sizes):
+        return client.post(
+            "/prescribe/batch", json={"households": [household], "kit_sizes": kit_sizes}
+        )
+
+    body = batch([200, 50, "100", 50]).get_json()
+    assert body["kit_sizes"] == [50, 100, 200]
+    assert body["results"][0]["recommended_kit"] == 50
+
+    for invalid in (["50", None], ["big"], [0, 50], [-50], {"a": 1}, [True]):
+        response = batch(invalid)
+        assert response.status_code == 400, invalid
+        assert response.get_json()["success"] is False
+
+
+def test_prescribe_simulate_runs_hourly_battery_model(client, nrel_calls):
+    body = _prescribe(client, 100, simulate=True).get_json()
+
+    assert body["success"] is True, body
+    assert nrel_calls[0]["timeframe"] == "hourly"
+    simulation = body["simulation"]
+    assert simulation["hourly_source"] == "pvwatts"
+    kits = {k["kit_size"]: k for k in simulation["kits"]}
+    # 100 W kit: 320 Wh/day usable PV against 150 Wh of evening lighting
+    assert kits[100]["loss_of_load_hours"] == 0
+    assert kits[100]["usable_wh"] == 540
+    assert kits[10]["loss_of_load_hours"] > 0
+    assert "simulation" not in _prescribe(client, 100).get_json()
+
+
+def test_session_holds_only_the_prescription_id(client, nrel_calls):
+    body = _prescribe(client, 50).get_json()
+    prescription_id = body["prescription_id"]
+    assert body["results_url"] == f"/results/{prescription_id}"
+
+    with client.session_transaction() as sess:
+        assert dict(sess) == {"prescription_id": prescription_id}
+
+    assert client.get("/results").status_code == 200
+    shared = app_module.app.test_client().get(body["results_url"])
+    assert shared.status_code == 200
+    assert "max-age" in shared.headers["Cache-Control"]
+    assert app_module.app.test_client().get("/results/AAAAAAAAAAAA").status_code == 302
+
+
+def test_compare_ranks_kits_and_catalog_with_one_upstream_call(client, nrel_calls):
+    response = client.post(
+        "/prescribe/compare",
+        json={
+            "latitude": -1.2921,
+            "longitude": 36.8219,
+            "appliances": [{"id": "led_bulb", "quantity": 3}, {"id": "small_tv", "quantity": 1}],
+        },
+    )
+    body = response.get_json()
+
+    assert response.status_code == 200, body
+    assert len(nrel_calls) == 1
+    options = body["options"]
+    assert {o["source"] for o in options} == {"kit", "catalog"}
+    assert [o["rank"] for o in options] == list(range(1, len(options) + 1))
+    assert body["recommended"] == options[0]
+    assert options[0]["verdict"]["verdict"] in ("excellent", "good")
+    approved = [o["watts"] for o in options if o["verdict"]["verdict"] in ("excellent", "good")]
+    assert approved == sorted(approved)
+
+
+def test_requote_reuses_cached_profile_without_upstream_call(client, nrel_calls, monkeypatch):
+    cache = PVWattsCache(path=":memory:")
+    monkeypatch.setattr(pvwatts, "get_cache", lambda: cache)
+    assert _prescribe(client, 50).get_json()["success"] is True
+
+    requote = {
+        "latitude": -1.2921,
+        "longitude": 36.8219,
+        "kit_size": 50,
+        "appliances": [{"id": "led_bulb", "quantity": 3}, {"id": "small_tv", "quantity": 1}],
+    }
+    body = client.post("/prescribe/requote", json=requote).get_json()
+
+    assert body["success"] is True, body
+    assert len(nrel_calls) == 1
+    assert body["daily_wh"] == 350
+    assert body["verdict"]["verdict"] == body["verdicts"]["50"]
+    assert body["recommended_kit"] == 150
+
+    elsewhere = client.post("/prescribe/requote", json=dict(requote, latitude=10.0))
+    assert elsewhere.status_code == 404
+    assert len(nrel_calls) == 1
+
+
+def test_auto_sizing_failure_is_not_reported_as_upstream_error(client, monkeypatch):
+    class _DarkClient(_FakeClient):
+        def get_json(self, url, params=None, **kwargs):
+            self.calls.append(params)
+            return {"outputs": {"ac_annual": 0.0, "ac_monthly": [0.0] * 12}}
+
+    monkeypatch.setattr(pvwatts, "get_cache", lambda: None)
+    monkeypatch.setattr(pvwatts, "get_client", lambda: _DarkClient())
+
+    response = _prescribe(client, 0)
+    assert response.status_code == 400
+    error = response.get_json()["error"]
+    assert error.startswith("Could not size a kit")
+    assert "fetch" not in error
@@ -0,0 +1,73 @@
+"""
+Tests for the fingerprinted static asset pipeline
+Run with: python -m pytest test_assets.py
+"""
+
+import gzip
+
+import pytest
+from flask import Flask, render_template_string
+
+import assets
+import app as app_module
+
+
+@pytest.fixture
+def site(tmp_path):
+    static = tmp_path / "static"
+    (static / "css").mkdir(parents=True)
+    (static / "css" / "site.css").write_text("body { color: #333; }\n" * 200, encoding="utf-8")
+    demo = Flask(__name__, static_folder=str(static))
+    manifest = assets.install(demo, source_dir=str(static), output_dir=str(tmp_path / "out"))
+    return demo, manifest, static, tmp_path / "out"
+
+
+def test_build_fingerprints_and_precompresses(site):
+    demo, manifest, _, out = site
+    entry = manifest.entries["css/site.css"]
+    assert entry["path"].startswith("css/site.") and entry["path"].endswith(".css")
+    assert "gzip" in entry["encodings"]
+    assert gzip.decompress((out / (entry["path"] + ".gz")).read_bytes()).startswith(b"body")
+    with demo.test_request_context():
+        assert render_template_string("{{ asset_url('css/site.css') }}") == "/assets/" + entry["path"]
+        assert render_template_string("{{ asset_url('css/other.css') }}") == "/static/css/other.css"
+
+
+def test_changed_file_gets_new_url_and_old_output_is_pruned(site):
+    _, manifest, static, out = site
+    old = manifest.entries["css/site.css"]["path"]
+    (static / "css" / "site.css").write_text("body { color: #000; }\n", encoding="utf-8")
+    rebuilt = assets.build(str(static), str(out))
+    assert rebuilt["css/site.css"]["path"] != old
+    assert not (out / old).exists()
+
+
+def test_assets_are_served_compressed_and_immutable(site):
+    demo, manifest, _, _ = site
+    path = manifest.entries["css/site.css"]["path"]
+    client = demo.test_client()
+
+    response = client.get(f"/assets/{path}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Cache-Control"] == assets.IMMUTABLE_CACHE_CONTROL
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.mimetype == "text/css"
+
+    plain = client.get(f"/assets/{path}", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.data.startswith(b"body")
+
+    if assets.brotli is not None:
+        br = client.get(f"/assets/{path}", headers={"Accept-Encoding": "gzip, br"})
+        assert br.headers["Content-Encoding"] == "br"
+
+    assert client.get("/assets/css/site.css").status_code == 404
+
+
+def test_index_references_fingerprinted_assets():
+    html = app_module.app.test_client().get("/").get_data(as_text=True)
+    assert "/assets/css/styles." in html
+    assert "/assets/js/main." in html
+    if assets.Image is not None:
+        assert 'type="image/webp"' in html
@@ -0,0 +1,91 @@
+"""
+Equivalence tests: vectorized batch verdicts vs the scalar engine
+Run with: python -m pytest test_batch.py
+"""
+
+import random
+
+from prescription_engine import SolarPrescription
+from pvwatts import scale_to_kit
+
+
+def _random_profile(rng):
+    peak = rng.uniform(60, 180)
+    monthly = [peak * rng.uniform(0.35, 1.0) for _ in range(12)]
+    return {"outputs": {"ac_annual": sum(monthly), "ac_monthly": monthly}}
+
+
+def _random_household(rng, engine, n_profiles):
+    ids = rng.sample(list(engine.APPLIANCE_SPECS), rng.randint(0, 5))
+    return {
+        "appliances": [{"id": i, "quantity": rng.randint(1, 4)} for i in ids]
+        + ([{"id": "not_an_appliance", "quantity": 2}] if rng.random() < 0.1 else []),
+        "profile": rng.randrange(n_profiles),
+        "coverage_percentage": rng.choice([50, 70, 90, 60]),
+        "kit_size": rng.choice(engine.KIT_SIZES),
+    }
+
+
+def test_batch_verdicts_match_scalar_path():
+    rng = random.Random(1234)
+    engine = SolarPrescription()
+    profiles = [_random_profile(rng) for _ in range(25)]
+    households = [_random_household(rng, engine, len(profiles)) for _ in range(400)]
+
+    result = engine.generate_prescriptions_batch(households, profiles)
+
+    for row, household in enumerate(households):
+        need, _ = engine.calculate_daily_energy_need(household["appliances"])
+        assert result.need[row] == need
+        for col, kit in enumerate(engine.KIT_SIZES):
+            production = engine.get_daily_production(
+                scale_to_kit(profiles[household["profile"]], kit), kit
+            )
+            expected = engine.determine_verdict(
+                production, need, kit, household["coverage_percentage"]
+            )
+            assert result.verdict(row, col) == expected, (row, kit)
+
+        record = result.record(row)
+        assert record["verdict"].verdict == record["verdicts"][str(household["kit_size"])]
+
+
+def test_batch_matches_scalar_on_exact_thresholds():
+    engine = SolarPrescription()
+    # 1 kW reference producing exactly 365 kWh/yr -> 1000 Wh/day, 800 Wh usable.
+    profile = {"outputs": {"ac_annual": 365.0, "ac_monthly": [30.0] * 12}}
+    needs = [800, 1000, 2000 / 3, 640, 400]  # 100%, 80%, 120%, 125%, 200% coverage
+    households = [
+        {
+            "appliances": [{"id": "led_bulb", "quantity": n / 50}],
+            "profile": 0,
+            "coverage_percentage": pct,
+        }
+        for n in needs
+        for pct in (50, 70, 90)
+    ]
+
+    result = engine.generate_prescriptions_batch(households, [profile], kit_sizes=[1000])
+
+    for row, household in enumerate(households):
+        need, _ = engine.calculate_daily_energy_need(household["appliances"])
+        production = engine.get_daily_production(scale_to_kit(profile, 1000), 1000)
+        expected = engine.determine_verdict(
+            production, need, 1000, household["coverage_percentage"]
+        )
+        assert result.verdict(row, 0) == expected
+
+
+def test_compare_kits_matches_scalar_verdicts():
+    engine = SolarPrescription()
+    reference = _random_profile(random.Random(7))
+    appliances = [{"id": "led_bulb", "quantity": 4}, {"id": "phone_charger", "quantity": 2}]
+    comparison = engine.compare_kits(reference, appliances, coverage_percentage=90)
+
+    assert len(comparison["options"]) == len(engine.KIT_SIZES)
+    for option in comparison["options"]:
+        kit_size = option["watts"]
+        production = engine.get_daily_production(scale_to_kit(reference, kit_size), kit_size)
+        assert option["verdict"] == engine.determine_verdict(
+            production, comparison["daily_wh"], kit_size, 90
+        )
@@ -0,0 +1,161 @@
+"""
+Tests for streamed bulk prescriptions
+Run with: python -m pytest test_bulk.py
+"""
+
+import csv
+import io
+import json
+import tracemalloc
+
+import pytest
+
+import bulk
+
+HOUSEHOLDS_CSV = (
+    "id,latitude,longitude,coverage_percentage,kit_size,appliances,fan\n"
+    "hh-1,-1.2921,36.8219,70,50,led_bulb:3;phone_charger:1,\n"
+    "hh-2,-1.2921,36.8219,90,,led_bulb:2,1\n"
+    "hh-3,not-a-number,36.8,70,,,\n"
+    "hh-4,0.5135,35.2698,50,10,kit_light:2,\n"
+)
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_ndjson_upload_streams_one_result_per_row(client, nrel_calls):
+    response = client.post(
+        "/prescribe/bulk",
+        data={"file": (io.BytesIO(HOUSEHOLDS_CSV.encode()), "households.csv")},
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.is_streamed
+
+    lines = _lines(response)
+    results = [line for line in lines if "row" in line]
+    assert [r["id"] for r in results] == ["hh-1", "hh-2", "hh-3", "hh-4"]
+    assert results[0]["verdict"]["coverage_percentage"] == 70
+    assert results[0]["kit_size"] == 50
+    # led_bulb:2 plus the fan quantity column
+    assert results[1]["daily_wh"] == 2 * 10 * 5 + 75 * 8
+    assert results[2]["error"].startswith("Invalid row")
+    assert lines[-1] == {"summary": lines[-1]["summary"]}
+    assert lines[-1]["summary"]["rows"] == 4
+    assert lines[-1]["summary"]["errors"] == 1
+    # One lookup per distinct location
+    assert len(nrel_calls) == 2
+
+
+def test_csv_output_from_raw_body(client, nrel_calls):
+    response = client.post(
+        "/prescribe/bulk?format=csv&kit_sizes=10,50,100",
+        data=HOUSEHOLDS_CSV,
+        content_type="text/csv",
+    )
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row["id"] for row in rows] == ["hh-1", "hh-2", "hh-3", "hh-4"]
+    assert set(rows[0]) >= {"verdict_10w", "verdict_50w", "verdict_100w", "error"}
+    assert "verdict_20w" not in rows[0]
+    assert rows[0]["verdict"] == json.loads(
+        client.post(
+            "/prescribe/batch",
+            json={"households": [{"latitude": -1.2921, "longitude": 36.8219, "kit_size": 50,
+                                  "appliances": [{"id": "led_bulb", "quantity": 3},
+                                                 {"id": "phone_charger", "quantity": 1}]}]},
+        ).get_data()
+    )["results"][0]["verdict"]["verdict"]
+    assert rows[2]["error"] and not rows[2]["verdict_50w"]
+
+
+def test_upload_without_coordinates_is_rejected(client):
+    response = client.post("/prescribe/bulk", data="id,name\n1,x\n", content_type="text/csv")
+    assert response.status_code == 400
+    assert "latitude" in response.get_json()["error"]
+
+
+def test_memory_stays_flat_for_large_inputs(nrel_calls):
+    def households(count):
+        yield b"id,latitude,longitude,appliances\n"
+        for i in range(count):
+            yield f"{i},{-1 - (i % 7) / 10},36.8,led_bulb:{1 + i % 4}\n".encode()
+
+    def peak_bytes(count):
+        tracemalloc.start()
+        try:
+            output = 0
+            for text in bulk.stream(bulk.read_households(households(count)), "ndjson"):
+                output += len(text)
+            return tracemalloc.get_traced_memory()[1], output
+        finally:
+            tracemalloc.stop()
+
+    small_peak, _ = peak_bytes(1_000)
+    large_peak, large_output = peak_bytes(5_000)
+    assert large_output > 1024 * 1024
+    assert large_peak < small_peak * 1.5
+
+
+def test_non_utf8_header_is_rejected(client):
+    body = "id,latitude,longitude,caf\xe9\n1,-1.29,36.82,\n".encode("cp1252")
+    response = client.post("/prescribe/bulk", data=body, content_type="text/csv")
+    assert response.status_code == 400
+    assert "UTF-8" in response.get_json()["error"]
+
+
+def test_non_utf8_row_still_gets_a_result_and_summary(client, nrel_calls):
+    body = "id,latitude,longitude\nNyer\xed,-1.2921,36.8219\nhh-2,-1.2921,36.8219\n"
+    response = client.post(
+        "/prescribe/bulk", data=body.encode("cp1252"), content_type="text/csv"
+    )
+    assert response.status_code == 200
+    lines = _lines(response)
+    results = [line for line in lines if "row" in line]
+    assert [r["id"] for r in results] == ["Nyer\ufffd", "hh-2"]
+    assert all("error" not in r for r in results)
+    assert lines[-1]["summary"]["rows"] == 2
+
+
+@pytest.fixture
+def small_field_limit():
+    previous = csv.field_size_limit(100)
+    yield
+    csv.field_size_limit(previous)
+
+
+def test_malformed_input_ends_with_error_and_summary(nrel_calls, small_field_limit):
+    source = [b"id,latitude,longitude\n", b"hh-1,-1.2921,36.8219\n", b"x" * 200 + b",0,0\n"]
+    lines = [
+        json.loads(line)
+        for text in bulk.stream(bulk.read_households(iter(source)), "ndjson")
+        for line in text.splitlines()
+    ]
+    assert lines[0]["id"] == "hh-1"
+    assert lines[-2]["error"].startswith("Stopped after row 1")
+    assert lines[-1]["summary"]["rows"] == 1
+    assert lines[-1]["summary"]["error"] == lines[-2]["error"]
+
+    text = "".join(bulk.stream(bulk.read_households(iter(source)), "csv"))
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert rows[0]["id"] == "hh-1"
+    assert rows[-1]["error"].startswith("Stopped after row 1")
+
+
+def test_kit_sizes_and_quantities_must_be_positive(client):
+    for kit_sizes in ("0", "-50", "10,-5"):
+        response = client.post(
+            f"/prescribe/bulk?kit_sizes={kit_sizes}", data=HOUSEHOLDS_CSV, content_type="text/csv"
+        )
+        assert response.status_code == 400
+    for appliances in ("led_bulb:-3", "led_bulb:0"):
+        with pytest.raises(ValueError, match="must be positive"):
+            bulk.parse_household({"latitude": "0", "longitude": "0", "appliances": appliances}, [])
+    with pytest.raises(ValueError, match="must be positive"):
+        bulk.parse_household({"latitude": "0", "longitude": "0", "fan": "-1"}, ["fan"])
+    household = bulk.parse_household({"latitude": "0", "longitude": "0", "fan": "0"}, ["fan"])
+    assert household["appliances"] == []
+    with pytest.raises(SystemExit):
+        bulk.main(["-", "--kit-sizes", "0"])
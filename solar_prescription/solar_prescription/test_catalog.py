@@ -0,0 +1,85 @@
+"""
+Tests for the VeraSol product catalog
+Run with: python -m pytest test_catalog.py
+"""
+
+import csv
+import os
+
+from catalog import CATALOG_CSV_PATH, POWER_COLUMN, KitCatalog
+
+
+def _scan(watts):
+    """Reference implementation: the original per-request CSV scan."""
+    matches = []
+    with open(CATALOG_CSV_PATH, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                power = int(float(str(row.get(POWER_COLUMN)).strip()))
+            except (TypeError, ValueError):
+                continue
+            if power == watts:
+                matches.append(row)
+    return matches
+
+
+def test_exact_lookup_matches_csv_scan():
+    catalog = KitCatalog()
+    for watts in sorted(set(catalog.watts)) + [0, 9999]:
+        assert catalog.by_watts(watts) == _scan(watts)
+
+
+def test_range_and_filters():
+    catalog = KitCatalog()
+    in_range = catalog.query(min_watts=40, max_watts=80)
+    assert in_range
+    powers = [int(float(p[POWER_COLUMN])) for p in in_range]
+    assert powers == sorted(powers)
+    assert all(40 <= p <= 80 for p in powers)
+
+    lifepo4 = catalog.query(min_watts=40, max_watts=80, chemistry="lifepo4")
+    assert all(p["Main Unit Battery Chemistry"].lower() == "lifepo4" for p in lifepo4)
+
+    bright = catalog.query(min_light_points=6)
+    assert all(int(p["Number of Light Points"]) >= 6 for p in bright)
+
+
+def test_reloads_when_file_changes(tmp_path, monkeypatch):
+    import catalog as catalog_module
+
+    path = tmp_path / "kits.csv"
+    path.write_text(
+        "Brand,Product Name,Model Number,PV Module Maximum Power [W],"
+        "Number of Light Points,Main Unit Battery Chemistry\n"
+        "A,Kit,M1,10,4,Li-ion\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(catalog_module, "CATALOG_CSV_PATH", str(path))
+    monkeypatch.setattr(catalog_module, "CATALOG_RELOAD_CHECK_SECONDS", 0)
+    monkeypatch.setattr(catalog_module, "_catalog", None)
+
+    assert len(catalog_module.get_catalog()) == 1
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("B,Kit,M2,20,4,LiFePO4\n")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert len(catalog_module.get_catalog()) == 2
+
+
+def test_missing_csv_does_not_stop_startup(tmp_path, monkeypatch, capsys):
+    import app as app_module
+    import catalog as catalog_module
+
+    monkeypatch.setattr(catalog_module, "CATALOG_CSV_PATH", str(tmp_path / "missing.csv"))
+    monkeypatch.setattr(catalog_module, "CATALOG_RELOAD_CHECK_SECONDS", 0)
+    monkeypatch.setattr(catalog_module, "_catalog", None)
+
+    assert catalog_module.preload_catalog() is None
+    assert "product catalog not loaded" in capsys.readouterr().out
+
+    # The route reports the error on the page, as before the catalog was indexed.
+    response = app_module.app.test_client().get("/products?watts=50")
+    assert response.status_code == 200
+    assert b"missing.csv" in response.data
@@ -36,25 +36,25 @@ appliances = [
 daily_need, details = engine.calculate_daily_energy_need(appliances)
 print(f"Daily Energy Need: {daily_need} Wh")
 for app in details:
-    print(f"  - {app['name']} x{app['quantity']}: {app['daily_wh']} Wh")
+    print(f"  - {app.name} x{app.quantity}: {app.daily_wh} Wh")
 print()
 
 # Test 2: Production calculation
 print("Test 2: Production Calculation")
 print("-" * 60)
 production = engine.get_daily_production(sample_pvwatts_data, 300)
-print(f"Daily Average: {production['daily_avg']:.0f} Wh")
-print(f"Best Month: {production['best_month_daily']:.0f} Wh/day")
-print(f"Worst Month: {production['worst_month_daily']:.0f} Wh/day")
+print(f"Daily Average: {production.daily_avg:.0f} Wh")
+print(f"Best Month: {production.best_month_daily:.0f} Wh/day")
+print(f"Worst Month: {production.worst_month_daily:.0f} Wh/day")
 print()
 
 # Test 3: Verdict
 print("Test 3: Verdict Determination")
 print("-" * 60)
 verdict = engine.determine_verdict(production, daily_need)
-print(f"Verdict: {verdict['verdict'].upper()}")
-print(f"Average Coverage: {verdict['avg_coverage']}%")
-print(f"Worst Month Coverage: {verdict['worst_coverage']}%")
+print(f"Verdict: {verdict.verdict.upper()}")
+print(f"Average Coverage: {verdict.avg_coverage}%")
+print(f"Worst Month Coverage: {verdict.worst_coverage}%")
 print()
 
 # Test 4: Full prescription
@@ -69,14 +69,14 @@ prescription = engine.generate_prescription(
     pvwatts_data=sample_pvwatts_data
 )
 
-print(f"Status: {prescription['recommendation']['status'].upper()}")
-print(f"Title: {prescription['recommendation']['title']}")
-print(f"Message: {prescription['recommendation']['message']}")
+print(f"Status: {prescription.recommendation['status'].upper()}")
+print(f"Title: {prescription.recommendation['title']}")
+print(f"Message: {prescription.recommendation['message']}")
 print()
 
-if prescription['recommendation']['warnings']:
+if prescription.recommendation['warnings']:
     print("Warnings:")
-    for warning in prescription['recommendation']['warnings']:
+    for warning in prescription.recommendation['warnings']:
         print(f"  - {warning}")
 print()
 
@@ -0,0 +1,70 @@
+"""
+Tests for location autocomplete (gazetteer + Nominatim fallback)
+Run with: python -m pytest test_geocoding.py
+"""
+
+import time
+
+import geocoding
+from geocoding import Gazetteer, RateLimiter, TTLCache
+
+
+class _FakeResponse:
+    status_code = 200
+
+    def json(self):
+        return [{"lat": "59.91", "lon": "10.75", "address": {"city": "Oslo", "country": "Norway"}}]
+
+
+class _FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, params=None, **kwargs):
+        self.calls.append(params["q"])
+        return _FakeResponse()
+
+
+def test_prefix_search_ranks_by_population():
+    gazetteer = Gazetteer()
+    names = [p["display_name"] for p in gazetteer.search("ki")]
+    assert names[0].startswith("Kinshasa")
+    assert all(name.lower().startswith("ki") for name in names)
+    assert len(names) == geocoding.MAX_RESULTS
+
+
+def test_search_ignores_accents_and_filters_by_country():
+    gazetteer = Gazetteer()
+    assert gazetteer.search("thies")[0]["display_name"] == "Thiès, Senegal"
+    assert [p["display_name"] for p in gazetteer.search("Northern, zam")] == []
+    assert gazetteer.search("Kas, Zambia")[0]["display_name"] == "Kasama, Northern Province, Zambia"
+
+
+def test_known_places_are_answered_in_process_under_5ms(monkeypatch):
+    client = _FakeClient()
+    monkeypatch.setattr(geocoding, "get_client", lambda: client)
+    geocoding.geocode("na")
+
+    timings = []
+    for query in ["na", "nai", "Nairobi", "Lag", "kum", "Johannesburg, S", "dar es"] * 50:
+        start = time.perf_counter()
+        assert geocoding.geocode(query)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    assert client.calls == []
+    assert timings[int(len(timings) * 0.99)] < 0.005
+
+
+def test_fallback_is_cached_and_rate_limited(monkeypatch):
+    client = _FakeClient()
+    monkeypatch.setattr(geocoding, "get_client", lambda: client)
+    monkeypatch.setattr(geocoding, "_nominatim_cache", TTLCache(60, 10))
+    monkeypatch.setattr(geocoding, "_nominatim_limiter", RateLimiter(60))
+
+    assert geocoding.geocode("Tromsö") == {"Oslo, Norway": {"lat": 59.91, "lon": 10.75}}
+    assert geocoding.geocode("tromso") == {"Oslo, Norway": {"lat": 59.91, "lon": 10.75}}
+    # Second distinct miss inside the interval is dropped, not queued.
+    assert geocoding.geocode("Bergen") == {}
+    assert geocoding.geocode("zz") == {}
+    assert client.calls == ["Tromsö"]
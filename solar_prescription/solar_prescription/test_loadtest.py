@@ -0,0 +1,65 @@
+"""
+Tests for the load-test request mix and report
+Run with: python -m pytest test_loadtest.py
+"""
+
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+from werkzeug.serving import make_server
+
+import loadtest
+from prescription_engine import SolarPrescription
+
+
+def test_request_mix_is_reproducible_and_valid():
+    batch = loadtest.build_requests(300, seed=7)
+    assert batch == loadtest.build_requests(300, seed=7)
+    assert {endpoint for endpoint, *_ in batch} == {"prescribe", "geocode", "products"}
+
+    for endpoint, method, path, body in batch:
+        if endpoint != "prescribe":
+            assert method == "GET" and body is None
+            continue
+        assert body["kit_size"] in [0] + SolarPrescription.KIT_SIZES
+        assert body["coverage_percentage"] in loadtest.COVERAGE_TARGETS
+        assert 1 <= len(body["appliances"]) <= 4
+        assert all(a["id"] in SolarPrescription.APPLIANCE_SPECS for a in body["appliances"])
+
+
+def test_geocode_queries_are_url_encoded():
+    places = [{"display_name": "Bahir Dar & Gondar #2+", "lat": 11.6, "lon": 37.4, "population": 1}]
+    batch = loadtest.build_requests(50, seed=3, mix={"geocode": 1.0}, places=places)
+    queries = [parse_qs(urlsplit(path).query)["q"] for _, _, path, _ in batch]
+    known = [q for (q,) in queries if places[0]["display_name"].startswith(q)]
+    assert max(known, key=len) == places[0]["display_name"]
+
+
+def test_summary_reports_percentiles_and_error_rate():
+    results = [("prescribe", i / 1000, None) for i in range(1, 100)]
+    results.append(("geocode", 2.0, "503"))
+    summary = loadtest.summarize(results, wall_seconds=4.0)
+
+    assert summary["requests"] == 100
+    assert summary["throughput"] == 25.0
+    assert summary["p50_ms"] == 50.0
+    assert summary["p99_ms"] == 99.0
+    assert summary["max_ms"] == 2000.0
+    assert summary["error_rate"] == 0.01
+    assert summary["error_kinds"] == {"503": 1}
+    assert summary["endpoints"]["geocode"]["error_rate"] == 1.0
+
+
+def test_run_level_against_the_app(client, nrel_calls):
+    server = make_server("127.0.0.1", 0, client.application, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        batch = loadtest.build_requests(20, seed=1, mix={"prescribe": 1.0})
+        summary = loadtest.run_level(f"http://127.0.0.1:{server.server_port}", batch, 4)
+    finally:
+        server.shutdown()
+
+    assert summary["requests"] == 20
+    assert summary["errors"] == 0
+    assert len(nrel_calls) == 20
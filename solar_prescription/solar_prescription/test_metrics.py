@@ -0,0 +1,56 @@
+"""
+Tests for the metrics registry and the /metrics endpoint
+Run with: python -m pytest test_metrics.py
+"""
+
+import os
+
+import metrics
+from conftest import _prescribe
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    latency = registry.register(
+        metrics.Histogram("demo_seconds", "Demo.", ("stage",), buckets=(0.1, 1.0))
+    )
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, "fetch")
+
+    text = registry.render()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{stage="fetch",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="fetch",le="1"} 3' in text
+    assert 'demo_seconds_bucket{stage="fetch",le="+Inf"} 4' in text
+    assert 'demo_seconds_count{stage="fetch"} 4' in text
+    assert 'demo_seconds_sum{stage="fetch"} 4.05' in text
+
+
+def test_counter_escapes_label_values():
+    registry = metrics.Registry()
+    hits = registry.register(metrics.Counter("demo_total", "Demo.", ("source",)))
+    hits.inc('a"b')
+    hits.inc('a"b', amount=2)
+    assert 'demo_total{source="a\\"b"} 3' in registry.render()
+
+
+def test_metrics_endpoint_reports_request_stages(client, nrel_calls):
+    before = metrics.ENGINE_STAGE_SECONDS.count("determine_verdict")
+    upstream_before = metrics.UPSTREAM_SECONDS.count("pvwatts", "ok")
+    assert _prescribe(client, 50).status_code == 200
+
+    response = client.get("/metrics")
+    text = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert metrics.ENGINE_STAGE_SECONDS.count("determine_verdict") == before + 1
+    assert metrics.UPSTREAM_SECONDS.count("pvwatts", "ok") == upstream_before + 1
+    worker = f'worker="{os.getpid()}"'
+    assert (
+        'http_request_duration_seconds_count{' + worker
+        + ',endpoint="prescribe",method="POST",status="200"}'
+    ) in text
+    assert 'engine_stage_duration_seconds_bucket{' + worker + ',stage="get_recommendation",le="+Inf"}' in text
+    assert 'cache_hits_total{' + worker + ',cache="nominatim"}' in text
+    assert 'pvwatts_lookups_total{' + worker + ',result="executed"}' in text
@@ -0,0 +1,35 @@
+"""
+Tests for the domain model and its JSON serializer
+Run with: python -m pytest test_models.py
+"""
+
+import dataclasses
+import json
+
+import numpy as np
+import pytest
+
+from models import Verdict, to_json
+from prescription_engine import SolarPrescription
+
+
+def test_to_json_matches_asdict_for_a_full_prescription():
+    engine = SolarPrescription()
+    prescription = engine.generate_prescription(
+        "Nairobi, Kenya", -1.29, 36.82, 50,
+        [{"id": "led_bulb", "quantity": 3}, {"id": "small_tv", "quantity": 1}],
+        {"outputs": {"ac_annual": 73.0, "ac_monthly": [6.0] * 12}},
+    )
+    payload = to_json(prescription)
+
+    assert payload == json.loads(json.dumps(dataclasses.asdict(prescription)))
+    assert payload["energy_need"]["appliances"][0]["name"] == "Household LED Bulb (10W)"
+    assert payload["verdict"]["verdict"] == prescription.verdict.verdict
+
+
+def test_models_are_frozen_and_slotted():
+    verdict = Verdict("good", 101.0, 85.0, 350.0, 300.0, False, 70)
+    assert not hasattr(verdict, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        verdict.verdict = "excellent"
+    assert to_json({"n": np.int64(3), "v": (verdict,)})["n"] == 3
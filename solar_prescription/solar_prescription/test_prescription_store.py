@@ -0,0 +1,53 @@
+"""
+Tests for the server-side prescription store
+Run with: python -m pytest test_prescription_store.py
+"""
+
+from prescription_store import PrescriptionStore, is_valid_id
+
+
+RECORD = {
+    "prescription": {"kit_size": 50, "verdict": {"verdict": "good"}},
+    "location": "Nairobi, Kenya",
+    "coverage_percentage": 70,
+}
+
+
+def test_ids_are_compact_and_content_derived(tmp_path):
+    store = PrescriptionStore(path=str(tmp_path / "p.sqlite3"))
+    first = store.put(RECORD)
+    assert is_valid_id(first) and len(first) == 12
+    assert store.put(dict(RECORD)) == first
+    assert store.put(dict(RECORD, coverage_percentage=90)) != first
+
+
+def test_ids_ignore_generation_timestamp(tmp_path):
+    store = PrescriptionStore(path=str(tmp_path / "p.sqlite3"))
+    def stamped(timestamp):
+        return dict(RECORD, prescription=dict(RECORD["prescription"], timestamp=timestamp))
+
+    first = store.put(stamped("2026-01-01T08:00:00"))
+    second = store.put(stamped("2026-01-02T09:30:00"))
+    assert first == second
+    assert store.get(first)["prescription"]["timestamp"] == "2026-01-02T09:30:00"
+
+
+def test_records_survive_restart_and_expire(tmp_path):
+    path = str(tmp_path / "p.sqlite3")
+    prescription_id = PrescriptionStore(path=path).put(RECORD)
+
+    reopened = PrescriptionStore(path=path)
+    assert reopened.get(prescription_id) == RECORD
+    assert reopened.get("not-a-valid-id") is None
+
+    reopened.ttl_seconds = 0
+    assert reopened.get(prescription_id) is None
+
+
+def test_oldest_records_are_evicted(tmp_path):
+    store = PrescriptionStore(path=str(tmp_path / "p.sqlite3"), max_entries=2)
+    ids = [store.put(dict(RECORD, location=f"Place {i}")) for i in range(3)]
+    assert store.stats()["entries"] == 2
+    store._memory.clear()
+    assert store.get(ids[0]) is None
+    assert store.get(ids[2])["location"] == "Place 2"
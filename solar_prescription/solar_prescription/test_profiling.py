@@ -0,0 +1,113 @@
+"""
+Tests for opt-in request profiling and the /admin/profiles routes
+Run with: python -m pytest test_profiling.py
+"""
+
+import pstats
+import time
+
+import pytest
+from flask import Flask, Response
+
+import app as app_module
+import profiling
+
+
+def _demo_app(monkeypatch, tmp_path, **env):
+    for key in ("PROFILE_REQUESTS", "PROFILE_SAMPLE_RATE", "ADMIN_TOKEN"):
+        monkeypatch.delenv(key, raising=False)
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_MAX_FILES", "2")
+
+    demo = Flask(__name__)
+    demo.add_url_rule("/work", "work", lambda: str(sum(range(1000))))
+    original = demo.wsgi_app
+    store = profiling.install(demo)
+    return demo, original, store
+
+
+def test_disabled_profiling_leaves_app_unwrapped(monkeypatch, tmp_path):
+    demo, original, store = _demo_app(monkeypatch, tmp_path)
+    assert demo.wsgi_app == original
+    demo.test_client().get("/work")
+    assert store.list() == []
+
+
+def test_header_triggers_profile_and_ring_buffer_is_bounded(monkeypatch, tmp_path):
+    demo, _, store = _demo_app(monkeypatch, tmp_path, ADMIN_TOKEN="s3cret")
+    client = demo.test_client()
+
+    client.get("/work")
+    client.get("/work", headers={"X-Profile": "wrong"})
+    assert store.list() == []
+
+    for _ in range(3):
+        assert client.get("/work", headers={"X-Profile": "s3cret"}, buffered=True).status_code == 200
+    profiles = store.list()
+    assert len(profiles) == 2
+    assert "_GET_work_200_" in profiles[0]["name"]
+    stats = pstats.Stats(store.file_path(profiles[0]["name"]))
+    assert stats.total_calls > 0
+
+
+def test_admin_routes_require_token(monkeypatch, tmp_path):
+    store = profiling.ProfileStore(str(tmp_path), max_files=5)
+    demo = Flask(__name__)
+    demo.add_url_rule("/work", "work", lambda: "ok")
+    demo.wsgi_app = profiling.ProfilingMiddleware(demo.wsgi_app, store, profile_all=True)
+    demo.test_client().get("/work", buffered=True)
+    name = store.list()[0]["name"]
+
+    monkeypatch.setattr(app_module, "profile_store", store)
+    client = app_module.app.test_client()
+
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.get("/admin/profiles").status_code == 404
+
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+    assert client.get("/admin/profiles").status_code == 401
+    listing = client.get("/admin/profiles", headers={"Authorization": "Bearer s3cret"})
+    assert [p["name"] for p in listing.get_json()["profiles"]] == [name]
+
+    headers = {"X-Admin-Token": "s3cret"}
+    download = client.get(f"/admin/profiles/{name}", headers=headers)
+    assert download.status_code == 200
+    assert download.headers["Content-Disposition"].startswith("attachment")
+    report = client.get(f"/admin/profiles/{name}?format=text", headers=headers)
+    assert "cumulative" in report.get_data(as_text=True)
+    assert client.get("/admin/profiles/..%2Fapp.py", headers=headers).status_code == 404
+
+
+@pytest.mark.parametrize("rate, expected", [(0.0, 0), (1.0, 1)])
+def test_sample_rate(monkeypatch, tmp_path, rate, expected):
+    store = profiling.ProfileStore(str(tmp_path))
+    demo = Flask(__name__)
+    demo.add_url_rule("/work", "work", lambda: "ok")
+    demo.wsgi_app = profiling.ProfilingMiddleware(demo.wsgi_app, store, sample_rate=rate)
+    demo.test_client().get("/work", buffered=True)
+    assert len(store.list()) == expected
+
+
+def test_streamed_body_is_profiled_until_close(tmp_path):
+    store = profiling.ProfileStore(str(tmp_path))
+    demo = Flask(__name__)
+
+    def slow_chunks():
+        for _ in range(3):
+            time.sleep(0.05)
+            yield "chunk\n"
+
+    demo.add_url_rule("/stream", "stream", lambda: Response(slow_chunks()))
+    middleware = profiling.ProfilingMiddleware(demo.wsgi_app, store, profile_all=True)
+    demo.wsgi_app = middleware
+
+    # Servers close the response after sending it; buffered=True does the same.
+    response = demo.test_client().get("/stream", buffered=True)
+    assert response.get_data(as_text=True) == "chunk\n" * 3
+    name = store.list()[0]["name"]
+    assert int(name.rsplit("_", 1)[1][: -len("ms.prof")]) >= 150
+    functions = {func[2] for func in pstats.Stats(store.file_path(name)).stats}
+    assert "slow_chunks" in functions
+    assert middleware._active.acquire(blocking=False)
@@ -0,0 +1,85 @@
+"""
+Tests for the PVWatts response cache
+Run with: python -m pytest test_pvwatts_cache.py
+"""
+
+
+import pvwatts
+from pvwatts_cache import PVWattsCache, make_cache_key, normalize_outputs, scale_outputs
+
+
+SAMPLE_OUTPUTS = {
+    "ac_annual": 438.0,
+    "ac_monthly": [35.8, 36.4, 38.9, 36.1, 33.2, 31.8, 30.6, 32.1, 34.3, 36.7, 35.9, 36.2],
+}
+
+
+class _FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def get_json(self, url, params=None, **kwargs):
+        self.calls.append(params)
+        return {"outputs": dict(SAMPLE_OUTPUTS)}
+
+
+def test_key_buckets_nearby_coordinates():
+    a = make_cache_key(-1.2921, 36.8219, 15, 180, 1, 0, 14)
+    b = make_cache_key(-1.2800, 36.8100, 15, 180, 1, 0, 14)
+    c = make_cache_key(-1.2921, 36.8219, 20, 180, 1, 0, 14)
+    assert a == b
+    assert a != c
+
+
+def test_hit_miss_ttl_and_lru(tmp_path):
+    cache = PVWattsCache(path=str(tmp_path / "c.sqlite3"), ttl_seconds=60, max_entries=2)
+    per_kw = normalize_outputs(SAMPLE_OUTPUTS, 0.3)
+
+    assert cache.get("a") is None
+    cache.put("a", per_kw)
+    cache.put("b", per_kw)
+    assert cache.get("a")["ac_annual"] == per_kw["ac_annual"]
+
+    # "b" is now least recently used and is evicted first.
+    cache.put("c", per_kw)
+    assert cache.stats()["entries"] == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+    cache.ttl_seconds = 0
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 3
+    assert stats["evictions"] == 1
+
+
+def test_entries_survive_restart(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    PVWattsCache(path=path).put("k", normalize_outputs(SAMPLE_OUTPUTS, 1))
+    assert PVWattsCache(path=path).get("k")["ac_monthly"][0] == 35.8
+
+
+def test_get_pvwatts_data_serves_repeat_lookups_from_cache(tmp_path, monkeypatch):
+    cache = PVWattsCache(path=str(tmp_path / "c.sqlite3"))
+    client = _FakeClient()
+    monkeypatch.setattr(pvwatts, "get_cache", lambda: cache)
+    monkeypatch.setattr(pvwatts, "get_client", lambda: client)
+
+    args = dict(module_type=0, array_type=1, tilt=15, azimuth=180, lat=-1.29, lon=36.82, losses=14)
+    first, error = pvwatts.get_pvwatts_data(system_capacity=0.3, **args)
+    assert error is None and first["outputs"]["ac_annual"] == 438.0
+
+    second, error = pvwatts.get_pvwatts_data(system_capacity=0.6, **args)
+
+    assert error is None
+    assert len(client.calls) == 1
+    assert second["cached"] is True
+    assert abs(second["outputs"]["ac_annual"] - 876.0) < 1e-9
+
+
+def test_hourly_series_is_scaled_only_when_requested():
+    per_kw = dict(normalize_outputs(SAMPLE_OUTPUTS, 1), ac=[500.0] * 8760)
+    assert "ac" not in scale_outputs(per_kw, 0.2)
+    assert scale_outputs(per_kw, 0.2, hourly=True)["ac"][0] == 100.0
@@ -0,0 +1,70 @@
+"""
+Tests for the rendered page cache and its ETag handling
+Run with: python -m pytest test_render_cache.py
+"""
+
+import pytest
+
+import app as app_module
+from conftest import _prescribe
+from render_cache import RenderCache
+
+
+@pytest.fixture
+def render_cache(monkeypatch):
+    cache = RenderCache(max_bytes=1024 * 1024)
+    monkeypatch.setattr(app_module, "get_render_cache", lambda: cache)
+    return cache
+
+
+def test_lru_is_bounded_by_body_bytes():
+    cache = RenderCache(max_bytes=250)
+    for key in "abc":
+        cache.put(key, key * 100)
+    assert cache.get("a") is None
+    assert cache.get("c")[1] == b"c" * 100
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 200, 1)
+
+
+def test_products_page_is_rendered_once_per_catalog_version(client, render_cache, monkeypatch):
+    first = client.get("/products?watts=50")
+    second = client.get("/products?watts=50")
+    assert first.status_code == second.status_code == 200
+    assert first.data == second.data
+    assert render_cache.stats()["hits"] == 1
+
+    etag = first.headers["ETag"]
+    revalidated = client.get("/products?watts=50", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+
+    catalog = app_module.get_catalog()
+    monkeypatch.setattr(catalog, "version", "reloaded")
+    client.get("/products?watts=50")
+    assert render_cache.stats()["misses"] == 2
+
+
+def test_shared_results_page_revalidates_with_304(client, nrel_calls, render_cache):
+    url = _prescribe(client, 50).get_json()["results_url"]
+
+    page = client.get(url)
+    assert page.status_code == 200
+    assert page.headers["Cache-Control"] == "public, max-age=3600"
+
+    again = client.get(url, headers={"If-None-Match": page.headers["ETag"]})
+    assert again.status_code == 304
+    own = client.get("/results")
+    assert own.data == page.data
+    assert own.headers["Cache-Control"] == "private, no-cache"
+    assert render_cache.stats()["misses"] == 1
+
+
+def test_identical_prescriptions_share_one_cached_page(client, nrel_calls, render_cache):
+    first = _prescribe(client, 50).get_json()["results_url"]
+    second = _prescribe(client, 50).get_json()["results_url"]
+    assert first == second
+
+    assert client.get(first).status_code == client.get(second).status_code == 200
+    stats = render_cache.stats()
+    assert (stats["entries"], stats["misses"], stats["hits"]) == (1, 1, 1)
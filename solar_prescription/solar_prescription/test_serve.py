@@ -0,0 +1,42 @@
+"""
+Tests for the production server settings
+Run with: python -m pytest test_serve.py
+"""
+
+import serve
+
+
+def test_workers_follow_cpu_quota_and_memory_limit():
+    assert serve.default_workers(cpus=0.1, memory_mb=512) == 1
+    assert serve.default_workers(cpus=2.5, memory_mb=None) == 3
+    # 4 CPUs but only room for 3 workers in 512 MB
+    assert serve.default_workers(cpus=4, memory_mb=512) == 3
+
+
+def test_explicit_settings_override_environment(monkeypatch):
+    monkeypatch.setenv("PORT", "9000")
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    monkeypatch.delenv("WEB_THREADS", raising=False)
+    config = serve.server_config(workers=2)
+    assert config["port"] == 9000
+    assert config["workers"] == 2
+    assert config["threads"] == serve.MAX_CONCURRENCY_PER_HOST
+
+
+def test_startup_warmup_runs_from_gunicorn_hooks(monkeypatch):
+    import warmup
+
+    launched, started = [], []
+    monkeypatch.setattr(serve.subprocess, "Popen", launched.append)
+    monkeypatch.setattr(warmup, "start_background_warmup", lambda **kw: started.append(kw))
+
+    monkeypatch.delenv("WARMUP_ON_STARTUP", raising=False)
+    serve._warmup_when_ready(server=None)
+    serve._warmup_worker(worker=None)
+    assert launched == started == []
+
+    monkeypatch.setenv("WARMUP_ON_STARTUP", "1")
+    serve._warmup_when_ready(server=None)
+    serve._warmup_worker(worker=None)
+    assert launched[0][1].endswith("warmup.py")
+    assert started == [{"fetch_missing": False}]
@@ -0,0 +1,89 @@
+"""
+Tests for the hourly battery simulation
+Run with: python -m pytest test_simulation.py
+"""
+
+import numpy as np
+
+import simulation
+from prescription_engine import SolarPrescription
+
+
+APPLIANCES = [
+    {"id": "led_bulb", "quantity": 3},
+    {"id": "phone_charger", "quantity": 2},
+    {"id": "small_tv", "quantity": 1},
+]
+
+
+def _reference(seed=0):
+    rng = np.random.default_rng(seed)
+    hours = np.arange(simulation.HOURS_PER_YEAR) % 24
+    clear_sky = np.clip(np.sin(np.pi * (hours - 6) / 12), 0, None) * 800
+    clouds = np.repeat(rng.uniform(0.1, 1.0, 365), 24)
+    return {"outputs": {"ac": (clear_sky * clouds).tolist()}}
+
+
+def _naive_soc(net, capacity):
+    soc = np.empty_like(net)
+    unmet = np.zeros_like(net)
+    for k in range(net.shape[0]):
+        s = capacity[k]
+        for t in range(net.shape[1]):
+            x = s + net[k, t]
+            unmet[k, t] = max(0.0, -x)
+            s = min(capacity[k], max(0.0, x))
+            soc[k, t] = s
+    return soc, unmet
+
+
+def test_scan_matches_hour_by_hour_loop():
+    rng = np.random.default_rng(1)
+    net = rng.normal(0, 40, size=(4, 500))
+    capacity = np.array([50.0, 100.0, 300.0, 0.0])
+
+    soc, _ = _naive_soc(net, capacity)
+
+    assert np.allclose(simulation.state_of_charge(net, capacity, capacity), soc)
+
+
+def test_simulate_reports_loss_of_load_against_naive_loop():
+    pv = simulation.hourly_profile(_reference())
+    load = simulation.load_profile(APPLIANCES, SolarPrescription.APPLIANCE_SPECS)
+    kit_sizes = [20, 100]
+    battery_wh = np.array([144.0, 600.0])
+    usable = battery_wh * 0.9
+
+    results = simulation.simulate(pv, load, kit_sizes, battery_wh, np.array([0.9, 0.9]))
+
+    net = pv[None, :] * (np.array(kit_sizes)[:, None] / 1000) * simulation.LOSS_FACTOR
+    net = net - np.tile(load, 365)[None, :]
+    _, unmet = _naive_soc(net, usable)
+    for i, result in enumerate(results):
+        assert result["loss_of_load_hours"] == int((unmet[i] > 1e-6).sum())
+        assert result["days_of_autonomy"] == round(usable[i] / load.sum(), 2)
+    assert results[0]["loss_of_load_hours"] > results[1]["loss_of_load_hours"]
+
+
+def test_load_profile_wraps_midnight():
+    load = simulation.load_profile(
+        [{"id": "security_lights", "quantity": 1}], SolarPrescription.APPLIANCE_SPECS
+    )
+    assert load.sum() == 20 * 12
+    assert load[23] == 20 and load[5] == 20 and load[12] == 0
+
+
+def test_monthly_fallback_preserves_energy():
+    monthly = [30.0] * 12
+    pv = simulation.hourly_profile({"outputs": {"ac_monthly": monthly}})
+    assert pv.shape == (simulation.HOURS_PER_YEAR,)
+    assert abs(pv.sum() / 1000 - sum(monthly)) < 1e-6
+
+
+def test_simulate_battery_covers_every_kit_size():
+    engine = SolarPrescription()
+    results = engine.simulate_battery(_reference(), APPLIANCES)
+
+    assert [result["kit_size"] for result in results] == engine.KIT_SIZES
+    # Larger kits never run short more often than smaller ones with the same load.
+    assert results[-1]["loss_of_load_hours"] <= results[0]["loss_of_load_hours"]
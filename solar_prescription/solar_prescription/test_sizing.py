@@ -0,0 +1,59 @@
+"""
+Tests for the kit sizing engine
+Run with: python -m pytest test_sizing.py
+"""
+
+import random
+import re
+
+from prescription_engine import SolarPrescription
+from sizing import APPROVED_VERDICTS, production_per_watt, scaled_production
+
+
+def _brute_force(engine, per_watt, need, target):
+    for kit in engine.KIT_SIZES:
+        verdict = engine.determine_verdict(scaled_production(per_watt, kit), need, kit, target)
+        if verdict.verdict in APPROVED_VERDICTS:
+            return kit
+    return None
+
+
+def test_matches_linear_scan_for_every_target():
+    rng = random.Random(42)
+    engine = SolarPrescription()
+    for _ in range(300):
+        reference = {"outputs": {"ac_monthly": [rng.uniform(50, 180) for _ in range(12)]}}
+        reference["outputs"]["ac_annual"] = sum(reference["outputs"]["ac_monthly"])
+        per_watt = production_per_watt(engine.get_daily_production(reference, 1000), 1000)
+        need = rng.choice([20, 70, 150, 400, 900, 2500])
+
+        options = engine.size_kits(per_watt, need)
+
+        assert set(options) == {50, 70, 90}
+        for target, option in options.items():
+            expected = _brute_force(engine, per_watt, need, target)
+            if expected is not None:
+                assert option["kit_size"] == expected
+            else:
+                assert option["kit_size"] > engine.KIT_SIZES[-1]
+                assert option["kit_size"] % 100 == 0
+            assert option["verdict"].verdict in APPROVED_VERDICTS
+        assert options[50]["kit_size"] <= options[70]["kit_size"] <= options[90]["kit_size"]
+
+
+def test_recommendation_suggests_a_kit_that_is_approved():
+    engine = SolarPrescription()
+    reference = {"outputs": {"ac_annual": 1460.0, "ac_monthly": [110.0] * 12}}
+    prescription = engine.generate_prescription(
+        "Nyeri, Kenya", -0.42, 36.95, 10, [{"id": "led_bulb"}, {"id": "phone_charger"}],
+        {"outputs": {"ac_annual": 14.6, "ac_monthly": [1.1] * 12}},
+    )
+    assert prescription.verdict.verdict == "insufficient"
+    suggested = int(re.search(r"(\d+)W", prescription.recommendation["suggestion"]).group(1))
+    assert suggested == prescription.sizing["70"]["kit_size"]
+    # Only the requested coverage target is sized.
+    assert list(prescription.sizing) == ["70"]
+
+    per_watt = production_per_watt(engine.get_daily_production(reference, 1000), 1000)
+    verdict = engine.determine_verdict(scaled_production(per_watt, suggested), 70, suggested)
+    assert verdict.verdict in APPROVED_VERDICTS
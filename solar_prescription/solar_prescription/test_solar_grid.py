@@ -0,0 +1,68 @@
+"""
+Tests for the offline gridded solar resource
+Run with: python -m pytest test_solar_grid.py
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+import pvwatts
+import solar_grid
+from prescription_engine import SolarPrescription
+
+
+@pytest.fixture
+def grid_path(tmp_path, monkeypatch):
+    # Yield varies linearly in lat and lon, so bilinear interpolation is exact.
+    lats = np.arange(-5.0, 5.0 + 1e-9, 1.0)
+    lons = np.arange(30.0, 40.0 + 1e-9, 1.0)
+    months = np.arange(12)
+    yields = (
+        4.0
+        + 0.1 * lats[:, None, None]
+        + 0.02 * (lons[None, :, None] - 30)
+        + 0.05 * months[None, None, :]
+    )
+    path = str(tmp_path / "grid.npy")
+    solar_grid.write_grid(path, -5.0, 30.0, 1.0, yields)
+    monkeypatch.setenv("SOLAR_GRID_PATH", path)
+    monkeypatch.setattr(solar_grid, "_grid", None)
+    return path
+
+
+def test_bilinear_interpolation(grid_path):
+    grid = solar_grid.get_grid()
+    daily = grid.specific_yield(-1.25, 36.5)
+    expected = 4.0 + 0.1 * -1.25 + 0.02 * 6.5 + 0.05 * np.arange(12)
+    assert np.allclose(daily, expected, atol=1e-5)
+    assert grid.specific_yield(10.0, 36.0) is None
+
+
+def test_drop_in_for_get_pvwatts_data(grid_path):
+    data, error = solar_grid.get_pvwatts_data(0.05, 0, 1, 15, 180, -1.0, 36.0, 14)
+    assert error is None
+    outputs = data["outputs"]
+    assert len(outputs["ac_monthly"]) == 12
+    assert outputs["ac_annual"] == pytest.approx(sum(outputs["ac_monthly"]))
+    january_daily_wh = outputs["ac_monthly"][0] * 1000 / 31
+    assert january_daily_wh == pytest.approx((4.0 - 0.1 + 0.12) * 50, rel=1e-5)
+
+    production = SolarPrescription().get_daily_production(data, 50)
+    assert production.worst_month_daily > 0
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        solar_grid.get_pvwatts_data(1.0, 0, 1, 15, 180, -1.3, 36.8, 14)
+    assert (time.perf_counter() - start) / 1000 < 0.0005
+
+
+def test_offline_provider_never_calls_upstream(grid_path, monkeypatch):
+    monkeypatch.setattr(pvwatts, "SOLAR_DATA_PROVIDER", "offline")
+    monkeypatch.setattr(pvwatts, "get_client", lambda: pytest.fail("network used"))
+    data, error = pvwatts.get_reference_profile(lat=2.0, lon=33.0, tilt=15, azimuth=180)
+    assert error is None and data["offline"] is True
+
+    data, error = pvwatts.get_reference_profile(lat=52.0, lon=0.0, tilt=52, azimuth=180)
+    assert data is None and error
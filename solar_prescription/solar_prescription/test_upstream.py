@@ -0,0 +1,121 @@
+"""
+Tests for the pooled upstream client, run against the local stub server
+Run with: python -m pytest test_upstream.py
+"""
+
+import threading
+import time
+
+import pytest
+import requests
+
+import pvwatts
+from upstream import UpstreamBusy, UpstreamClient, gather
+from upstream_stub import StubUpstreamServer
+
+
+@pytest.fixture
+def stub():
+    with StubUpstreamServer() as server:
+        yield server
+
+
+def test_get_json_reuses_pooled_connection(stub):
+    client = UpstreamClient()
+    for _ in range(3):
+        data = client.get_json(stub.pvwatts_url, params={"lat": -1.3, "system_capacity": 1})
+        assert len(data["outputs"]["ac_monthly"]) == 12
+    pool = client.session.get_adapter(stub.pvwatts_url).poolmanager
+    assert len(pool.pools) == 1
+    assert stub.calls["/api/pvwatts/v8.json"] == 3
+
+
+def test_read_timeout_is_enforced(stub):
+    stub.latency_s = 0.5
+    client = UpstreamClient(read_timeout=0.1)
+    start = time.perf_counter()
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.get_json(stub.nominatim_url, params={"q": "nyeri"})
+    assert time.perf_counter() - start < 0.45
+
+
+def test_concurrency_is_bounded_per_host(stub):
+    stub.latency_s = 0.3
+    client = UpstreamClient(max_concurrency_per_host=1)
+    errors = []
+
+    def slow_call():
+        try:
+            client.get(stub.nominatim_url, params={"q": "a"}, timeout=(1, 2))
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+
+    worker = threading.Thread(target=slow_call)
+    worker.start()
+    time.sleep(0.05)
+    with pytest.raises(UpstreamBusy):
+        client.get(stub.nominatim_url, params={"q": "b"}, timeout=(1, 0.1))
+    worker.join()
+    assert not errors
+
+
+def test_slot_wait_is_taken_from_the_read_budget(stub):
+    stub.latency_s = 0.3
+    client = UpstreamClient(max_concurrency_per_host=1)
+    worker = threading.Thread(
+        target=client.get, args=(stub.nominatim_url,), kwargs={"params": {"q": "a"}}
+    )
+    worker.start()
+    time.sleep(0.05)
+    start = time.perf_counter()
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        # ~0.25s waiting for the slot leaves ~0.15s, less than the stub's 0.3s latency.
+        client.get(stub.nominatim_url, params={"q": "b"}, timeout=(1, 0.4))
+    worker.join()
+    assert time.perf_counter() - start < 0.7
+
+
+def test_async_fan_out(stub):
+    stub.latency_s = 0.2
+    client = UpstreamClient(max_concurrency_per_host=8)
+    start = time.perf_counter()
+    results = gather(
+        [client.aget_json(stub.nominatim_url, params={"q": f"town{i}"}) for i in range(6)]
+    )
+    assert len(results) == 6
+    assert time.perf_counter() - start < 0.2 * 6 / 2
+
+
+def test_get_pvwatts_data_against_stub(stub, monkeypatch):
+    monkeypatch.setattr(pvwatts, "BASE_URL", stub.pvwatts_url)
+    monkeypatch.setattr(pvwatts, "get_cache", lambda: None)
+    data, error = pvwatts.get_reference_profile(lat=-1.29, lon=36.82, tilt=15, azimuth=180)
+    assert error is None
+    assert data["outputs"]["ac_annual"] > 0
+
+
+def test_concurrent_identical_lookups_share_one_call(stub, monkeypatch):
+    stub.latency_s = 0.2
+    monkeypatch.setattr(pvwatts, "BASE_URL", stub.pvwatts_url)
+    monkeypatch.setattr(pvwatts, "get_cache", lambda: None)
+    monkeypatch.setattr(pvwatts, "_in_flight", pvwatts.SingleFlight())
+
+    results = []
+
+    def lookup():
+        results.append(
+            pvwatts.get_reference_profile(lat=-0.42, lon=36.95, tilt=15, azimuth=180)
+        )
+
+    threads = [threading.Thread(target=lookup) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert stub.calls["/api/pvwatts/v8.json"] == 1
+    assert all(error is None for _, error in results)
+    assert len({id(data) for data, _ in results}) == 1
+    stats = pvwatts.coalescing_stats()
+    assert stats["executions"] == 1
+    assert stats["coalesced"] == 9
@@ -0,0 +1,58 @@
+"""
+Tests for per-location verdict lookup tables
+Run with: python -m pytest test_verdict_tables.py
+"""
+
+import random
+
+from prescription_engine import SolarPrescription
+from pvwatts import scale_to_kit
+from verdict_tables import VerdictTable, get_verdict_table
+
+
+def _random_profile(rng):
+    peak = rng.uniform(60, 180)
+    monthly = [peak * rng.uniform(0.35, 1.0) for _ in range(12)]
+    return {"outputs": {"ac_annual": sum(monthly), "ac_monthly": monthly}}
+
+
+def test_table_lookups_match_determine_verdict():
+    rng = random.Random(99)
+    engine = SolarPrescription()
+
+    for _ in range(30):
+        reference = _random_profile(rng)
+        table = VerdictTable(engine, reference)
+        productions = [
+            engine.get_daily_production(scale_to_kit(reference, k), k) for k in engine.KIT_SIZES
+        ]
+        for _ in range(40):
+            need = rng.choice([0, rng.uniform(1, 200), rng.uniform(200, 6000)])
+            coverage = rng.choice([50, 70, 90, 60])
+            codes = table.codes(need, coverage)
+            expected = [
+                engine.determine_verdict(production, need, k, coverage)
+                for k, production in zip(engine.KIT_SIZES, productions)
+            ]
+
+            for i, verdict_info in enumerate(expected):
+                assert table.verdict(i, need, coverage) == verdict_info
+                assert ("insufficient", "marginal", "good", "excellent")[codes[i]] == verdict_info.verdict
+
+            approved = [
+                k for k, v in zip(engine.KIT_SIZES, expected) if v.verdict in ("excellent", "good")
+            ]
+            assert table.smallest_approved(need, coverage) == (approved[0] if approved else None)
+
+
+def test_cached_table_is_rebuilt_when_reference_data_changes():
+    rng = random.Random(7)
+    engine = SolarPrescription()
+    first, refreshed = _random_profile(rng), _random_profile(rng)
+
+    table = get_verdict_table(engine, "loc-refresh", first)
+    assert get_verdict_table(engine, "loc-refresh", dict(first)) is table
+
+    rebuilt = get_verdict_table(engine, "loc-refresh", refreshed)
+    assert rebuilt is not table
+    assert rebuilt.usable_daily.tolist() == VerdictTable(engine, refreshed).usable_daily.tolist()
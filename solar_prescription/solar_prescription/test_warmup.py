@@ -0,0 +1,117 @@
+"""
+Tests for the cache warm-up job
+Run with: python -m pytest test_warmup.py
+"""
+
+import time
+
+import requests
+
+import pvwatts
+import warmup
+from conftest import _FakeClient
+from pvwatts_cache import PVWattsCache
+from upstream import RateLimiter
+
+
+def test_warm_up_fetches_each_uncached_bucket_once(monkeypatch):
+    cache = PVWattsCache(":memory:")
+    client = _FakeClient()
+    monkeypatch.setattr(pvwatts, "get_cache", lambda: cache)
+    monkeypatch.setattr(warmup, "get_cache", lambda: cache)
+    monkeypatch.setattr(pvwatts, "get_client", lambda: client)
+
+    # The first two share a ~5 km PVWatts cache bucket.
+    locations = warmup.unique_locations([(-1.2921, 36.8219), (-1.2900, 36.8200), (6.5244, 3.3792)])
+    assert len(locations) == 2
+
+    summary = warmup.warm_up(locations, concurrency=2, min_interval=0, log=lambda _: None)
+    assert (summary["fetched"], summary["cached"], summary["failed"]) == (2, 0, 0)
+    assert len(client.calls) == 2
+
+    summary = warmup.warm_up(locations, min_interval=0, log=lambda _: None)
+    assert (summary["fetched"], summary["cached"]) == (0, 2)
+    assert len(client.calls) == 2
+
+
+def test_load_locations_accepts_either_column_naming(tmp_path):
+    path = tmp_path / "top.csv"
+    path.write_text("name,lat,lon\nNairobi,-1.29,36.82\nbad,,\n", encoding="utf-8")
+    assert warmup.load_locations(path) == [(-1.29, 36.82)]
+    path.write_text("latitude,longitude\n6.52,3.38\n", encoding="utf-8")
+    assert warmup.load_locations(path) == [(6.52, 3.38)]
+
+
+def test_rate_limiter_acquire_paces_callers():
+    limiter = RateLimiter(0.05)
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.1
+
+
+class _FailingClient(_FakeClient):
+    """Fails every PVWatts call with the given HTTP status; the URL contains "429"."""
+
+    def __init__(self, status_code):
+        super().__init__()
+        self.status_code = status_code
+
+    def get_json(self, url, params=None, **kwargs):
+        self.calls.append(params)
+        response = requests.Response()
+        response.status_code = self.status_code
+        raise requests.exceptions.HTTPError(
+            f"{self.status_code} Error for url: {url}?lat=12.4290", response=response
+        )
+
+
+def _warm_up_with(monkeypatch, client):
+    cache = PVWattsCache(":memory:")
+    monkeypatch.setattr(pvwatts, "get_cache", lambda: cache)
+    monkeypatch.setattr(warmup, "get_cache", lambda: cache)
+    monkeypatch.setattr(pvwatts, "get_client", lambda: client)
+    locations = [(12.4290, 3.0), (-1.2921, 36.8219), (6.5244, 3.3792)]
+    return warmup.warm_up(locations, concurrency=1, min_interval=0, log=lambda _: None)
+
+
+def test_failed_fetch_reports_message_and_status(monkeypatch):
+    monkeypatch.setattr(pvwatts, "get_cache", lambda: None)
+    monkeypatch.setattr(pvwatts, "get_client", lambda: _FailingClient(429))
+
+    data, error = pvwatts.get_reference_profile(lat=12.429, lon=3.0, tilt=15, azimuth=180)
+    assert data is None
+    assert error == pvwatts.PVWattsError(str(error), 429)
+    assert str(error).startswith("429 Error")
+
+
+def test_only_an_http_429_stops_the_run(monkeypatch):
+    client = _FailingClient(500)
+    summary = _warm_up_with(monkeypatch, client)
+    assert (summary["failed"], summary["rate_limited"]) == (3, False)
+    assert len(client.calls) == 3
+
+    client = _FailingClient(429)
+    summary = _warm_up_with(monkeypatch, client)
+    assert summary["rate_limited"] is True
+    assert len(client.calls) == 1
+
+
+def test_unexpected_errors_are_counted_as_failures(monkeypatch):
+    def broken(**kwargs):
+        raise ValueError("malformed response")
+
+    monkeypatch.setattr(warmup, "get_reference_profile", broken)
+    summary = _warm_up_with(monkeypatch, _FakeClient())
+    assert (summary["fetched"], summary["failed"]) == (0, 3)
+
+
+def test_cache_only_warm_up_makes_no_upstream_calls(monkeypatch):
+    client = _FakeClient()
+    monkeypatch.setattr(pvwatts, "get_cache", lambda: PVWattsCache(":memory:"))
+    monkeypatch.setattr(warmup, "get_cache", lambda: PVWattsCache(":memory:"))
+    monkeypatch.setattr(pvwatts, "get_client", lambda: client)
+
+    summary = warmup.warm_up([(-1.2921, 36.8219)], log=lambda _: None, fetch_missing=False)
+    assert (summary["cached"], summary["fetched"], summary["failed"]) == (0, 0, 0)
+    assert client.calls == []
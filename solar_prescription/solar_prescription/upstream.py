@@ -0,0 +1,187 @@
+"""
+Upstream HTTP Client
+Pooled keep-alive sessions for NREL PVWatts and Nominatim, with explicit
+timeouts and a concurrency cap per upstream host.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+NREL_PVWATTS_URL = os.getenv(
+    "NREL_PVWATTS_URL", "https://developer.nrel.gov/api/pvwatts/v8.json"
+)
+NOMINATIM_SEARCH_URL = os.getenv(
+    "NOMINATIM_SEARCH_URL", "https://nominatim.openstreetmap.org/search"
+)
+
+CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "20"))
+MAX_CONCURRENCY_PER_HOST = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "8"))
+
+
+class UpstreamBusy(requests.exceptions.ConnectionError):
+    """Raised when a host's concurrency slots stay taken for longer than the timeout."""
+
+
+class UpstreamClient:
+    """
+    Thread-safe HTTP client shared by every upstream call in the process.
+
+    One requests.Session keeps connections (and TLS sessions) alive per host;
+    a semaphore per host bounds in-flight requests so a slow upstream cannot
+    absorb every worker thread.
+    """
+
+    def __init__(
+        self,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        max_concurrency_per_host=MAX_CONCURRENCY_PER_HOST,
+        retries=1,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=max_concurrency_per_host,
+            max_retries=Retry(
+                total=retries,
+                connect=retries,
+                # Never replay a request that may have reached the upstream;
+                # read timeouts surface as requests.ReadTimeout.
+                read=False,
+                status=retries,
+                backoff_factor=0.3,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset({"GET"}),
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._slots = {}
+        self._slots_lock = threading.Lock()
+        self._executor = None
+
+    def _host_slots(self, url):
+        host = urlsplit(url).netloc
+        with self._slots_lock:
+            slots = self._slots.get(host)
+            if slots is None:
+                slots = threading.BoundedSemaphore(self.max_concurrency_per_host)
+                self._slots[host] = slots
+            return slots
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        """GET url within the host's concurrency limit. Returns requests.Response."""
+        timeout = timeout or self.timeout
+        slots = self._host_slots(url)
+        connect_timeout, read_timeout = timeout
+        # Waiting for a slot counts against the read budget, not on top of it.
+        started = time.monotonic()
+        if not slots.acquire(timeout=read_timeout):
+            raise UpstreamBusy(f"Too many concurrent requests to {urlsplit(url).netloc}")
+        try:
+            remaining = read_timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                raise UpstreamBusy(f"Too many concurrent requests to {urlsplit(url).netloc}")
+            return self.session.get(
+                url, params=params, headers=headers, timeout=(connect_timeout, remaining)
+            )
+        finally:
+            slots.release()
+
+    def get_json(self, url, params=None, headers=None, timeout=None):
+        response = self.get(url, params=params, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    async def aget_json(self, url, params=None, headers=None, timeout=None):
+        """asyncio variant of get_json; runs on the client's I/O thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._io_executor(),
+            partial(self.get_json, url, params=params, headers=headers, timeout=timeout),
+        )
+
+    async def arun(self, func, *args, **kwargs):
+        """Run a blocking upstream helper (e.g. get_pvwatts_data) on the I/O pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._io_executor(), partial(func, *args, **kwargs)
+        )
+
+    def _io_executor(self):
+        if self._executor is None:
+            with self._slots_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_concurrency_per_host * 2,
+                        thread_name_prefix="upstream",
+                    )
+        return self._executor
+
+    def close(self):
+        self.session.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+class RateLimiter:
+    """Allow at most one acquisition per min_interval seconds (process-wide)."""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next_allowed = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take the slot if it is free; never blocks."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_allowed:
+                return False
+            self._next_allowed = now + self.min_interval
+            return True
+
+    def acquire(self):
+        """Reserve the next free slot and sleep until it arrives (FIFO across threads)."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed)
+            self._next_allowed = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def gather(coroutines):
+    """Run coroutines concurrently from synchronous code and return their results."""
+
+    async def _gather():
+        return await asyncio.gather(*coroutines)
+
+    return asyncio.run(_gather())
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide UpstreamClient."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = UpstreamClient()
+    return _client
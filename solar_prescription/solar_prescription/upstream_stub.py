@@ -0,0 +1,158 @@
+"""Local stand-in for the NREL PVWatts and Nominatim APIs.
+
+Serves deterministic responses for tests and load tests, with optional injected
+latency and a per-path request counter.
+
+Usage:
+  python upstream_stub.py [--port 8089] [--latency-ms 200]
+
+Then point the app at it:
+  NREL_PVWATTS_URL=http://127.0.0.1:8089/api/pvwatts/v8.json
+  NOMINATIM_SEARCH_URL=http://127.0.0.1:8089/search
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PVWATTS_PATH = "/api/pvwatts/v8.json"
+NOMINATIM_PATH = "/search"
+
+DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def synthetic_pvwatts(lat: float, system_capacity: float, hourly: bool = False) -> dict:
+    """Plausible PVWatts-shaped outputs: yield falls with |lat|, seasonal swing grows."""
+    peak_sun_hours = max(1.5, 5.5 - abs(lat) * 0.06)
+    swing = min(0.6, abs(lat) / 90)
+    ac_monthly = []
+    for month, days in enumerate(DAYS_IN_MONTH):
+        season = math.cos(2 * math.pi * (month - (5.5 if lat >= 0 else -0.5)) / 12)
+        daily_kwh_per_kw = peak_sun_hours * 0.86 * (1 + swing * season)
+        ac_monthly.append(round(daily_kwh_per_kw * days * system_capacity, 4))
+    outputs = {"ac_monthly": ac_monthly, "ac_annual": round(sum(ac_monthly), 4)}
+    if hourly:
+        ac = []
+        for month, days in enumerate(DAYS_IN_MONTH):
+            daily_wh = ac_monthly[month] * 1000 / days
+            shape = [max(0.0, math.sin(math.pi * (h - 6) / 12)) for h in range(24)]
+            total = sum(shape)
+            ac.extend([daily_wh * s / total for s in shape] * days)
+        outputs["ac"] = ac
+    return {"inputs": {"lat": lat, "system_capacity": system_capacity}, "outputs": outputs}
+
+
+def synthetic_places(query: str) -> list:
+    return [
+        {
+            "lat": str(-1.29 + i * 0.01),
+            "lon": str(36.82 + i * 0.01),
+            "display_name": f"{query.title()} {i}, Kenya",
+            "address": {"town": f"{query.title()} {i}", "country": "Kenya"},
+        }
+        for i in range(3)
+    ]
+
+
+class StubUpstreamServer:
+    """Threaded HTTP server serving PVWatts and Nominatim stand-ins."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+                with stub._lock:
+                    stub.calls[parts.path] += 1
+                if stub.latency_s:
+                    time.sleep(stub.latency_s)
+
+                if parts.path == PVWATTS_PATH:
+                    payload = synthetic_pvwatts(
+                        float(query.get("lat", 0)),
+                        float(query.get("system_capacity", 1)),
+                        hourly=query.get("timeframe") == "hourly",
+                    )
+                elif parts.path == NOMINATIM_PATH:
+                    payload = synthetic_places(query.get("q", ""))
+                else:
+                    self.send_error(404)
+                    return
+
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def pvwatts_url(self) -> str:
+        return self.base_url + PVWATTS_PATH
+
+    @property
+    def nominatim_url(self) -> str:
+        return self.base_url + NOMINATIM_PATH
+
+    def start(self) -> "StubUpstreamServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local NREL/Nominatim stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubUpstreamServer(args.host, args.port, latency_s=args.latency_ms / 1000)
+    print(f"Stub upstreams on {server.base_url} (latency {args.latency_ms:.0f} ms)")
+    print(f"  NREL_PVWATTS_URL={server.pvwatts_url}")
+    print(f"  NOMINATIM_SEARCH_URL={server.nominatim_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
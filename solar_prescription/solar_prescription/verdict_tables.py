@@ -0,0 +1,161 @@
+"""
+Verdict Lookup Tables
+Per-location tables that answer "which verdict does each kit get for this daily
+need?" without rebuilding a prescription.
+
+A kit's usable production at a location does not depend on the household, and
+every condition in determine_verdict has the form coverage >= X, i.e.
+need <= usable * 100 / X. Each kit's verdict is therefore a step function of
+need with three breakpoints (excellent / good / marginal), and the smallest
+kit rated good or better is a binary search over a monotone envelope.
+"""
+
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+import numpy as np
+
+import batch
+from models import Verdict
+
+TABLE_CACHE_ENTRIES = 1024
+
+
+def _need_limit(production, threshold):
+    """Largest need at which production * 100 / need >= threshold still holds."""
+    if np.isneginf(threshold):
+        return np.full_like(production, np.inf)
+    return production * 100 / threshold
+
+
+class VerdictTable:
+    """
+    Need breakpoints for every KIT_SIZE at one location, for each coverage target.
+
+    breakpoints[target] is a (kits, 3) array of non-decreasing need limits;
+    a kit's verdict for need n is VERDICTS[3 - bisect_left(row, n)].
+    """
+
+    def __init__(self, engine, reference_data):
+        self.kit_sizes = list(engine.KIT_SIZES)
+        annual, worst_month = batch.reference_arrays([reference_data])
+        daily_avg, worst_month_daily = batch.daily_production(
+            annual, worst_month, self.kit_sizes
+        )
+
+        # Same tested-value substitution as determine_verdict; need-independent.
+        usable = daily_avg[0] * 0.8
+        worst_usable = worst_month_daily[0] * 0.8
+        tested = batch.tested_daily_energy(engine, self.kit_sizes)
+        self.used_tested_value = (tested > 0) & (tested < usable)
+        self.usable_daily = np.where(self.used_tested_value, tested, usable)
+        self.worst_month_usable = np.where(self.used_tested_value, tested * 0.9, worst_usable)
+
+        self.breakpoints = {}
+        self._approved_limits = {}
+        self._approved_kits = {}
+        for target, thresholds in batch.VERDICT_THRESHOLDS.items():
+            exc_avg, exc_worst, good_avg, good_worst, marg_avg, marg_worst = thresholds
+            excellent = np.minimum(
+                _need_limit(self.usable_daily, exc_avg),
+                _need_limit(self.worst_month_usable, exc_worst),
+            )
+            good = np.minimum(
+                _need_limit(self.usable_daily, good_avg),
+                _need_limit(self.worst_month_usable, good_worst),
+            )
+            marginal = np.maximum(
+                _need_limit(self.usable_daily, marg_avg),
+                _need_limit(self.worst_month_usable, marg_worst),
+            )
+            # The verdict checks run best-first, so each limit covers the ones above it.
+            approved = np.maximum(excellent, good)
+            self.breakpoints[target] = np.stack(
+                [excellent, approved, np.maximum(approved, marginal)], axis=1
+            )
+
+            # Kits that approve a larger need than every smaller kit, in size order:
+            # the first one whose limit reaches n is the smallest approved kit.
+            limits, kits = [], []
+            for kit_size, limit in zip(self.kit_sizes, approved.tolist()):
+                if not limits or limit > limits[-1]:
+                    limits.append(limit)
+                    kits.append(kit_size)
+            self._approved_limits[target] = limits
+            self._approved_kits[target] = kits
+
+    def _target(self, coverage_percentage):
+        # determine_verdict treats anything other than 50/90 as the 70% target.
+        return coverage_percentage if coverage_percentage in (50, 90) else 70
+
+    def codes(self, need, coverage_percentage=70):
+        """Verdict code (batch.INSUFFICIENT..EXCELLENT) for every kit size."""
+        if need <= 0:
+            # determine_verdict reports 0% coverage, below every target's thresholds.
+            return np.full(len(self.kit_sizes), batch.INSUFFICIENT, dtype=np.int8)
+        breakpoints = self.breakpoints[self._target(coverage_percentage)]
+        # Row-wise bisect_left: count of breakpoints strictly below need.
+        return (batch.EXCELLENT - (breakpoints < need).sum(axis=1)).astype(np.int8)
+
+    def verdict(self, kit_index, need, coverage_percentage=70):
+        """determine_verdict's Verdict for KIT_SIZES[kit_index]."""
+        usable = float(self.usable_daily[kit_index])
+        worst_usable = float(self.worst_month_usable[kit_index])
+        code = batch.INSUFFICIENT
+        if need > 0:
+            row = self.breakpoints[self._target(coverage_percentage)][kit_index].tolist()
+            code = batch.EXCELLENT - bisect_left(row, need)
+        return Verdict(
+            verdict=batch.VERDICTS[code],
+            avg_coverage=round((usable / need * 100) if need > 0 else 0, 1),
+            worst_coverage=round((worst_usable / need * 100) if need > 0 else 0, 1),
+            usable_daily=round(usable, 0),
+            worst_month_usable=round(worst_usable, 0),
+            used_tested_value=bool(self.used_tested_value[kit_index]),
+            coverage_percentage=coverage_percentage,
+        )
+
+    def smallest_approved(self, need, coverage_percentage=70):
+        """Smallest KIT_SIZE rated good or better for need, or None."""
+        if need <= 0:
+            return None
+        target = self._target(coverage_percentage)
+        index = bisect_left(self._approved_limits[target], need)
+        kits = self._approved_kits[target]
+        return kits[index] if index < len(kits) else None
+
+
+_tables = OrderedDict()
+_tables_lock = threading.Lock()
+
+
+def _fingerprint(reference_data):
+    """The reference-profile values a VerdictTable is built from."""
+    outputs = (reference_data or {}).get("outputs", {})
+    return outputs.get("ac_annual", 0), tuple(outputs.get("ac_monthly", ()))
+
+
+def get_verdict_table(engine, location_key, reference_data):
+    """
+    Cached VerdictTable for a location (keyed on the PVWatts cache key).
+
+    Tables are tied to the engine instance, so a products.json reload builds
+    fresh ones, and to the reference profile's values, so a refetched PVWatts
+    entry with different data replaces the stale table.
+    """
+    key = (location_key, id(engine))
+    fingerprint = _fingerprint(reference_data)
+    with _tables_lock:
+        entry = _tables.get(key)
+        if entry is not None and entry[0] is engine and entry[1] == fingerprint:
+            _tables.move_to_end(key)
+            return entry[2]
+
+    table = VerdictTable(engine, reference_data)
+    with _tables_lock:
+        _tables[key] = (engine, fingerprint, table)
+        _tables.move_to_end(key)
+        while len(_tables) > TABLE_CACHE_ENTRIES:
+            _tables.popitem(last=False)
+    return table
@@ -0,0 +1,251 @@
+"""
+Cache Warm-up
+Pre-fetches PVWatts reference profiles for the locations users ask about most,
+and builds the engine, catalog, gazetteer and verdict-table indexes, so the
+first requests after a deploy are served from warm caches.
+
+Locations come from (in priority order, de-duplicated by PVWatts cache bucket):
+  - a CSV file with latitude/longitude (or lat/lon) columns (--locations,
+    WARMUP_LOCATIONS), e.g. exported from request logs
+  - the most frequent locations in recent stored prescriptions (--from-store)
+  - the most populous gazetteer places (--top, WARMUP_TOP_PLACES)
+
+NREL calls run on a small thread pool and are paced by a rate limiter; a 429
+from NREL stops the run instead of burning the API key's hourly quota.
+
+Usage:
+  python warmup.py [--locations FILE] [--from-store] [--top 50]
+                   [--concurrency 4] [--min-interval 1.0] [--max-locations 200]
+"""
+
+import argparse
+import csv
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from catalog import preload_catalog
+from geocoding import get_gazetteer
+from prescription_engine import get_engine
+from prescription_store import get_store
+import pvwatts
+from pvwatts import (
+    PVWattsError, default_orientation, get_cached_reference_profile, get_reference_profile,
+)
+from pvwatts_cache import get_cache, make_cache_key
+from upstream import RateLimiter
+from verdict_tables import get_verdict_table
+
+DEFAULT_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "4"))
+# NREL allows 1,000 requests per hour per key; one per second stays well inside it.
+DEFAULT_MIN_INTERVAL = float(os.getenv("WARMUP_MIN_INTERVAL", "1.0"))
+DEFAULT_TOP_PLACES = int(os.getenv("WARMUP_TOP_PLACES", "50"))
+DEFAULT_MAX_LOCATIONS = int(os.getenv("WARMUP_MAX_LOCATIONS", "200"))
+STORE_SCAN_LIMIT = 5000
+# Set by serve.py before a preloading server imports the app: the app then
+# leaves startup warm-up to the server's fork-safe hooks.
+PRELOADED_ENV = "SERVE_PRELOADED"
+
+# Array parameters /prescribe uses for every lookup.
+MODULE_TYPE = 0
+ARRAY_TYPE = 1
+LOSSES = 14
+
+
+def load_locations(path):
+    """(lat, lon) pairs from a CSV with latitude/longitude or lat/lon columns."""
+    locations = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            lat = row.get("latitude", row.get("lat"))
+            lon = row.get("longitude", row.get("lon"))
+            try:
+                locations.append((float(lat), float(lon)))
+            except (TypeError, ValueError):
+                continue
+    return locations
+
+
+def store_locations(store, limit=STORE_SCAN_LIMIT):
+    """Locations of recent stored prescriptions, most requested first."""
+    counts = Counter()
+    for record in store.recent(limit):
+        location = (record.get("prescription") or {}).get("location") or {}
+        try:
+            counts[(float(location["latitude"]), float(location["longitude"]))] += 1
+        except (KeyError, TypeError, ValueError):
+            continue
+    return [location for location, _ in counts.most_common()]
+
+
+def gazetteer_locations(limit=DEFAULT_TOP_PLACES):
+    """The limit most populous gazetteer places."""
+    gazetteer = get_gazetteer()
+    if gazetteer is None or limit <= 0:
+        return []
+    places = sorted(gazetteer.places, key=lambda place: -place["population"])
+    return [(place["lat"], place["lon"]) for place in places[:limit]]
+
+
+def location_key(lat, lon):
+    tilt, azimuth = default_orientation(lat)
+    return make_cache_key(lat, lon, tilt, azimuth, ARRAY_TYPE, MODULE_TYPE, LOSSES)
+
+
+def unique_locations(*sources, limit=DEFAULT_MAX_LOCATIONS):
+    """Merge location lists in order, keeping one location per PVWatts cache bucket."""
+    seen = set()
+    merged = []
+    for source in sources:
+        for lat, lon in source:
+            key = location_key(lat, lon)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append((lat, lon))
+            if len(merged) >= limit:
+                return merged
+    return merged
+
+
+def default_locations():
+    """Locations configured through the environment, for startup warm-up."""
+    sources = []
+    path = os.getenv("WARMUP_LOCATIONS")
+    if path and os.path.exists(path):
+        sources.append(load_locations(path))
+    sources.append(store_locations(get_store()))
+    sources.append(gazetteer_locations(DEFAULT_TOP_PLACES))
+    return unique_locations(*sources)
+
+
+def warm_up(
+    locations,
+    concurrency=DEFAULT_CONCURRENCY,
+    min_interval=DEFAULT_MIN_INTERVAL,
+    log=print,
+    fetch_missing=True,
+):
+    """
+    Build the in-memory indexes and fetch every uncached reference profile.
+
+    With fetch_missing=False only already-cached locations are warmed (no NREL
+    calls). Returns counts of locations already cached, fetched and failed,
+    plus whether NREL rate-limited the run.
+    """
+    started = time.perf_counter()
+    engine = get_engine()
+    preload_catalog()
+    get_gazetteer()
+
+    summary = {"locations": len(locations), "cached": 0, "fetched": 0, "failed": 0,
+               "rate_limited": False}
+    pending = []
+    for lat, lon in locations:
+        reference = get_cached_reference_profile(
+            lat, lon, *default_orientation(lat), MODULE_TYPE, ARRAY_TYPE, LOSSES
+        )
+        if reference is None:
+            pending.append((lat, lon))
+        else:
+            get_verdict_table(engine, location_key(lat, lon), reference)
+            summary["cached"] += 1
+
+    if not fetch_missing:
+        pending = []
+    elif pending and get_cache() is None and pvwatts.SOLAR_DATA_PROVIDER != "offline":
+        log("warm-up: PVWatts cache is disabled (PVWATTS_CACHE=0); skipping NREL fetches")
+        pending = []
+
+    limiter = RateLimiter(min_interval)
+    stop = threading.Event()
+    lock = threading.Lock()
+
+    def fetch(lat, lon):
+        if stop.is_set():
+            return
+        limiter.acquire()
+        if stop.is_set():
+            return
+        tilt, azimuth = default_orientation(lat)
+        reference, error = get_reference_profile(
+            lat=lat, lon=lon, tilt=tilt, azimuth=azimuth,
+            module_type=MODULE_TYPE, array_type=ARRAY_TYPE, losses=LOSSES,
+        )
+        if error or not reference:
+            with lock:
+                summary["failed"] += 1
+                if isinstance(error, PVWattsError) and error.status_code == 429:
+                    summary["rate_limited"] = True
+                    stop.set()
+            log(f"warm-up: {lat:.4f},{lon:.4f} failed: {error}")
+            return
+        get_verdict_table(engine, location_key(lat, lon), reference)
+        with lock:
+            summary["fetched"] += 1
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="warmup") as pool:
+        futures = [(pool.submit(fetch, lat, lon), lat, lon) for lat, lon in pending]
+    for future, lat, lon in futures:
+        error = future.exception()
+        if error is not None:
+            summary["failed"] += 1
+            log(f"warm-up: {lat:.4f},{lon:.4f} failed: {error!r}")
+
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    log(
+        "warm-up: {locations} locations, {cached} already cached, {fetched} fetched, "
+        "{failed} failed in {seconds}s".format(**summary)
+        + (" (stopped: NREL rate limit)" if summary["rate_limited"] else "")
+    )
+    return summary
+
+
+def startup_warmup_enabled():
+    return os.getenv("WARMUP_ON_STARTUP", "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def start_background_warmup(fetch_missing=True):
+    """Run warm_up(default_locations()) on a daemon thread (WARMUP_ON_STARTUP=1)."""
+
+    def run():
+        try:
+            warm_up(default_locations(), fetch_missing=fetch_missing)
+        except Exception as e:  # warm-up is best effort; never take the app down
+            print(f"warm-up failed: {e}")
+
+    thread = threading.Thread(target=run, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-populate PVWatts and index caches")
+    parser.add_argument("--locations", default=os.getenv("WARMUP_LOCATIONS"),
+                        help="CSV with latitude/longitude columns")
+    parser.add_argument("--from-store", action="store_true",
+                        help="include locations of recent stored prescriptions")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP_PLACES,
+                        help="most populous gazetteer places to include (0 for none)")
+    parser.add_argument("--max-locations", type=int, default=DEFAULT_MAX_LOCATIONS)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--min-interval", type=float, default=DEFAULT_MIN_INTERVAL,
+                        help="seconds between NREL requests")
+    args = parser.parse_args(argv)
+
+    sources = []
+    if args.locations:
+        sources.append(load_locations(args.locations))
+    if args.from_store:
+        sources.append(store_locations(get_store()))
+    sources.append(gazetteer_locations(args.top))
+    locations = unique_locations(*sources, limit=args.max_locations)
+
+    summary = warm_up(locations, concurrency=args.concurrency, min_interval=args.min_interval)
+    return 1 if summary["rate_limited"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())